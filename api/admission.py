@@ -0,0 +1,80 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+
+class AdmissionController:
+    """
+    Membatasi jumlah permintaan berat yang diproses bersamaan (`max_concurrent`) dan
+    panjang antreannya (`max_queue`). Permintaan yang datang saat antrean penuh langsung
+    ditolak dengan 503 + Retry-After, sehingga latensi permintaan yang diterima tetap terbatas.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 32, max_retry_after: int = 60):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_retry_after = max_retry_after
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # Rata-rata bergerak waktu layanan (detik) untuk memperkirakan Retry-After
+        self._service_time = 1.0
+
+    def is_full(self) -> bool:
+        return self.active >= self.max_concurrent and self.waiting >= self.max_queue
+
+    def retry_after(self) -> int:
+        """Perkiraan detik sampai antrean saat ini selesai diproses."""
+        backlog = (self.waiting + 1) / self.max_concurrent
+        return min(self.max_retry_after, max(1, math.ceil(backlog * self._service_time)))
+
+    def reject(self) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=503,
+            detail="Server sedang sibuk, antrean forecast penuh. Coba lagi nanti.",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    @asynccontextmanager
+    async def slot(self, bounded: bool = True):
+        """
+        Tunggu giliran. Jika `bounded` dan antrean penuh, lempar HTTPException 503.
+        `bounded=False` dipakai untuk pekerjaan yang sudah diterima (misalnya ticker dalam batch).
+        """
+        if bounded and self.is_full():
+            raise self.reject()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self._service_time = 0.8 * self._service_time + 0.2 * (time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "service_time_ms": round(self._service_time * 1000, 1),
+            "retry_after": self.retry_after(),
+        }
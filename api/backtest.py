@@ -0,0 +1,118 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Baris awal riwayat yang dilewati: indikator (SMA_50, ADX, ...) belum stabil
+BACKTEST_WARMUP = 100
+
+
+def rolling_windows(values: np.ndarray, n_steps: int) -> np.ndarray:
+    """Semua jendela `n_steps` baris dari `values` (waktu, fitur) sebagai view tanpa salinan: (jendela, n_steps, fitur)."""
+    return sliding_window_view(values, (n_steps, values.shape[1]))[:, 0]
+
+
+def horizon_metrics(predicted: np.ndarray, actual: np.ndarray) -> Dict[str, Any]:
+    """MAE, MSE, RMSE dan MAPE (%) per horizon untuk array (jendela, horizon) dalam satuan harga."""
+    errors = predicted - actual
+    # MAPE tidak terdefinisi untuk harga aktual 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(actual != 0, np.abs(errors / actual), np.nan)
+
+    horizons = []
+    for h in range(errors.shape[1]):
+        mse = float(np.mean(errors[:, h] ** 2))
+        horizons.append({
+            "horizon": h + 1,
+            "mae": float(np.mean(np.abs(errors[:, h]))),
+            "mse": mse,
+            "rmse": float(np.sqrt(mse)),
+            "mape": float(np.nanmean(ape[:, h]) * 100),
+        })
+    return {
+        "mae": float(np.mean([m["mae"] for m in horizons])),
+        "mse": float(np.mean([m["mse"] for m in horizons])),
+        "mape": float(np.mean([m["mape"] for m in horizons])),
+        "horizons": horizons,
+    }
+
+
+def training_cutoff(scaler: Any, tz) -> Optional[pd.Timestamp]:
+    """Bar t+1 pertama yang tidak dipakai fit model (dicatat skrip pelatihan di scaler), atau None."""
+    value = getattr(scaler, "validation_start_", None)
+    if value is None:
+        return None
+    cutoff = pd.Timestamp(value)
+    if tz is None:
+        return cutoff.tz_convert(None) if cutoff.tzinfo is not None else cutoff
+    return cutoff.tz_localize(tz) if cutoff.tzinfo is None else cutoff
+
+
+def run_backtest(predict_fn: Callable[[np.ndarray], np.ndarray], scaler: Any, features: np.ndarray,
+                 index: pd.DatetimeIndex, target_index: int, n_steps: int, n_horizons: int,
+                 start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None,
+                 warmup: int = BACKTEST_WARMUP, batch_size: int = 512) -> Dict[str, Any]:
+    """
+    Backtest rolling-origin: setiap jendela `n_steps` bar memprediksi harga target pada
+    t+1..t+n_horizons, sama seperti /forecast, lalu dibandingkan dengan harga aktual.
+
+    `features` (waktu, fitur) adalah fitur belum diskalakan untuk seluruh riwayat `index`.
+    Hanya jendela yang bar t+1-nya berada dalam [start, end] yang dievaluasi. Model dijalankan
+    per potongan `batch_size` jendela; hanya potongan tersebut yang disalin dari view.
+    """
+    features = features[warmup:]
+    index = index[warmup:]
+    window_count = len(features) - n_steps - n_horizons + 1
+    if window_count <= 0:
+        return {"windows": 0}
+
+    # Jendela i memakai bar [i, i + n_steps) dan bar t+1 pertamanya ada di i + n_steps
+    first_target = index[n_steps:n_steps + window_count]
+    selected = np.ones(window_count, dtype=bool)
+    if start is not None:
+        selected &= first_target >= start
+    if end is not None:
+        selected &= first_target <= end
+    positions = np.flatnonzero(selected)
+    if len(positions) == 0:
+        return {"windows": 0}
+    first, last = positions[0], positions[-1] + 1
+
+    scaled = scaler.transform(features).astype(np.float32)
+    windows = rolling_windows(scaled, n_steps)[first:last]
+    predictions_scaled = np.concatenate([
+        np.asarray(predict_fn(np.ascontiguousarray(windows[i:i + batch_size])))
+        for i in range(0, len(windows), batch_size)
+    ])
+
+    # Inverse transform semua prediksi sekaligus lewat array dummy, seperti predict_prices
+    dummy = np.zeros((predictions_scaled.size, features.shape[1]))
+    dummy[:, target_index] = predictions_scaled.reshape(-1)
+    predicted = scaler.inverse_transform(dummy)[:, target_index].reshape(predictions_scaled.shape)
+    actual = sliding_window_view(features[n_steps:, target_index], n_horizons)[first:last]
+
+    return {
+        "windows": len(windows),
+        "start": first_target[first].isoformat(),
+        "end": first_target[last - 1].isoformat(),
+        **horizon_metrics(predicted, actual),
+    }
+
+
+class BacktestCache:
+    """Hasil backtest riwayat penuh per (ticker, timeframe), berlaku selama versi model sama."""
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, str], Tuple[Hashable, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str], version: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._results.get(key)
+            return entry[1] if entry is not None and entry[0] == version else None
+
+    def put(self, key: Tuple[str, str], version: Hashable, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[key] = (version, result)
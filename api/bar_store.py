@@ -0,0 +1,310 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone
+from typing import Callable, Dict, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+PRICE_COLUMNS = ["open", "high", "low", "close"]
+
+# Jam perdagangan Bursa Efek Indonesia (WIB). Hari libur bursa tidak diperhitungkan;
+# akibatnya hanya satu fetch inkremental ekstra yang tidak menghasilkan bar baru.
+IDX_TIMEZONE = timezone(timedelta(hours=7))
+IDX_SESSION_OPEN = time(9, 0)
+IDX_SESSION_CLOSE = time(16, 0)
+
+# Durasi bar per interval yfinance, untuk menentukan apakah bar terakhir sudah final
+INTERVAL_LENGTHS = {
+    "1m": timedelta(minutes=1), "2m": timedelta(minutes=2), "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15), "30m": timedelta(minutes=30), "60m": timedelta(hours=1),
+    "90m": timedelta(minutes=90), "1h": timedelta(hours=1), "1d": timedelta(days=1),
+}
+
+
+def normalize_ohlcv(data: pd.DataFrame) -> pd.DataFrame:
+    """Samakan format keluaran yfinance: kolom flat lowercase open/high/low/close/volume."""
+    df = data.copy()
+
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.droplevel(1)
+
+    # yfinance.download(auto_adjust=True) seharusnya sudah mengeliminasi 'Adj Close',
+    # biarkan sebagai safeguard.
+    df = df.drop(columns=[c for c in df.columns if str(c).lower() == "adj close"])
+    df.columns = [str(c).lower() for c in df.columns]
+
+    if df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=df.index)
+
+    for col_name in OHLCV_COLUMNS:
+        if col_name not in df.columns:
+            raise ValueError(f"Kolom dasar '{col_name}' tidak ditemukan setelah penyesuaian data. Pastikan data sumber valid.")
+    return df[OHLCV_COLUMNS]
+
+
+class BarProvider:
+    """Sumber bar OHLCV. Implementasi mengembalikan DataFrame hasil normalize_ohlcv."""
+
+    def fetch(self, ticker: str, interval: str, start: Optional[pd.Timestamp] = None,
+              period: Optional[str] = None) -> pd.DataFrame:
+        """Ambil bar mulai `start` (inklusif) atau, jika None, sepanjang `period`."""
+        raise NotImplementedError
+
+
+class YFinanceProvider(BarProvider):
+    def __init__(self, timeout: float = 10.0):
+        # Timeout socket per request HTTP, agar panggilan yang macet tidak menahan thread provider selamanya
+        self.timeout = timeout
+
+    def fetch(self, ticker, interval, start=None, period=None):
+        if start is not None:
+            data = yf.download(ticker, start=start, interval=interval, auto_adjust=True, progress=False,
+                               timeout=self.timeout)
+        else:
+            data = yf.download(ticker, period=period, interval=interval, auto_adjust=True, progress=False,
+                               timeout=self.timeout)
+        return normalize_ohlcv(data)
+
+
+class FileBarProvider(BarProvider):
+    """
+    Provider palsu berbasis file untuk pengujian offline.
+    Membaca `{root}/{ticker}_{interval}.csv` (kolom pertama = datetime) atau `.parquet`.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def fetch(self, ticker, interval, start=None, period=None):
+        base = os.path.join(self.root, f"{ticker}_{interval}")
+        if os.path.exists(base + ".parquet"):
+            data = pd.read_parquet(base + ".parquet")
+        elif os.path.exists(base + ".csv"):
+            data = pd.read_csv(base + ".csv", index_col=0, parse_dates=True)
+        else:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        data = normalize_ohlcv(data).sort_index()
+        if start is not None:
+            data = data[data.index >= start]
+        return data
+
+
+def last_session_close(now: datetime) -> datetime:
+    """Waktu penutupan sesi IDX terakhir yang sudah lewat (hari kerja, 16:00 WIB)."""
+    local = now.astimezone(IDX_TIMEZONE)
+    candidate = datetime.combine(local.date(), IDX_SESSION_CLOSE, tzinfo=IDX_TIMEZONE)
+    if local < candidate:
+        candidate -= timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate -= timedelta(days=1)
+    return candidate
+
+
+def is_market_open(now: datetime) -> bool:
+    local = now.astimezone(IDX_TIMEZONE)
+    return local.weekday() < 5 and IDX_SESSION_OPEN <= local.time() < IDX_SESSION_CLOSE
+
+
+def is_bar_closed(timestamp: pd.Timestamp, interval: str, now: datetime) -> bool:
+    """Apakah bar `interval` yang dimulai pada `timestamp` sudah final: durasinya lewat atau sesinya sudah ditutup."""
+    start = timestamp.to_pydatetime()
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=IDX_TIMEZONE)
+    session_close = datetime.combine(start.astimezone(IDX_TIMEZONE).date(), IDX_SESSION_CLOSE, tzinfo=IDX_TIMEZONE)
+    return now >= min(start + INTERVAL_LENGTHS[interval], session_close)
+
+
+def is_current(fetched_at: Optional[datetime], now: datetime, intraday_ttl: float) -> bool:
+    """Apakah data yang diambil pada `fetched_at` masih memuat bar terbaru pada waktu `now`."""
+    if fetched_at is None:
+        return False
+    if is_market_open(now):
+        # Bar berjalan masih berubah selama sesi
+        return (now - fetched_at).total_seconds() <= intraday_ttl
+    return fetched_at >= last_session_close(now)
+
+
+# Rentang unduhan `period` yang dipakai serving; riwayat lebih panjang di store dipotong ke sini
+PERIOD_OFFSETS = {
+    "60d": pd.DateOffset(days=60),
+    "2y": pd.DateOffset(years=2),
+}
+
+
+def trim_to_period(frame: pd.DataFrame, period: str, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    Bar dalam `period` terakhir sampai `end` (default: sekarang), rentang yang sama dengan unduhan
+    `period`. Indikator kumulatif (OBV) bergantung pada awal riwayat, jadi serving dan pelatihan
+    harus memotong riwayat dengan cara yang sama.
+    """
+    if frame.empty:
+        return frame
+    end = pd.Timestamp.now(tz=frame.index.tz) if end is None else end
+    return frame[frame.index >= end - PERIOD_OFFSETS[period]]
+
+
+def last_bar_key(frame: pd.DataFrame) -> Tuple[pd.Timestamp, bytes]:
+    """
+    Identitas bar terakhir `frame`: timestamp dan nilai OHLCV-nya. Bar yang masih berjalan
+    mempertahankan timestamp-nya sementara harga dan volumenya berubah, jadi timestamp saja
+    tidak cukup sebagai versi hasil yang dihitung dari bar tersebut.
+    """
+    values = frame[PRICE_COLUMNS + ["volume"]].iloc[-1].to_numpy(dtype=np.float64)
+    return frame.index[-1], values.tobytes()
+
+
+class BarStore:
+    """
+    Cache bar OHLCV persisten per (ticker, interval) dalam format Parquet.
+    Setiap permintaan hanya mengambil bar setelah timestamp terakhir yang tersimpan,
+    dan kembali ke data cache jika provider lambat atau tidak dapat dihubungi.
+
+    Harga auto_adjust berubah surut setelah dividen atau split, sehingga riwayat yang
+    tersimpan diunduh ulang penuh jika bar jangkar tidak lagi cocok dengan unduhan baru.
+    `on_rewrite(ticker, interval)` dipanggil setiap riwayat yang sudah ada diganti, agar
+    turunan (fitur, forecast) ikut dibuang.
+
+    Panggilan provider yang melewati `fetch_timeout` tetap menempati thread sampai kembali;
+    selama hampir semua thread provider macet, sinkronisasi baru langsung gagal (dan memakai
+    data cache) alih-alih mengantre di belakangnya.
+    """
+
+    def __init__(self, root: str, provider: BarProvider, fetch_timeout: float = 20.0,
+                 intraday_ttl: float = 300.0, adjustment_rtol: float = 1e-4,
+                 on_rewrite: Optional[Callable[[str, str], None]] = None, provider_workers: int = 4):
+        self.root = root
+        self.provider = provider
+        self.fetch_timeout = fetch_timeout
+        self.intraday_ttl = intraday_ttl
+        self.adjustment_rtol = adjustment_rtol
+        self.on_rewrite = on_rewrite
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        self._fetched_at: Dict[Tuple[str, str], datetime] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.provider_workers = max(2, provider_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.provider_workers, thread_name_prefix="bar-provider")
+        # Panggilan provider yang sudah timeout tetapi threadnya masih berjalan
+        self._hung: Set[Future] = set()
+        self._hung_lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, ticker: str, interval: str) -> str:
+        return os.path.join(self.root, f"{ticker}_{interval}.parquet")
+
+    def _read(self, key: Tuple[str, str]) -> Optional[pd.DataFrame]:
+        if key in self._frames:
+            return self._frames[key]
+        path = self._path(*key)
+        if not os.path.exists(path):
+            return None
+        frame = pd.read_parquet(path)
+        self._frames[key] = frame
+        return frame
+
+    def _write(self, key: Tuple[str, str], frame: pd.DataFrame) -> None:
+        path = self._path(*key)
+        tmp_path = f"{path}.tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self._frames[key] = frame
+
+    def is_stale(self, key: Tuple[str, str], now: Optional[datetime] = None) -> bool:
+        return not is_current(self._fetched_at.get(key), now or datetime.now(timezone.utc), self.intraday_ttl)
+
+    def fetched_at(self, ticker: str, interval: str) -> Optional[datetime]:
+        """Waktu terakhir bar (ticker, interval) disinkronkan dengan provider."""
+        return self._fetched_at.get((ticker, interval))
+
+    def peek_last_bar(self, ticker: str, interval: str) -> Optional[Tuple[pd.Timestamp, bytes]]:
+        """last_bar_key() data di memori jika masih segar (tanpa fetch), selain itu None."""
+        key = (ticker, interval)
+        cached = self._frames.get(key)
+        if cached is None or cached.empty or self.is_stale(key):
+            return None
+        return last_bar_key(cached)
+
+    def _fetch(self, ticker: str, interval: str, start=None, period=None) -> pd.DataFrame:
+        with self._hung_lock:
+            hung = len(self._hung)
+        # Sisakan satu thread: jika sisanya macet, jangan mengantre di belakang panggilan yang macet
+        if hung >= self.provider_workers - 1:
+            raise TimeoutError(f"{hung} panggilan provider masih macet; sinkronisasi {ticker} ({interval}) dilewati")
+        future = self._executor.submit(self.provider.fetch, ticker, interval, start=start, period=period)
+        try:
+            return future.result(timeout=self.fetch_timeout)
+        except TimeoutError:
+            # Panggilan yang belum mulai dibatalkan; yang sudah berjalan dicatat sampai threadnya kembali
+            if not future.cancel():
+                with self._hung_lock:
+                    self._hung.add(future)
+                future.add_done_callback(self._on_hung_done)
+            raise
+
+    def _on_hung_done(self, future: Future) -> None:
+        with self._hung_lock:
+            self._hung.discard(future)
+
+    def _merge_new_bars(self, ticker: str, interval: str, cached: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        Gabungkan bar baru ke `cached`, atau None jika bar jangkar berbeda dari unduhan baru
+        (basis penyesuaian harga berubah, riwayat harus diunduh ulang).
+        """
+        # Jangkar = bar kedua terakhir, yang pasti sudah final; bar terakhir bisa masih berjalan
+        # dan memang diambil ulang karena nilainya bisa berubah sampai sesi ditutup
+        anchor = cached.index[-2] if len(cached) > 1 else cached.index[-1]
+        new_bars = self._fetch(ticker, interval, start=anchor)
+        if new_bars.empty:
+            return cached
+        if anchor in new_bars.index and not np.allclose(
+                new_bars.loc[anchor, PRICE_COLUMNS].to_numpy(dtype=float),
+                cached.loc[anchor, PRICE_COLUMNS].to_numpy(dtype=float), rtol=self.adjustment_rtol, equal_nan=True):
+            return None
+        frame = pd.concat([cached[cached.index < anchor], new_bars])
+        return frame[~frame.index.duplicated(keep="last")].sort_index()
+
+    def get_bars(self, ticker: str, interval: str, period: str, max_age: Optional[float] = None) -> pd.DataFrame:
+        """Bar (ticker, interval); `max_age` (detik) memaksa sinkronisasi jika data lebih tua dari itu."""
+        key = (ticker, interval)
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            cached = self._read(key)
+            fetched_at = self._fetched_at.get(key)
+            too_old = max_age is not None and (
+                fetched_at is None or (datetime.now(timezone.utc) - fetched_at).total_seconds() > max_age)
+            if cached is not None and not cached.empty and not self.is_stale(key) and not too_old:
+                return cached
+
+            now = datetime.now(timezone.utc)
+            has_cache = cached is not None and not cached.empty
+            rewritten = False
+            try:
+                frame = None
+                if has_cache:
+                    frame = self._merge_new_bars(ticker, interval, cached)
+                    if frame is None:
+                        print(f"Harga {ticker} ({interval}) disesuaikan ulang (dividen/split). Mengunduh ulang riwayat penuh.")
+                if frame is None:
+                    frame = self._fetch(ticker, interval, period=period)
+                    if has_cache and frame.empty:
+                        frame = cached
+                    else:
+                        rewritten = has_cache
+            except Exception as e:
+                if has_cache:
+                    print(f"Peringatan: provider data gagal untuk {ticker} ({interval}): {e!r}. Menggunakan data cache.")
+                    return cached
+                raise
+
+            if not frame.empty:
+                self._write(key, frame)
+            self._fetched_at[key] = now
+            if rewritten and self.on_rewrite is not None:
+                self.on_rewrite(ticker, interval)
+            return frame
@@ -0,0 +1,681 @@
+import copy
+import math
+import threading
+from collections import OrderedDict, deque
+from sys import float_info
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+FEATURE_COLUMNS = [
+    "open", "high", "low", "close", "volume",
+    "SMA_20", "SMA_50",
+    "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9",
+    "RSI_14",
+    "BBL_20_2.0", "BBM_20_2.0", "BBU_20_2.0", "BBB_20_2.0", "BBP_20_2.0", # Pastikan nama ini sesuai
+    "STOCHk_14_3_3", "STOCHd_14_3_3",
+    "ADX_14", "DMP_14", "DMN_14",
+    "ATRr_14",
+    "OBV",
+    "VWAP_D"
+]
+
+# pandas_ta 0.4.x menamai Bollinger Bands dengan std bawah & atas (BBL_20_2.0_2.0),
+# sedangkan model dilatih dengan nama lama BBL_20_2.0.
+TA_COLUMN_RENAMES = {
+    "BBL_20_2.0_2.0": "BBL_20_2.0",
+    "BBM_20_2.0_2.0": "BBM_20_2.0",
+    "BBU_20_2.0_2.0": "BBU_20_2.0",
+    "BBB_20_2.0_2.0": "BBB_20_2.0",
+    "BBP_20_2.0_2.0": "BBP_20_2.0",
+    "obv": "OBV",
+    "vwap_d": "VWAP_D",
+}
+
+# Sama dengan epsilon yang ditambahkan pandas_ta pada rentang bernilai nol (non_zero_range)
+EPSILON = float_info.epsilon
+NAN = float("nan")
+
+OBV_INDEX = FEATURE_COLUMNS.index("OBV")
+CLOSE_INDEX = FEATURE_COLUMNS.index("close")
+
+
+def compute_features(data: pd.DataFrame) -> pd.DataFrame:
+    """Pipeline pandas_ta: OHLCV -> FEATURE_COLUMNS, lalu ffill, bfill dan isi sisa NaN dengan 0."""
+    df = data.copy()
+
+    df.ta.sma(length=20, append=True)
+    df.ta.sma(length=50, append=True)
+    df.ta.macd(append=True)
+    df.ta.rsi(append=True)
+    df.ta.bbands(length=20, std=2.0, append=True)
+    df.ta.stoch(append=True)
+    df.ta.adx(append=True)
+    df.ta.atr(append=True)
+    df['obv'] = ta.obv(df['close'], df['volume'])
+    df['vwap_d'] = ta.vwap(df['high'], df['low'], df['close'], df['volume'])
+
+    df.rename(columns=TA_COLUMN_RENAMES, inplace=True)
+
+    for col in FEATURE_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+            print(f"Peringatan: Kolom '{col}' tidak ditemukan setelah perhitungan TA.")
+
+    return df[FEATURE_COLUMNS].ffill().bfill().fillna(0)
+
+
+def feature_window(data: pd.DataFrame, n: int) -> Tuple[list, np.ndarray]:
+    """`n` baris fitur terakhir lewat compute_features. Fungsi level modul agar bisa dijalankan di process pool."""
+    df = compute_features(data)
+    return list(df.index[-n:]), df.tail(n).to_numpy()
+
+
+# --- Engine indikator inkremental ---
+# Setiap kelas di bawah menyimpan state bergulir satu indikator dan mereplikasi
+# rumus pandas_ta yang dipakai compute_features, satu bar per pemanggilan update().
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Pembagian dengan semantik pandas: 0/0 -> NaN, x/0 -> +-inf."""
+    if denominator == 0:
+        if numerator == 0 or math.isnan(numerator):
+            return NAN
+        return math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+def _non_zero(value: float) -> float:
+    return value + EPSILON if value == 0 else value
+
+
+class _Ewm:
+    """ewm(alpha, adjust=False).mean(); dimulai dari observasi valid pertama."""
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value = NAN
+        self.gap = 0
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            if not math.isnan(self.value):
+                self.gap += 1
+            return self.value
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            decay = (1.0 - self.alpha) ** (self.gap + 1)
+            self.value = decay * self.value + (1.0 - decay) * x
+        self.gap = 0
+        return self.value
+
+
+class _SeededEwm:
+    """EMA/RMA pandas_ta dengan presma: nilai ke-n adalah SMA n nilai pertama, setelahnya ewm."""
+
+    def __init__(self, length: int, alpha: float):
+        self.length = length
+        self.position = 0
+        self.seed_total = 0.0
+        self.seed_count = 0
+        self.ewm = _Ewm(alpha)
+
+    def update(self, x: float) -> float:
+        if self.position < self.length:
+            self.position += 1
+            if not math.isnan(x):
+                self.seed_total += x
+                self.seed_count += 1
+            if self.position < self.length:
+                return NAN
+            x = self.seed_total / self.seed_count if self.seed_count else NAN
+        return self.ewm.update(x)
+
+
+class _RollingWindow:
+    """Jendela bergulir dengan jumlah dan jumlah kuadrat berjalan (SMA dan varians ddof=1)."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.values = deque(maxlen=length)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    def update(self, x: float) -> None:
+        if len(self.values) == self.length:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(x)
+        self.total += x
+        self.total_sq += x * x
+        self.updates += 1
+        # Hitung ulang setiap satu putaran jendela agar galat pembulatan tidak menumpuk
+        if self.updates % self.length == 0:
+            self.total = math.fsum(self.values)
+            self.total_sq = math.fsum(v * v for v in self.values)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.length
+
+    def mean(self) -> float:
+        return self.total / self.length if self.full else NAN
+
+    def std(self) -> float:
+        if not self.full:
+            return NAN
+        variance = (self.total_sq - self.total * self.total / self.length) / (self.length - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class _RollingExtreme:
+    """Minimum/maksimum bergulir dengan deque monoton (amortized O(1))."""
+
+    def __init__(self, length: int, maximum: bool):
+        self.length = length
+        self.maximum = maximum
+        self.candidates = deque()
+        self.position = 0
+
+    def update(self, x: float) -> float:
+        if self.maximum:
+            while self.candidates and self.candidates[-1][1] <= x:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= x:
+                self.candidates.pop()
+        self.candidates.append((self.position, x))
+        if self.candidates[0][0] <= self.position - self.length:
+            self.candidates.popleft()
+        self.position += 1
+        return self.candidates[0][1] if self.position >= self.length else NAN
+
+
+class _Sma:
+    """SMA yang mulai diisi dari nilai valid pertama (seperti `series.loc[first_valid_index():]`)."""
+
+    def __init__(self, length: int):
+        self.window = _RollingWindow(length)
+
+    def update(self, x: float) -> float:
+        if math.isnan(x) and not self.window.values:
+            return NAN
+        self.window.update(x)
+        return self.window.mean()
+
+
+class _IndicatorState:
+    """State semua indikator FEATURE_COLUMNS untuk satu (ticker, interval)."""
+
+    def __init__(self):
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+
+        self.sma_20 = _RollingWindow(20)
+        self.sma_50 = _RollingWindow(50)
+        self.ema_fast = _SeededEwm(12, 2.0 / 13)
+        self.ema_slow = _SeededEwm(26, 2.0 / 27)
+        self.macd_signal = _SeededEwm(9, 2.0 / 10)
+        self.macd_started = False
+        self.rsi_up = _Ewm(1.0 / 14)
+        self.rsi_down = _Ewm(1.0 / 14)
+        self.stoch_low = _RollingExtreme(14, maximum=False)
+        self.stoch_high = _RollingExtreme(14, maximum=True)
+        self.stoch_k = _Sma(3)
+        self.stoch_d = _Sma(3)
+        # df.ta.atr() memakai TR bar pertama (high - low); ATR di dalam adx() membuangnya (prenan)
+        self.atr = _SeededEwm(14, 1.0 / 14)
+        self.adx_atr = _SeededEwm(14, 1.0 / 14)
+        self.dm_plus = _Ewm(1.0 / 14)
+        self.dm_minus = _Ewm(1.0 / 14)
+        self.adx = _Ewm(1.0 / 14)
+        self.obv_total = 0.0
+        self.vwap_day = None
+        self.vwap_price_volume = 0.0
+        self.vwap_volume = 0.0
+
+        self.last_valid = np.full(len(FEATURE_COLUMNS), np.nan)
+
+    def step(self, timestamp: pd.Timestamp, open_: float, high: float, low: float,
+             close: float, volume: float) -> np.ndarray:
+        prev_high, prev_low, prev_close = self.prev_high, self.prev_low, self.prev_close
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        # SMA & Bollinger Bands
+        self.sma_20.update(close)
+        self.sma_50.update(close)
+        sma_20 = self.sma_20.mean()
+        sma_50 = self.sma_50.mean()
+        band = 2.0 * self.sma_20.std()
+        bb_lower, bb_upper = sma_20 - band, sma_20 + band
+        bb_range = _non_zero(bb_upper - bb_lower)
+        bb_width = _divide(100.0 * bb_range, sma_20)
+        bb_percent = _divide(_non_zero(close - bb_lower), bb_range)
+
+        # MACD: sinyal adalah EMA dari MACD mulai nilai valid pertamanya
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        macd_signal = NAN
+        if self.macd_started or not math.isnan(macd):
+            self.macd_started = True
+            macd_signal = self.macd_signal.update(macd)
+        macd_hist = macd - macd_signal
+
+        # RSI (Wilder / RMA)
+        change = close - prev_close
+        up = self.rsi_up.update(max(change, 0.0) if not math.isnan(change) else NAN)
+        down = self.rsi_down.update(min(change, 0.0) if not math.isnan(change) else NAN)
+        rsi = _divide(100.0 * up, up + abs(down))
+
+        # Stochastic
+        lowest = self.stoch_low.update(low)
+        highest = self.stoch_high.update(high)
+        stoch = _divide(100.0 * (close - lowest), _non_zero(highest - lowest))
+        stoch_k = self.stoch_k.update(stoch)
+        stoch_d = self.stoch_d.update(stoch_k)
+
+        # True range, ATR dan ADX
+        high_low = _non_zero(high - low)
+        if math.isnan(prev_close):
+            true_range = abs(high_low)
+        else:
+            true_range = max(abs(high_low), abs(high - prev_close), abs(prev_close - low))
+        atr = self.atr.update(true_range)
+        adx_atr = self.adx_atr.update(NAN if math.isnan(prev_close) else true_range)
+
+        move_up = high - prev_high
+        move_down = prev_low - low
+        if math.isnan(move_up) or math.isnan(move_down):
+            dm_plus = dm_minus = NAN
+        else:
+            dm_plus = move_up if move_up > move_down and move_up > 0 else 0.0
+            dm_minus = move_down if move_down > move_up and move_down > 0 else 0.0
+            dm_plus = 0.0 if abs(dm_plus) < EPSILON else dm_plus
+            dm_minus = 0.0 if abs(dm_minus) < EPSILON else dm_minus
+        scale = _divide(100.0, adx_atr)
+        dmp = scale * self.dm_plus.update(dm_plus)
+        dmn = scale * self.dm_minus.update(dm_minus)
+        dx = _divide(100.0 * abs(dmp - dmn), dmp + dmn)
+        adx = self.adx.update(dx)
+
+        # OBV kumulatif sejak bar pertama engine; bar pertama tidak punya arah (NaN)
+        if math.isnan(prev_close):
+            obv = NAN
+        else:
+            direction = 1.0 if close > prev_close else -1.0 if close < prev_close else 0.0
+            self.obv_total += direction * volume
+            obv = self.obv_total
+
+        # VWAP dengan anchor harian (tanggal lokal bar)
+        day = timestamp.date()
+        if day != self.vwap_day:
+            self.vwap_day = day
+            self.vwap_price_volume = 0.0
+            self.vwap_volume = 0.0
+        self.vwap_price_volume += (high + low + close) / 3.0 * volume
+        self.vwap_volume += volume
+        vwap = _divide(self.vwap_price_volume, self.vwap_volume)
+
+        row = np.array([
+            open_, high, low, close, volume,
+            sma_20, sma_50,
+            macd, macd_hist, macd_signal,
+            rsi,
+            bb_lower, sma_20, bb_upper, bb_width, bb_percent,
+            stoch_k, stoch_d,
+            adx, dmp, dmn,
+            atr,
+            obv,
+            vwap,
+        ])
+        # ffill per kolom
+        valid = ~np.isnan(row)
+        self.last_valid[valid] = row[valid]
+        return self.last_valid.copy()
+
+
+class IncrementalFeatures:
+    """
+    Engine FEATURE_COLUMNS inkremental untuk satu (ticker, interval).
+    update() menambah satu bar dalam O(1) tanpa menghitung ulang riwayat; bar dengan
+    timestamp yang sama dengan bar terakhir menggantikannya (bar berjalan yang direvisi).
+    """
+
+    def __init__(self, history: int = 60, obv_marks: int = 4096):
+        self._state = _IndicatorState()
+        self._previous: Optional[_IndicatorState] = None
+        self.rows = deque(maxlen=history)
+        # Nilai OBV kumulatif per timestamp, untuk memindahkan basis OBV ke awal jendela data
+        self._obv_marks: "OrderedDict[pd.Timestamp, float]" = OrderedDict()
+        self._obv_marks_max = obv_marks
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self.count = 0
+
+    def update(self, timestamp: pd.Timestamp, open_: float, high: float, low: float,
+               close: float, volume: float, revisable: bool = True) -> np.ndarray:
+        if self.last_timestamp is not None:
+            if timestamp == self.last_timestamp:
+                if self._previous is None:
+                    raise ValueError(f"Bar {timestamp} tidak dapat direvisi.")
+                self._state = self._previous
+                self.rows.pop()
+                self._obv_marks.popitem()
+                self.count -= 1
+            elif timestamp < self.last_timestamp:
+                raise ValueError(f"Bar {timestamp} lebih lama dari bar terakhir {self.last_timestamp}.")
+
+        self._previous = copy.deepcopy(self._state) if revisable else None
+        row = self._state.step(timestamp, float(open_), float(high), float(low), float(close), float(volume))
+
+        self.rows.append((timestamp, row))
+        self._obv_marks[timestamp] = self._state.obv_total
+        if len(self._obv_marks) > self._obv_marks_max:
+            self._obv_marks.popitem(last=False)
+        self.last_timestamp = timestamp
+        self.count += 1
+        return row
+
+    def extend(self, bars: pd.DataFrame) -> None:
+        """Masukkan banyak bar sekaligus; hanya bar terakhir yang dapat direvisi."""
+        values = bars[["open", "high", "low", "close", "volume"]].to_numpy(dtype=float)
+        last = len(values) - 1
+        for i, (timestamp, bar) in enumerate(zip(bars.index, values)):
+            self.update(timestamp, *bar, revisable=(i == last))
+
+    def has_origin(self, origin: pd.Timestamp) -> bool:
+        return origin in self._obv_marks
+
+    def window(self, n: int, origin: Optional[pd.Timestamp] = None) -> Tuple[list, np.ndarray]:
+        """
+        n baris fitur terakhir (urutan FEATURE_COLUMNS). Jika `origin` diberikan, OBV dihitung
+        relatif terhadap bar tersebut, sama seperti pandas_ta pada data yang dimulai di `origin`.
+        """
+        rows = list(self.rows)[-n:]
+        timestamps = [timestamp for timestamp, _ in rows]
+        matrix = np.array([row for _, row in rows]) if rows else np.empty((0, len(FEATURE_COLUMNS)))
+        if origin is not None and rows:
+            matrix[:, OBV_INDEX] -= self._obv_marks[origin]
+        # Sisa NaN hanya ada sebelum indikator memiliki cukup data (bfill lalu 0)
+        if np.isnan(matrix).any():
+            matrix = pd.DataFrame(matrix).bfill().fillna(0).to_numpy()
+        return timestamps, matrix
+
+
+class FeatureEngineCache:
+    """Engine IncrementalFeatures per (ticker, interval) dengan batas jumlah (LRU)."""
+
+    def __init__(self, max_engines: int = 256, history: int = 60):
+        self.max_engines = max_engines
+        self.history = history
+        self._engines: "OrderedDict[Tuple[str, str], IncrementalFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.stats: Dict[str, int] = {"rebuilds": 0, "incremental": 0, "appended_bars": 0}
+
+    def window(self, key: Tuple[str, str], bars: pd.DataFrame, n: int) -> Tuple[list, np.ndarray]:
+        """
+        Fitur n bar terakhir dari `bars` (OHLCV terurut). Engine yang ada hanya diberi bar sejak
+        bar terakhir yang sudah diproses; dibangun ulang jika riwayatnya tidak lagi cocok.
+        """
+        origin = bars.index[0]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Kunci per ticker: ticker berbeda dapat dihitung paralel dari beberapa thread
+        with key_lock:
+            with self._lock:
+                engine = self._engines.get(key)
+            if engine is not None and (engine.last_timestamp not in bars.index or not engine.has_origin(origin)):
+                engine = None
+
+            if engine is None:
+                engine = IncrementalFeatures(history=max(self.history, n))
+                engine.extend(bars)
+                stat, appended = "rebuilds", 0
+            else:
+                new_bars = bars[bars.index >= engine.last_timestamp]
+                engine.extend(new_bars)
+                stat, appended = "incremental", len(new_bars)
+            result = engine.window(n, origin=origin)
+
+        with self._lock:
+            self.stats[stat] += 1
+            self.stats["appended_bars"] += appended
+            self._engines[key] = engine
+            self._engines.move_to_end(key)
+            while len(self._engines) > self.max_engines:
+                evicted, _ = self._engines.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+        return result
+
+    def invalidate(self, ticker: str) -> None:
+        """Buang semua engine `ticker` (misalnya setelah riwayat harganya diunduh ulang)."""
+        with self._lock:
+            for key in [key for key in self._engines if key[0] == ticker]:
+                del self._engines[key]
+
+
+# --- Builder batch NumPy ---
+# build_feature_tensor menghitung FEATURE_COLUMNS untuk banyak ticker sekaligus dari array
+# (tickers x waktu x OHLCV). Semua indikator divektorisasi lintas ticker; hanya rekursi
+# EWM yang berjalan per langkah waktu. Hasilnya sama dengan compute_features per ticker.
+
+def stack_bars(frames) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Susun DataFrame OHLCV (satu per ticker) menjadi array (tickers, waktu, 5) rata kanan.
+    Ticker dengan riwayat lebih pendek diberi padding NaN di depan. Juga mengembalikan
+    id sesi harian (tickers, waktu) untuk VWAP_D.
+    """
+    length = max(len(frame) for frame in frames)
+    bars = np.full((len(frames), length, 5), np.nan)
+    sessions = np.full((len(frames), length), -1, dtype=np.int64)
+    for i, frame in enumerate(frames):
+        n = len(frame)
+        bars[i, length - n:] = frame[["open", "high", "low", "close", "volume"]].to_numpy(dtype=float)
+        index = frame.index.tz_localize(None) if frame.index.tz is not None else frame.index
+        sessions[i, length - n:] = index.normalize().asi8
+    return bars, sessions
+
+
+def _shift(x: np.ndarray) -> np.ndarray:
+    shifted = np.empty_like(x)
+    shifted[:, 0] = np.nan
+    shifted[:, 1:] = x[:, :-1]
+    return shifted
+
+
+def _non_zero_array(x: np.ndarray) -> np.ndarray:
+    return np.where(x == 0, EPSILON, x)
+
+
+def _rolling(x: np.ndarray, length: int, reducer) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= length:
+        windows = np.lib.stride_tricks.sliding_window_view(x, length, axis=1)
+        out[:, length - 1:] = reducer(windows, axis=-1)
+    return out
+
+
+def _window_means_at(x: np.ndarray, end: np.ndarray, length: int, skip_first: int = 0) -> np.ndarray:
+    """Rata-rata x[k, end-length+1+skip_first .. end] per ticker (NaN jika end di luar array)."""
+    means = np.full(x.shape[0], np.nan)
+    usable = end < x.shape[1]
+    if usable.any():
+        rows = np.nonzero(usable)[0]
+        columns = end[usable, None] - length + 1 + np.arange(skip_first, length)
+        means[usable] = x[rows[:, None], columns].mean(axis=1)
+    return means
+
+
+def _seed_array(shape, position: np.ndarray, values: np.ndarray) -> np.ndarray:
+    seed = np.full(shape, np.nan)
+    usable = position < shape[1]
+    seed[np.nonzero(usable)[0], position[usable]] = values[usable]
+    return seed
+
+
+def _ewm_rows(x: np.ndarray, alpha: np.ndarray, seed: np.ndarray) -> np.ndarray:
+    """
+    Rekursi ewm(alpha, adjust=False) per baris, sama dengan _Ewm/_SeededEwm.
+    Sebelum baris dimulai, nilai diambil dari `seed` (NaN sampai posisi seed untuk presma,
+    atau x itu sendiri untuk ewm biasa); setelahnya rekursi berlanjut dengan x.
+    """
+    rows, steps = x.shape
+    out = np.empty_like(x)
+    value = np.full(rows, np.nan)
+    gap = np.zeros(rows)
+    keep = 1.0 - alpha
+    for t in range(steps):
+        started = ~np.isnan(value)
+        current = np.where(started, x[:, t], seed[:, t])
+        observed = ~np.isnan(current)
+        decay = keep ** (gap + 1)
+        value = np.where(observed, np.where(started, decay * value + (1.0 - decay) * current, current), value)
+        gap = np.where(observed | ~started, 0.0, gap + 1.0)
+        out[:, t] = value
+    return out
+
+
+def _fill(features: np.ndarray, padded: np.ndarray) -> np.ndarray:
+    """ffill lalu bfill sepanjang sumbu waktu, baris padding dan sisa NaN menjadi 0."""
+    steps = features.shape[1]
+    positions = np.arange(steps)[None, :, None]
+    missing = np.isnan(features)
+    forward = np.maximum.accumulate(np.where(missing, 0, positions), axis=1)
+    features = np.take_along_axis(features, forward, axis=1)
+    missing = np.isnan(features)
+    backward = np.minimum.accumulate(np.where(missing, steps - 1, positions)[:, ::-1], axis=1)[:, ::-1]
+    features = np.take_along_axis(features, backward, axis=1)
+    features[padded] = 0.0
+    return np.nan_to_num(features, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+
+def build_feature_tensor(bars: np.ndarray, sessions: Optional[np.ndarray] = None,
+                         dtype=np.float32) -> np.ndarray:
+    """
+    FEATURE_COLUMNS untuk array bars (tickers, waktu, 5: open, high, low, close, volume).
+
+    Riwayat yang lebih pendek boleh diberi padding NaN di depan (lihat stack_bars); baris padding
+    bernilai 0 pada hasil. `sessions` (waktu,) atau (tickers, waktu) berisi id hari untuk
+    anchor VWAP_D; jika None setiap bar dianggap satu sesi (data harian).
+    Mengembalikan tensor C-contiguous (tickers, waktu, len(FEATURE_COLUMNS)).
+    """
+    bars = np.asarray(bars, dtype=float)
+    if bars.ndim != 3 or bars.shape[2] != 5:
+        raise ValueError(f"bars harus berbentuk (tickers, waktu, 5), bukan {bars.shape}.")
+    tickers, steps, _ = bars.shape
+    open_, high, low, close, volume = (bars[:, :, i] for i in range(5))
+
+    padded = np.isnan(close)
+    start = np.argmax(~padded, axis=1)
+    start[padded.all(axis=1)] = steps
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # SMA & Bollinger Bands (std ddof=1)
+        sma_20 = _rolling(close, 20, np.mean)
+        sma_50 = _rolling(close, 50, np.mean)
+        band = 2.0 * _rolling(close, 20, lambda w, axis: np.std(w, axis=axis, ddof=1))
+        bb_lower, bb_upper = sma_20 - band, sma_20 + band
+        bb_range = _non_zero_array(bb_upper - bb_lower)
+        bb_width = 100.0 * bb_range / sma_20
+        bb_percent = _non_zero_array(close - bb_lower) / bb_range
+
+        # True range; ATR adx() membuang TR bar pertama (prenan)
+        previous_close = _shift(close)
+        high_low = _non_zero_array(high - low)
+        true_range = np.fmax(np.abs(high_low), np.fmax(np.abs(high - previous_close), np.abs(previous_close - low)))
+        true_range_prenan = np.where(np.isnan(previous_close), np.nan, true_range)
+
+        change = close - previous_close
+        move_up = high - _shift(high)
+        move_down = _shift(low) - low
+        invalid_move = np.isnan(move_up) | np.isnan(move_down)
+        dm_plus = np.where((move_up > move_down) & (move_up > 0), move_up, 0.0)
+        dm_minus = np.where((move_down > move_up) & (move_down > 0), move_down, 0.0)
+        dm_plus = np.where(invalid_move, np.nan, np.where(np.abs(dm_plus) < EPSILON, 0.0, dm_plus))
+        dm_minus = np.where(invalid_move, np.nan, np.where(np.abs(dm_minus) < EPSILON, 0.0, dm_minus))
+
+        # Semua rekursi tahap pertama dalam satu loop waktu
+        recursions = [
+            # (input, alpha, seed)
+            (close, 2.0 / 13, _seed_array(close.shape, start + 11, _window_means_at(close, start + 11, 12))),
+            (close, 2.0 / 27, _seed_array(close.shape, start + 25, _window_means_at(close, start + 25, 26))),
+            (np.where(np.isnan(change), np.nan, np.maximum(change, 0.0)), 1.0 / 14, None),
+            (np.where(np.isnan(change), np.nan, np.minimum(change, 0.0)), 1.0 / 14, None),
+            (true_range, 1.0 / 14, _seed_array(close.shape, start + 13, _window_means_at(true_range, start + 13, 14))),
+            (true_range_prenan, 1.0 / 14,
+             _seed_array(close.shape, start + 13, _window_means_at(true_range, start + 13, 14, skip_first=1))),
+            (dm_plus, 1.0 / 14, None),
+            (dm_minus, 1.0 / 14, None),
+        ]
+        stacked = _ewm_rows(
+            np.concatenate([x for x, _, _ in recursions]),
+            np.repeat([alpha for _, alpha, _ in recursions], tickers),
+            np.concatenate([x if seed is None else seed for x, _, seed in recursions]),
+        )
+        ema_fast, ema_slow, rsi_up, rsi_down, atr, adx_atr, dm_plus_avg, dm_minus_avg = np.split(stacked, len(recursions))
+
+        macd = ema_fast - ema_slow
+        rsi = 100.0 * rsi_up / (rsi_up + np.abs(rsi_down))
+        dmp = 100.0 / adx_atr * dm_plus_avg
+        dmn = 100.0 / adx_atr * dm_minus_avg
+        dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+
+        # Tahap kedua: sinyal MACD (EMA 9 dari MACD valid) dan ADX (RMA dari DX)
+        macd_start = start + 25
+        signal_seed = _seed_array(close.shape, macd_start + 8, _window_means_at(macd, macd_start + 8, 9))
+        stacked = _ewm_rows(
+            np.concatenate([macd, dx]),
+            np.repeat([2.0 / 10, 1.0 / 14], tickers),
+            np.concatenate([signal_seed, dx]),
+        )
+        macd_signal, adx = np.split(stacked, 2)
+        macd_hist = macd - macd_signal
+
+        # Stochastic
+        lowest = _rolling(low, 14, np.min)
+        highest = _rolling(high, 14, np.max)
+        stoch = 100.0 * (close - lowest) / _non_zero_array(highest - lowest)
+        stoch_k = _rolling(stoch, 3, np.mean)
+        stoch_d = _rolling(stoch_k, 3, np.mean)
+
+        # OBV: kumulatif arah * volume sejak bar kedua setiap ticker
+        direction = np.sign(np.nan_to_num(change))
+        obv = np.cumsum(np.where(np.isnan(change), 0.0, direction * volume), axis=1)
+        obv[np.isnan(change)] = np.nan
+
+        # VWAP dengan anchor harian
+        price_volume = np.nan_to_num((high + low + close) / 3.0 * volume)
+        volume_filled = np.nan_to_num(volume)
+        if sessions is None:
+            vwap = price_volume / volume_filled
+        else:
+            sessions = np.broadcast_to(sessions, close.shape)
+            new_session = np.ones(close.shape, dtype=bool)
+            new_session[:, 1:] = sessions[:, 1:] != sessions[:, :-1]
+            session_start = np.maximum.accumulate(np.where(new_session, np.arange(steps), 0), axis=1)
+            cumulative_pv = np.cumsum(price_volume, axis=1)
+            cumulative_volume = np.cumsum(volume_filled, axis=1)
+            before_pv = np.take_along_axis(cumulative_pv, session_start, axis=1) - np.take_along_axis(price_volume, session_start, axis=1)
+            before_volume = np.take_along_axis(cumulative_volume, session_start, axis=1) - np.take_along_axis(volume_filled, session_start, axis=1)
+            vwap = (cumulative_pv - before_pv) / (cumulative_volume - before_volume)
+        vwap[padded] = np.nan
+
+        features = np.stack([
+            open_, high, low, close, volume,
+            sma_20, sma_50,
+            macd, macd_hist, macd_signal,
+            rsi,
+            bb_lower, sma_20, bb_upper, bb_width, bb_percent,
+            stoch_k, stoch_d,
+            adx, dmp, dmn,
+            atr,
+            obv,
+            vwap,
+        ], axis=-1)
+
+    return np.ascontiguousarray(_fill(features, padded), dtype=dtype)
@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ForecastCache:
+    """
+    Cache hasil forecast per (ticker, timeframe), LRU dengan jumlah entri terbatas.
+
+    Setiap entri menyimpan versi yang menghasilkannya (timestamp dan nilai OHLCV bar input
+    terakhir, dan versi file model). Hasil hanya dipakai ulang jika versinya sama persis, sehingga
+    bar baru, bar berjalan yang berubah, atau file model baru membuat entri lama tidak berlaku.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Hashable, Any, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str], version: Hashable) -> Optional[Tuple[Any, bytes]]:
+        """Kembalikan (hasil, body JSON) jika tersimpan untuk `version`, selain itu None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: Tuple[str, str], version: Hashable, result: Any, body: bytes) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None and previous[0] != version:
+                self.invalidations += 1
+            self._entries[key] = (version, result, body)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, ticker: str) -> None:
+        """Buang semua entri `ticker`, untuk perubahan data yang tidak mengubah versinya."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == ticker]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,64 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+
+class ForecastStore:
+    """
+    Forecast hasil prekomputasi per (ticker, timeframe), satu file JSON per entri di `root`.
+    Semua entri dibaca ke memori saat inisialisasi, sehingga get() tidak menyentuh disk.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        for filename in os.listdir(root):
+            if filename.endswith(".json"):
+                try:
+                    with open(os.path.join(root, filename)) as f:
+                        self._remember(json.load(f))
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Peringatan: entri forecast store '{filename}' tidak dapat dibaca: {e!r}")
+
+    def _path(self, key: Tuple[str, str]) -> str:
+        return os.path.join(self.root, f"{key[0]}_{key[1]}.json")
+
+    def _remember(self, record: Dict[str, Any], body: Optional[bytes] = None) -> None:
+        key = (record["ticker"], record["timeframe"])
+        entry = {
+            "model_version": record["model_version"],
+            "last_bar": record["last_bar"],
+            "fetched_at": datetime.fromisoformat(record["fetched_at"]),
+            "body": body if body is not None else json.dumps(record["forecast"]).encode(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: Tuple[str, str], model_version: str, last_bar: str, fetched_at: datetime, body: bytes) -> None:
+        """Simpan forecast (body JSON ForecastResponse); file ditulis atomik."""
+        record = {
+            "ticker": key[0],
+            "timeframe": key[1],
+            "model_version": model_version,
+            "last_bar": last_bar,
+            "fetched_at": fetched_at.isoformat(),
+            "forecast": json.loads(body),
+        }
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+        self._remember(record, body)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
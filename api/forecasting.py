@@ -1,14 +1,38 @@
 import os
+import json
+import hashlib
+import hmac
+import time
+import asyncio
+import threading
+import multiprocessing
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from functools import partial
 import numpy as np
 import joblib
 import tensorflow as tf
 from tensorflow.keras.models import load_model
-from typing import List, Dict, Tuple, Any
-from fastapi import FastAPI, HTTPException
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Tuple, Any, Optional, Union, Literal
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-import yfinance as yf
 import pandas as pd
-import pandas_ta as ta
+
+from api.admission import AdmissionController
+from api.backtest import BacktestCache, run_backtest, training_cutoff
+from api.bar_store import (BarStore, YFinanceProvider, FileBarProvider, is_bar_closed, is_current, last_bar_key,
+                           trim_to_period)
+from api.features import FEATURE_COLUMNS, FeatureEngineCache, build_feature_tensor, feature_window, stack_bars
+from api.forecast_cache import ForecastCache
+from api.forecast_store import ForecastStore
+from api.inference import MicroBatcher
+from api.precompute import PrecomputeScheduler
+from api.shared_model import SHARED_MODEL_PREFIX, TickerView, load_shared_bundle, load_shared_model, shared_model_paths
+from api.streaming import ForecastStreamHub, next_poll_delay
+from api.tflite_runtime import TFLITE_VARIANTS, TFLiteModel, tflite_model_path
 
 from fastapi.middleware.cors import CORSMiddleware 
 
@@ -18,23 +42,97 @@ N_STEPS_IN = 60 # Panjang sekuens input (historical look-back period)
 N_HORIZONS = 3  # Jumlah horizon prediksi (t+1, t+2, t+3)
 TARGET_COLUMN_NAME = "close"
 
-FEATURE_COLUMNS = [
-    "open", "high", "low", "close", "volume",
-    "SMA_20", "SMA_50",
-    "MACD_12_26_9", "MACDh_12_26_9", "MACDs_12_26_9",
-    "RSI_14",
-    "BBL_20_2.0", "BBM_20_2.0", "BBU_20_2.0", "BBB_20_2.0", "BBP_20_2.0", # Pastikan nama ini sesuai
-    "STOCHk_14_3_3", "STOCHd_14_3_3",
-    "ADX_14", "DMP_14", "DMN_14",
-    "ATRr_14",
-    "OBV",
-    "VWAP_D"
-]
+# Cache model: jumlah maksimum model di memori, batas memori (MB, 0 = tanpa batas),
+# dan daftar model yang dimuat saat startup (contoh: "BBCA,BBRI_1d")
+MODEL_CACHE_MAX_MODELS = int(os.environ.get("MODEL_CACHE_MAX_MODELS", "8"))
+MODEL_CACHE_MAX_BYTES = int(float(os.environ.get("MODEL_CACHE_MAX_MB", "0")) * 1024 * 1024)
+MODEL_PRELOAD_TICKERS = [t.strip() for t in os.environ.get("MODEL_PRELOAD_TICKERS", "").split(",") if t.strip()]
+
+# Hot reload: interval (detik) pemeriksaan file model yang dimuat (0 = hanya lewat POST /models/reload),
+# dan umur minimum file sebelum dimuat, agar pasangan model/scaler yang sedang disalin tidak terbaca setengah jadi
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "10"))
+MODEL_RELOAD_SETTLE_SECONDS = float(os.environ.get("MODEL_RELOAD_SETTLE_SECONDS", "2"))
+
+# Backend inferensi: "keras" (load_model) atau "tflite" (file hasil scripts/convert_tflite.py).
+# TFLITE_VARIANT memilih float32/float16/dynamic/int8; model tanpa file .tflite tetap dimuat dengan Keras.
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras")
+TFLITE_VARIANT = os.environ.get("TFLITE_VARIANT", "dynamic")
+TFLITE_THREADS = int(os.environ.get("TFLITE_THREADS", "1"))
+if MODEL_BACKEND not in ("keras", "tflite"):
+    raise ValueError(f"MODEL_BACKEND '{MODEL_BACKEND}' tidak dikenal. Pilihan: keras, tflite")
+if TFLITE_VARIANT not in TFLITE_VARIANTS:
+    raise ValueError(f"TFLITE_VARIANT '{TFLITE_VARIANT}' tidak dikenal. Pilihan: {', '.join(TFLITE_VARIANTS)}")
+
+# Keluarga model: "per_ticker" (lstm_model_{TICKER}_{TIMEFRAME}.keras) atau "shared" (satu model
+# shared_lstm_{TIMEFRAME}.keras dengan embedding ticker, lihat scripts/train_shared_lstm.py).
+# Model bersama selalu dijalankan dengan Keras.
+MODEL_FAMILY = os.environ.get("MODEL_FAMILY", "per_ticker")
+if MODEL_FAMILY not in ("per_ticker", "shared"):
+    raise ValueError(f"MODEL_FAMILY '{MODEL_FAMILY}' tidak dikenal. Pilihan: per_ticker, shared")
+
+# Cache bar OHLCV lokal. Jika BAR_PROVIDER_DIR diisi, bar dibaca dari file
+# ({ticker}_{interval}.csv/.parquet) alih-alih yfinance, untuk pengujian offline.
+BAR_STORE_DIR = os.environ.get("BAR_STORE_DIR", "data/bars")
+BAR_PROVIDER_DIR = os.environ.get("BAR_PROVIDER_DIR")
+BAR_FETCH_TIMEOUT = float(os.environ.get("BAR_FETCH_TIMEOUT", "20"))
+BAR_INTRADAY_TTL = float(os.environ.get("BAR_INTRADAY_TTL", "300"))
+
+# Perhitungan fitur: "incremental" (state indikator per ticker) atau "pandas_ta" (hitung ulang penuh)
+FEATURE_ENGINE = os.environ.get("FEATURE_ENGINE", "incremental")
+FEATURE_ENGINE_MAX_TICKERS = int(os.environ.get("FEATURE_ENGINE_MAX_TICKERS", "256"))
+# Pool perhitungan fitur: "thread" atau "process". Engine inkremental menyimpan state di memori
+# proses API, jadi "process" hanya berlaku untuk FEATURE_ENGINE=pandas_ta (perhitungan penuh tanpa state).
+FEATURE_POOL = os.environ.get("FEATURE_POOL", "thread")
+if FEATURE_POOL not in ("thread", "process"):
+    raise ValueError(f"FEATURE_POOL '{FEATURE_POOL}' tidak dikenal. Pilihan: thread, process")
+if FEATURE_POOL == "process" and FEATURE_ENGINE != "pandas_ta":
+    raise ValueError("FEATURE_POOL=process hanya dapat dipakai dengan FEATURE_ENGINE=pandas_ta.")
+
+# Forecast batch: jumlah ticker maksimum, fetch paralel per batch, dan ukuran pool fetch/fitur
+MAX_FORECAST_BATCH = int(os.environ.get("MAX_FORECAST_BATCH", "100"))
+FORECAST_BATCH_CONCURRENCY = int(os.environ.get("FORECAST_BATCH_CONCURRENCY", "6"))
+FORECAST_FETCH_WORKERS = int(os.environ.get("FORECAST_FETCH_WORKERS", "8"))
+FORECAST_FEATURE_WORKERS = int(os.environ.get("FORECAST_FEATURE_WORKERS", "4"))
+
+# Cache hasil forecast per (ticker, timeframe); dipakai ulang selama bar terakhir dan file model sama
+FORECAST_CACHE_MAX_ENTRIES = int(os.environ.get("FORECAST_CACHE_MAX_ENTRIES", "512"))
+
+# Micro-batching inferensi: jendela tunggu (ms), ukuran batch maksimum, dan jumlah thread inferensi
+INFERENCE_BATCH_WAIT_MS = float(os.environ.get("INFERENCE_BATCH_WAIT_MS", "5"))
+INFERENCE_BATCH_MAX_SIZE = int(os.environ.get("INFERENCE_BATCH_MAX_SIZE", "32"))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "2"))
+# Thread untuk memuat model dari disk (load_model tidak boleh berjalan di event loop)
+MODEL_LOAD_WORKERS = int(os.environ.get("MODEL_LOAD_WORKERS", "2"))
+
+# Admission control /forecast dan /predict: jumlah yang diproses bersamaan dan panjang antrean;
+# permintaan di luar itu ditolak dengan 503 + Retry-After. Cache hit tidak melewati antrean.
+FORECAST_MAX_CONCURRENT = int(os.environ.get("FORECAST_MAX_CONCURRENT", "16"))
+FORECAST_MAX_QUEUE = int(os.environ.get("FORECAST_MAX_QUEUE", "64"))
+
+# Prekomputasi forecast setelah bursa tutup (16:00 WIB + jeda) untuk semua model yang tersedia.
+# Hasil disimpan di FORECAST_STORE_DIR dan disajikan /forecast selama datanya masih terkini.
+PRECOMPUTE_ENABLED = os.environ.get("PRECOMPUTE_ENABLED", "1") == "1"
+PRECOMPUTE_DELAY_MINUTES = float(os.environ.get("PRECOMPUTE_DELAY_MINUTES", "30"))
+PRECOMPUTE_CONCURRENCY = int(os.environ.get("PRECOMPUTE_CONCURRENCY", "4"))
+FORECAST_STORE_DIR = os.environ.get("FORECAST_STORE_DIR", "data/forecasts")
+
+# Token untuk endpoint admin (header X-Admin-Token); endpoint admin nonaktif jika kosong
+ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN")
+
+# Backtest rolling-origin: jumlah jendela per forward pass
+BACKTEST_BATCH_SIZE = int(os.environ.get("BACKTEST_BATCH_SIZE", "512"))
+
+# Stream forecast (GET /forecast/stream): interval poll bar per ticker selama sesi (detik), interval
+# komentar keepalive SSE (detik), dan jumlah ticker maksimum per langganan
+STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", "60"))
+STREAM_KEEPALIVE_SECONDS = float(os.environ.get("STREAM_KEEPALIVE_SECONDS", "15"))
+STREAM_MAX_TICKERS = int(os.environ.get("STREAM_MAX_TICKERS", "25"))
 
 TIMEFRAME_MAP = {
     "1h": "60m",
     "1d": "1d"
 }
+INTRADAY_INTERVALS = ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"]
 
 try:
     TARGET_COLUMN_INDEX_IN_FEATURES = FEATURE_COLUMNS.index(TARGET_COLUMN_NAME)
@@ -44,16 +142,66 @@ except ValueError:
 
 # --- ModelWrapper Class ---
 class ModelWrapper:
-    def __init__(self):
-        self.models: Dict[Tuple[str, str], Dict[str, Any]] = {}
-        self._load_all_models_and_scalers()
-        print(f"Model yang dimuat untuk: {self.get_available_models()}")
+    """
+    Memuat model dan scaler secara lazy (saat pertama kali diminta) dan menyimpannya
+    dalam cache LRU dengan batas jumlah model dan perkiraan memori.
+
+    File model yang diganti saat layanan berjalan dimuat ulang di latar belakang, di-warm-up,
+    lalu ditukar secara atomik per (ticker, timeframe). Permintaan yang sedang berjalan tetap
+    memakai objek model versi lama yang sudah dipegangnya.
 
-    def _load_all_models_and_scalers(self):
+    Dengan family "shared" setiap entri adalah TickerView atas satu model bersama per timeframe;
+    bobot model bersama dimuat sekali dan dihitung sekali dalam anggaran memori.
+    """
+
+    def __init__(self, max_models: int = MODEL_CACHE_MAX_MODELS, max_bytes: int = MODEL_CACHE_MAX_BYTES,
+                 preload: List[str] = None, backend: str = MODEL_BACKEND, tflite_variant: str = TFLITE_VARIANT,
+                 family: str = MODEL_FAMILY):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.tflite_variant = tflite_variant
+        self.family = family
+        # Model bersama per timeframe: {"version", "model", "scalers"}
+        self._shared: Dict[str, Dict[str, Any]] = {}
+        self._shared_lock = threading.Lock()
+        self.models: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        # Hash isi file per (path, mtime, ukuran), agar hash hanya dihitung ulang saat file berubah
+        self._versions: Dict[tuple, str] = {}
+        # Kosakata ticker per bundle model bersama, per (path, mtime, ukuran) seperti _versions
+        self._vocabularies: Dict[tuple, frozenset] = {}
+        # Versi file terakhir yang diketahui per (ticker, timeframe), termasuk model yang tidak dimuat;
+        # get_model_version() hanya membaca dict ini sehingga tidak pernah menyentuh disk
+        self._known_versions: Dict[Tuple[str, str], str] = {}
+        # Pemeriksaan file saat model diakses berjalan di thread reload, paling sering sekali per detik per model
+        self._checked_at: Dict[Tuple[str, str], float] = {}
+        self._pending_reloads = set()
+        self._reload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-reload")
+        self.hits = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+        print(f"Model yang tersedia: {self.get_available_models()}")
+        for item in preload or []:
+            ticker, _, timeframe = item.partition("_")
+            try:
+                self.get_model_and_scaler(ticker, timeframe or "1d")
+            except HTTPException as e:
+                print(f"Peringatan: preload model '{item}' gagal: {e.detail}")
+
+    def _scan_model_files(self) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """Daftar pasangan file model/scaler di MODEL_SAVE_DIR tanpa memuat apa pun."""
         if not os.path.exists(MODEL_SAVE_DIR):
             print(f"Peringatan: Direktori penyimpanan model '{MODEL_SAVE_DIR}' tidak ditemukan. Tidak ada model yang akan dimuat.")
-            return
+            return {}
+
+        if self.family == "shared":
+            return self._scan_shared_files()
 
+        model_files = {}
         for filename in os.listdir(MODEL_SAVE_DIR):
             if filename.startswith("lstm_model_") and filename.endswith(".keras"):
                 base_name = filename.replace("lstm_model_", "").replace(".keras", "")
@@ -71,31 +219,362 @@ class ModelWrapper:
                 scaler_path = os.path.join(MODEL_SAVE_DIR, scaler_filename)
 
                 if os.path.exists(scaler_path):
-                    try:
-                        model = load_model(model_path)
-                        scaler = joblib.load(scaler_path)
-                        self.models[(ticker, timeframe)] = {"model": model, "scaler": scaler}
-                        print(f"Memuat model dan scaler untuk {ticker}-{timeframe}")
-                    except Exception as e:
-                        print(f"Kesalahan saat memuat {filename} atau {scaler_filename}: {e}")
+                    model_files[(ticker, timeframe)] = (model_path, scaler_path)
                 else:
                     print(f"File scaler tidak ditemukan untuk {ticker}-{timeframe}: {scaler_filename}")
+        return model_files
+
+    def _scan_shared_files(self) -> Dict[Tuple[str, str], Tuple[str, str]]:
+        """Ticker dalam kosakata setiap model bersama di MODEL_SAVE_DIR."""
+        model_files = {}
+        for filename in os.listdir(MODEL_SAVE_DIR):
+            if not (filename.startswith(SHARED_MODEL_PREFIX) and filename.endswith(".keras")):
+                continue
+            timeframe = filename[len(SHARED_MODEL_PREFIX):-len(".keras")]
+            model_path, bundle_path = shared_model_paths(MODEL_SAVE_DIR, timeframe)
+            if not os.path.exists(bundle_path):
+                print(f"File bundle scaler tidak ditemukan untuk model bersama {timeframe}: {os.path.basename(bundle_path)}")
+                continue
+            with self._lock:
+                shared = self._shared.get(timeframe)
+            try:
+                tickers = shared["model"].tickers if shared is not None else load_shared_bundle(bundle_path)["tickers"]
+            except Exception as e:
+                print(f"Peringatan: bundle model bersama {bundle_path} tidak dapat dibaca: {e!r}")
+                continue
+            for ticker in tickers:
+                model_files[(ticker, timeframe)] = (model_path, bundle_path)
+        return model_files
+
+    def _model_files(self, key: Tuple[str, str]) -> Optional[Tuple[str, str, bool]]:
+        """(path model yang dipakai, path scaler, apakah TFLite) untuk `key`, atau None jika tidak ada."""
+        if self.family == "shared":
+            model_path, bundle_path = shared_model_paths(MODEL_SAVE_DIR, key[1])
+            if not (os.path.exists(model_path) and key[0] in self._shared_vocabulary(bundle_path)):
+                return None
+            return model_path, bundle_path, False
+        model_path = os.path.join(MODEL_SAVE_DIR, f"lstm_model_{key[0]}_{key[1]}.keras")
+        scaler_path = os.path.join(MODEL_SAVE_DIR, f"scaler_{key[0]}_{key[1]}.joblib")
+        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+            return None
+        if self.backend == "tflite":
+            tflite_path = tflite_model_path(model_path, self.tflite_variant)
+            if os.path.exists(tflite_path):
+                return tflite_path, scaler_path, True
+        return model_path, scaler_path, False
+
+    def _shared_vocabulary(self, bundle_path: str) -> frozenset:
+        """Ticker dalam bundle model bersama; kosong jika bundle tidak ada atau tidak dapat dibaca."""
+        try:
+            st = os.stat(bundle_path)
+        except FileNotFoundError:
+            return frozenset()
+        signature = (bundle_path, st.st_mtime_ns, st.st_size)
+        vocabulary = self._vocabularies.get(signature)
+        if vocabulary is None:
+            try:
+                vocabulary = frozenset(load_shared_bundle(bundle_path)["tickers"])
+            except Exception as e:
+                print(f"Peringatan: bundle model bersama {bundle_path} tidak dapat dibaca: {e!r}")
+                return frozenset()
+            self._vocabularies = {k: v for k, v in self._vocabularies.items() if k[0] != bundle_path}
+            self._vocabularies[signature] = vocabulary
+        return vocabulary
+
+    def _file_version(self, files: Tuple[str, str, bool]) -> Optional[str]:
+        """Versi model: 12 karakter pertama SHA-256 isi file model dan scaler."""
+        try:
+            signature = tuple((path, st.st_mtime_ns, st.st_size) for path, st in ((p, os.stat(p)) for p in files[:2]))
+        except FileNotFoundError:
+            return None
+        version = self._versions.get(signature)
+        if version is None:
+            digest = hashlib.sha256()
+            for path in files[:2]:
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+            version = digest.hexdigest()[:12]
+            if len(self._versions) > 4 * max(self.max_models, 64):
+                self._versions.clear()
+            self._versions[signature] = version
+        return version
+
+    def get_model_version(self, ticker: str, timeframe: str) -> Optional[str]:
+        """
+        Versi yang sedang melayani tanpa akses disk (aman dipanggil dari event loop): versi model
+        di cache, atau versi file terakhir yang diketahui. None jika file belum pernah diperiksa;
+        gunakan lookup_version() di thread untuk memeriksanya.
+        """
+        key = (ticker.replace('.JK', ''), timeframe)
+        with self._lock:
+            entry = self._resident(key, count_hit=False)
+            return entry["version"] if entry is not None else self._known_versions.get(key)
+
+    def lookup_version(self, ticker: str, timeframe: str) -> Optional[str]:
+        """Periksa versi file model di disk (blocking) dan simpan sebagai versi yang diketahui."""
+        key = (ticker.replace('.JK', ''), timeframe)
+        files = self._model_files(key)
+        version = self._file_version(files) if files is not None else None
+        with self._lock:
+            if version is None:
+                self._known_versions.pop(key, None)
+            else:
+                self._known_versions[key] = version
+        return version
+
+    def _load_shared(self, timeframe: str, files: Tuple[str, str, bool], version: Optional[str]) -> Dict[str, Any]:
+        """Model bersama untuk `timeframe` dengan versi `version`; dimuat sekali lalu dipakai semua ticker."""
+        with self._shared_lock:
+            with self._lock:
+                shared = self._shared.get(timeframe)
+            if shared is not None and shared["version"] == version:
+                return shared
+            try:
+                model, scalers = load_shared_model(files[0], files[1])
+                model.predict_on_batch(np.zeros((1, N_STEPS_IN, len(FEATURE_COLUMNS) + 1), dtype=np.float32))
+            except Exception as e:
+                print(f"Kesalahan saat memuat model bersama {files[0]} atau {files[1]}: {e}")
+                raise HTTPException(status_code=500, detail=f"Gagal memuat model bersama untuk timeframe {timeframe}: {e}")
+            print(f"Memuat model bersama {timeframe} (versi {version}, {len(model.tickers)} ticker)")
+            shared = {"version": version, "model": model, "scalers": scalers}
+            with self._lock:
+                self._shared[timeframe] = shared
+            return shared
+
+    def _load(self, key: Tuple[str, str], files: Tuple[str, str, bool]) -> Dict[str, Any]:
+        """
+        Muat entri dari `files`. Skrip pelatihan mengganti model lalu scaler dengan dua os.replace;
+        jika file berubah selama dimuat, pasangan yang terbaca bisa campuran, jadi dimuat ulang.
+        """
+        for _ in range(3):
+            entry = self._load_files(key, files)
+            if self._file_version(files) == entry["version"]:
+                break
+            print(f"File model {key[0]}-{key[1]} berubah saat dimuat, dimuat ulang")
+        return entry
+
+    def _load_files(self, key: Tuple[str, str], files: Tuple[str, str, bool]) -> Dict[str, Any]:
+        if self.family == "shared":
+            version = self._file_version(files)
+            shared = self._load_shared(key[1], files, version)
+            if key[0] not in shared["model"].ticker_ids:
+                raise HTTPException(status_code=404, detail=f"Ticker '{key[0]}' tidak ada dalam model bersama timeframe '{key[1]}'. Model tersedia: {self.get_available_models()}")
+            # Bobot model bersama dihitung sekali di get_cache_stats, bukan per ticker
+            return {"model": shared["model"].view(key[0]), "scaler": shared["scalers"][key[0]], "bytes": 0,
+                    "backend": "keras-shared", "files": files, "version": version}
+
+        model_path, scaler_path, use_tflite = files
+        if self.backend == "tflite" and not use_tflite:
+            print(f"Peringatan: {tflite_model_path(model_path, self.tflite_variant)} tidak ditemukan, {key[0]}-{key[1]} dimuat dengan Keras.")
+
+        version = self._file_version(files)
+        try:
+            model = TFLiteModel(model_path, num_threads=TFLITE_THREADS) if use_tflite else load_model(model_path)
+            scaler = joblib.load(scaler_path)
+            # Warm-up: forward pass pertama (tracing graph) tidak dibayar oleh permintaan pengguna
+            model.predict_on_batch(np.zeros((1, N_STEPS_IN, len(FEATURE_COLUMNS)), dtype=np.float32))
+        except Exception as e:
+            print(f"Kesalahan saat memuat {model_path} atau {scaler_path}: {e}")
+            raise HTTPException(status_code=500, detail=f"Gagal memuat model untuk {key[0]}-{key[1]}: {e}")
+        backend = f"tflite-{self.tflite_variant}" if use_tflite else "keras"
+        print(f"Memuat model ({backend}, versi {version}) dan scaler untuk {key[0]}-{key[1]}")
+        # Perkiraan memori: ukuran flatbuffer TFLite, atau bobot float32 untuk Keras
+        model_bytes = model.nbytes if use_tflite else model.count_params() * 4
+        return {"model": model, "scaler": scaler, "bytes": model_bytes, "backend": backend,
+                "files": files, "version": version}
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """Buang model yang paling lama tidak dipakai sampai kembali di bawah anggaran."""
+        def over_budget():
+            total_bytes = sum(entry["bytes"] for entry in self.models.values())
+            return len(self.models) > self.max_models or (self.max_bytes and total_bytes > self.max_bytes)
+
+        while over_budget() and len(self.models) > 1:
+            oldest = next(iter(self.models))
+            if oldest == keep:
+                break
+            del self.models[oldest]
+            self._checked_at.pop(oldest, None)
+            self.evictions += 1
+            print(f"Mengeluarkan model {oldest[0]}-{oldest[1]} dari cache")
+
+    def _changed_files(self, key: Tuple[str, str], entry: Dict[str, Any]) -> Optional[Tuple[str, str, bool]]:
+        """File baru untuk `key` jika berbeda dari versi yang dimuat; file yang dihapus tidak dianggap berubah."""
+        files = self._model_files(key)
+        if files is None or (files == entry["files"] and self._file_version(files) == entry["version"]):
+            return None
+        return files
+
+    def reload(self, key: Tuple[str, str]) -> Optional[Dict[str, str]]:
+        """
+        Muat ulang model yang filenya berubah (blocking): muat dan warm-up versi baru, lalu tukar
+        entri cache dalam satu langkah. Mengembalikan versi lama/baru, atau None jika tidak ada perubahan.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self.models.get(key)
+            # Pemeriksaan file di luar self._lock, agar event loop tidak menunggu disk
+            files = self._changed_files(key, entry) if entry is not None else None
+            if files is None:
+                return None
+            if time.time() - max(os.stat(path).st_mtime for path in files[:2]) < MODEL_RELOAD_SETTLE_SECONDS:
+                # File masih mungkin sedang ditulis; pemeriksaan berikutnya akan memuatnya
+                return None
+
+            new_entry = self._load(key, files)
+            with self._lock:
+                if key not in self.models:
+                    return None
+                self.models[key] = new_entry
+                self._known_versions[key] = new_entry["version"]
+                self.reloads += 1
+                self._evict(keep=key)
+        print(f"Model {key[0]}-{key[1]} diperbarui: {entry['version']} -> {new_entry['version']}")
+        return {"ticker": key[0], "timeframe": key[1], "old_version": entry["version"], "new_version": new_entry["version"]}
+
+    def _schedule_reload(self, key: Tuple[str, str]) -> None:
+        """Jadwalkan reload di thread latar belakang (dipanggil dengan self._lock)."""
+        if key in self._pending_reloads:
+            return
+        self._pending_reloads.add(key)
+
+        def run():
+            try:
+                self.reload(key)
+            except HTTPException as e:
+                print(f"Peringatan: memuat ulang {key[0]}-{key[1]} gagal, versi lama tetap dipakai: {e.detail}")
+            finally:
+                with self._lock:
+                    self._pending_reloads.discard(key)
+
+        self._reload_executor.submit(run)
 
-    def get_model_and_scaler(self, ticker: str, timeframe: str) -> Tuple[tf.keras.Model, Any]:
+    def reload_changed(self) -> List[Dict[str, str]]:
+        """
+        Muat ulang semua model di cache yang filenya berubah. Model lain otomatis memakai file baru
+        saat dimuat; untuk model itu hanya versi yang diketahui yang diperbarui.
+        """
+        with self._lock:
+            keys = list(self.models.keys())
+            unloaded = [key for key in self._known_versions if key not in self.models]
+        for key in unloaded:
+            self.lookup_version(*key)
+        results = []
+        for key in keys:
+            try:
+                result = self.reload(key)
+            except HTTPException as e:
+                results.append({"ticker": key[0], "timeframe": key[1], "error": e.detail})
+                continue
+            if result is not None:
+                results.append(result)
+        return results
+
+    def _resident(self, key: Tuple[str, str], count_hit: bool = True) -> Optional[Dict[str, Any]]:
+        """Entri cache untuk `key` tanpa akses disk (dipanggil dengan self._lock)."""
+        entry = self.models.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - self._checked_at.get(key, 0.0) >= 1.0:
+            # File diperiksa di thread reload; versi lama tetap melayani sampai versi baru
+            # selesai dimuat dan di-warm-up
+            self._checked_at[key] = now
+            self._schedule_reload(key)
+        if count_hit:
+            self.models.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def get_resident(self, ticker: str, timeframe: str, promote: bool = True) -> Optional[Dict[str, Any]]:
+        """Entri (model, scaler, versi) jika sudah ada di cache, tanpa memuat (aman dipanggil dari event loop)."""
+        with self._lock:
+            return self._resident((ticker.replace('.JK', ''), timeframe), count_hit=promote)
+
+    def get_entry(self, ticker: str, timeframe: str, promote: bool = True) -> Dict[str, Any]:
+        """
+        Entri model untuk (ticker, timeframe): dict berisi "model", "scaler" dan "version".
+        `promote=False` (job latar belakang) tidak mengubah urutan LRU, dan model yang belum
+        dimuat dipakai sekali tanpa masuk cache, sehingga model yang sering dipakai tidak dikeluarkan.
+        """
         normalized_ticker = ticker.replace('.JK', '')
         key = (normalized_ticker, timeframe)
-        if key not in self.models:
-            raise HTTPException(status_code=404, detail=f"Model tidak ditemukan untuk ticker '{ticker}' dan timeframe '{timeframe}'. Model tersedia: {self.get_available_models()}")
-        return self.models[key]["model"], self.models[key]["scaler"]
+
+        with self._lock:
+            entry = self._resident(key, count_hit=promote)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Hanya satu thread yang memuat model tertentu; permintaan lain menunggu hasilnya
+        with load_lock:
+            with self._lock:
+                entry = self._resident(key, count_hit=promote)
+                if entry is not None:
+                    return entry
+
+            files = self._model_files(key)
+            if files is None:
+                raise HTTPException(status_code=404, detail=f"Model tidak ditemukan untuk ticker '{ticker}' dan timeframe '{timeframe}'. Model tersedia: {self.get_available_models()}")
+            entry = self._load(key, files)
+
+            with self._lock:
+                self._known_versions[key] = entry["version"]
+                self.loads += 1
+                if promote:
+                    self.models[key] = entry
+                    self._evict(keep=key)
+        return entry
+
+    def get_model_and_scaler(self, ticker: str, timeframe: str) -> Tuple[Union[tf.keras.Model, TFLiteModel, TickerView], Any]:
+        entry = self.get_entry(ticker, timeframe)
+        return entry["model"], entry["scaler"]
 
     def get_available_models(self) -> List[Dict[str, str]]:
-        return [{"ticker": k[0], "timeframe": k[1]} for k in self.models.keys()]
+        return [{"ticker": k[0], "timeframe": k[1]} for k in sorted(self._scan_model_files().keys())]
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            shared_bytes = sum(shared["model"].nbytes for shared in self._shared.values())
+            return {
+                "family": self.family,
+                "backend": self.backend,
+                "tflite_variant": self.tflite_variant if self.backend == "tflite" else None,
+                "resident": [f"{k[0]}_{k[1]}" for k in self.models.keys()],
+                "resident_backends": {f"{k[0]}_{k[1]}": entry["backend"] for k, entry in self.models.items()},
+                "resident_versions": {f"{k[0]}_{k[1]}": entry["version"] for k, entry in self.models.items()},
+                "resident_bytes": sum(entry["bytes"] for entry in self.models.values()) + shared_bytes,
+                "shared_versions": {timeframe: shared["version"] for timeframe, shared in self._shared.items()},
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "pending_reloads": [f"{k[0]}_{k[1]}" for k in self._pending_reloads],
+            }
 
 # --- Inisialisasi Aplikasi FastAPI ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    scheduler_task = asyncio.create_task(precompute_scheduler.loop()) if PRECOMPUTE_ENABLED else None
+    watch_task = asyncio.create_task(model_watch_loop()) if MODEL_WATCH_INTERVAL > 0 else None
+    try:
+        yield
+    finally:
+        for task in (scheduler_task, watch_task):
+            if task:
+                task.cancel()
+        await stream_hub.close()
+
 app = FastAPI(
     title="API Peramalan Saham",
     description="API untuk peramalan harga saham multi-horizon menggunakan model LSTM yang sudah dilatih.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 origins = [
@@ -112,9 +591,49 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache"],
 )
 
-model_wrapper = ModelWrapper()
+model_wrapper = ModelWrapper(preload=MODEL_PRELOAD_TICKERS)
+bar_store = BarStore(
+    BAR_STORE_DIR,
+    FileBarProvider(BAR_PROVIDER_DIR) if BAR_PROVIDER_DIR else YFinanceProvider(timeout=BAR_FETCH_TIMEOUT),
+    fetch_timeout=BAR_FETCH_TIMEOUT,
+    intraday_ttl=BAR_INTRADAY_TTL,
+)
+feature_engines = FeatureEngineCache(max_engines=FEATURE_ENGINE_MAX_TICKERS, history=N_STEPS_IN)
+fetch_executor = ThreadPoolExecutor(max_workers=FORECAST_FETCH_WORKERS, thread_name_prefix="forecast-fetch")
+if FEATURE_POOL == "process":
+    # "spawn": proses anak hanya mengimpor api.features, bukan TensorFlow dan model dari proses induk
+    feature_executor = ProcessPoolExecutor(max_workers=FORECAST_FEATURE_WORKERS,
+                                           mp_context=multiprocessing.get_context("spawn"))
+else:
+    feature_executor = ThreadPoolExecutor(max_workers=FORECAST_FEATURE_WORKERS, thread_name_prefix="forecast-features")
+model_load_executor = ThreadPoolExecutor(max_workers=MODEL_LOAD_WORKERS, thread_name_prefix="model-load")
+backtest_cache = BacktestCache()
+backtest_locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+# Backtest latar belakang yang sedang berjalan per (ticker, timeframe)
+backtest_tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+admission = AdmissionController(max_concurrent=FORECAST_MAX_CONCURRENT, max_queue=FORECAST_MAX_QUEUE)
+forecast_cache = ForecastCache(max_entries=FORECAST_CACHE_MAX_ENTRIES)
+forecast_store = ForecastStore(FORECAST_STORE_DIR)
+
+
+def on_bars_rewritten(ticker_yf: str, yf_interval: str) -> None:
+    # Riwayat diunduh ulang (misalnya harga disesuaikan setelah dividen/split) dengan bar terakhir
+    # yang bisa sama, jadi engine fitur dan forecast yang dihitung dari riwayat lama dibuang
+    feature_engines.invalidate(ticker_yf)
+    forecast_cache.invalidate(ticker_yf)
+
+
+bar_store.on_rewrite = on_bars_rewritten
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+inference_batcher = MicroBatcher(
+    lambda model, batch: model.predict_on_batch(batch),
+    inference_executor,
+    max_batch_size=INFERENCE_BATCH_MAX_SIZE,
+    max_wait_ms=INFERENCE_BATCH_WAIT_MS,
+)
 
 # --- Model Pydantic untuk Permintaan/Respons API ---
 class PredictionRequest(BaseModel):
@@ -132,22 +651,69 @@ class ForecastResponse(BaseModel):
     forecast: List[float]
     actual_history: List[float]
     actual_history_dates: List[str]
-    mae: float = None
-    mse: float = None
-    mape: float = None
+    # Metrik backtest rolling-origin model (satuan harga, rata-rata t+1..t+3) dan per horizon.
+    # Kosong selama backtest versi model ini masih dihitung di latar belakang.
+    mae: Optional[float] = None
+    mse: Optional[float] = None
+    mape: Optional[float] = None
+    horizon_metrics: Optional[List[Dict[str, Any]]] = None
+    # True jika metrik mencakup jendela yang dipakai melatih model (scaler tanpa validation_start_)
+    metrics_in_sample: Optional[bool] = None
+    # Versi model (hash isi file model + scaler) yang menghasilkan forecast ini
+    model_version: Optional[str] = None
+
+class BatchForecastRequest(BaseModel):
+    # Daftar ticker, atau "all" untuk semua model yang tersedia pada timeframe tersebut
+    tickers: Union[List[str], Literal["all"]] = "all"
+    timeframe: str = "1d"
+
+class BacktestRequest(BaseModel):
+    ticker: str
+    timeframe: str = "1d"
+    # Rentang tanggal bar t+1 yang dievaluasi (ISO, inklusif); kosong = seluruh riwayat bar store
+    start: Optional[str] = None
+    end: Optional[str] = None
 
 class AvailableModelsResponse(BaseModel):
     available_models: List[Dict[str, str]]
 
 
-@app.post("/predict", include_in_schema=False)
-async def predict_endpoint(request: PredictionRequest):
-    ticker = request.ticker
-    timeframe = request.timeframe
+async def get_model(ticker: str, timeframe: str, promote: bool = True) -> Dict[str, Any]:
+    """
+    Entri model ("model", "scaler", "version"); model yang belum dimuat dibaca dari disk di pool
+    model-load. Pemanggil memegang entri ini sampai selesai, sehingga reload tidak mengubah
+    versi di tengah permintaan. `promote=False` tidak mengubah isi dan urutan cache model.
+    """
+    resident = model_wrapper.get_resident(ticker, timeframe, promote=promote)
+    if resident is not None:
+        return resident
+    return await asyncio.get_running_loop().run_in_executor(
+        model_load_executor, partial(model_wrapper.get_entry, ticker, timeframe, promote=promote)
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoint admin nonaktif: ADMIN_API_TOKEN belum diatur")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Token admin tidak valid")
+
+
+async def model_version(ticker: str, timeframe: str) -> Optional[str]:
+    """Versi model (ticker, timeframe); file yang belum pernah diperiksa dibaca di pool model-load."""
+    version = model_wrapper.get_model_version(ticker, timeframe)
+    if version is None:
+        version = await asyncio.get_running_loop().run_in_executor(
+            model_load_executor, model_wrapper.lookup_version, ticker, timeframe
+        )
+    return version
 
-    model, scaler = model_wrapper.get_model_and_scaler(ticker, timeframe)
 
-    input_data_np = np.array(request.input_data, dtype=np.float32)
+async def predict_prices(entry: Dict[str, Any], input_data_np: np.ndarray) -> List[float]:
+    """Prediksi harga N_HORIZONS langkah ke depan dari `input_data_np` (N_STEPS_IN, fitur) yang belum diskalakan."""
+    model, scaler = entry["model"], entry["scaler"]
+
+    input_data_np = np.asarray(input_data_np, dtype=np.float32)
 
     if input_data_np.shape != (N_STEPS_IN, len(FEATURE_COLUMNS)):
         raise HTTPException(
@@ -157,152 +723,502 @@ async def predict_endpoint(request: PredictionRequest):
         )
 
     scaled_input_data = scaler.transform(input_data_np)
-    scaled_input_data = scaled_input_data.reshape(1, N_STEPS_IN, len(FEATURE_COLUMNS))
+    scaled_input_data = scaled_input_data.reshape(1, N_STEPS_IN, len(FEATURE_COLUMNS)).astype(np.float32)
 
-    predictions_scaled = model.predict(scaled_input_data, verbose=0)[0]
+    # Permintaan bersamaan untuk model yang sama digabung menjadi satu forward pass. Model bersama
+    # menerima id ticker sebagai kolom terakhir, sehingga ticker berbeda pun berbagi forward pass.
+    if isinstance(model, TickerView):
+        predictions_scaled = await inference_batcher.submit(model.shared, model.with_ticker_column(scaled_input_data[0]))
+    else:
+        predictions_scaled = await inference_batcher.submit(model, scaled_input_data[0])
 
     dummy_array_pred = np.zeros((N_HORIZONS, len(FEATURE_COLUMNS)))
     dummy_array_pred[:, TARGET_COLUMN_INDEX_IN_FEATURES] = predictions_scaled
     predictions_inv = scaler.inverse_transform(dummy_array_pred)[:, TARGET_COLUMN_INDEX_IN_FEATURES]
 
-    return {"forecast": predictions_inv.tolist()}
+    return predictions_inv.tolist()
+
+
+@app.post("/predict", include_in_schema=False)
+async def predict_endpoint(request: PredictionRequest):
+    async with admission.slot():
+        entry = await get_model(request.ticker, request.timeframe)
+        forecast = await predict_prices(entry, np.array(request.input_data, dtype=np.float32))
+    return {"forecast": forecast, "model_version": entry["version"]}
 
 # --- API Endpoints ---
 @app.get("/models/available", response_model=AvailableModelsResponse, summary="Dapatkan daftar model yang tersedia")
 async def get_available_models_endpoint():
     return AvailableModelsResponse(available_models=model_wrapper.get_available_models())
 
-@app.post("/forecast", response_model=ForecastResponse, summary="Lakukan peramalan harga saham dengan data YFinance terbaru")
-async def forecast_from_yfinance(request: ForecastRequest):
-    ticker = request.ticker
-    timeframe = request.timeframe
+@app.get("/models/cache", summary="Statistik cache model yang dimuat")
+async def get_model_cache_stats():
+    return model_wrapper.get_cache_stats()
+
+@app.post("/models/reload", summary="Muat ulang model yang filenya berubah (warm-up lalu tukar atomik)",
+          dependencies=[Depends(require_admin)])
+async def reload_models():
+    reloaded = await asyncio.get_running_loop().run_in_executor(model_load_executor, model_wrapper.reload_changed)
+    return {"reloaded": reloaded, "versions": model_wrapper.get_cache_stats()["resident_versions"]}
+
+async def model_watch_loop():
+    """Periksa file model yang sedang dimuat setiap MODEL_WATCH_INTERVAL detik."""
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            await asyncio.get_running_loop().run_in_executor(model_load_executor, model_wrapper.reload_changed)
+        except Exception as e:
+            print(f"Pemeriksaan file model gagal: {e!r}")
+
+@app.get("/models/inference-stats", summary="Histogram ukuran batch dan waktu antre inferensi")
+async def get_inference_stats():
+    return inference_batcher.stats()
+
+@app.get("/forecast/admission", summary="Status antrean admission control forecast")
+async def get_admission_stats():
+    return admission.stats()
+
+def to_yfinance_ticker(ticker: str) -> str:
+    # Normalisasi ticker untuk yfinance (misal: BBCA menjadi BBCA.JK jika pasar Indonesia)
+    if not any(ext in ticker.upper() for ext in ['.JK', '.NS', '.L', '.PA', '.DE', '.O', '.N', '.T', '.TO']):
+        return f"{ticker.upper()}.JK" # Default ke pasar Jakarta (Indonesia)
+    return ticker.upper() # Gunakan ticker apa adanya jika sudah ada ekstensi
 
+
+def load_forecast_bars(ticker_yf: str, yf_interval: str, timeframe: str, max_age: Optional[float] = None) -> pd.DataFrame:
+    period = "60d" if yf_interval in INTRADAY_INTERVALS else "2y" # 2 tahun
+    # Ambil dari cache bar lokal; hanya bar setelah timestamp terakhir yang diunduh dari provider
+    data = bar_store.get_bars(ticker_yf, yf_interval, period, max_age=max_age)
+    # Samakan rentang dengan unduhan `period` agar indikator kumulatif (OBV) tetap konsisten
+    data = trim_to_period(data, period)
+
+    if data.empty or len(data) < N_STEPS_IN + 100:
+        raise HTTPException(status_code=404, detail=f"Tidak cukup data historis yang ditemukan untuk '{ticker_yf}' dengan timeframe '{timeframe}'. Ditemukan {len(data)} baris.")
+    return data
+
+
+def build_forecast_input(ticker_yf: str, yf_interval: str, data: pd.DataFrame,
+                         closed_only: bool = False) -> Tuple[list, np.ndarray]:
+    if FEATURE_ENGINE == "pandas_ta":
+        return feature_window(data, N_STEPS_IN)
+    # Engine inkremental hanya memproses bar baru sejak forecast terakhir untuk ticker ini. Stream
+    # (hanya bar tertutup) memakai engine sendiri agar tidak bergantian dengan /forecast yang
+    # menyertakan bar berjalan.
+    key = (ticker_yf, f"{yf_interval}/closed") if closed_only else (ticker_yf, yf_interval)
+    return feature_engines.window(key, data, N_STEPS_IN)
+
+
+async def cached_forecast(ticker: str, timeframe: str) -> Optional[Tuple[ForecastResponse, bytes]]:
+    """
+    Hasil forecast dari cache tanpa fetch maupun perhitungan, jika bar di memori masih segar
+    dan hasil untuk bar terakhir serta versi model saat ini sudah tersimpan.
+    """
+    yf_interval = TIMEFRAME_MAP.get(timeframe)
+    if not yf_interval:
+        return None
+    version = await model_version(ticker, timeframe)
+    if version is None:
+        return None
+    ticker_yf = to_yfinance_ticker(ticker)
+    last_bar = bar_store.peek_last_bar(ticker_yf, yf_interval)
+    if last_bar is None:
+        return None
+    return forecast_cache.get((ticker_yf, timeframe), (last_bar, version))
+
+
+async def stored_forecast(ticker: str, timeframe: str) -> Optional[bytes]:
+    """Forecast hasil prekomputasi jika dibuat dengan versi model saat ini dan datanya masih terkini."""
+    entry = forecast_store.get((to_yfinance_ticker(ticker), timeframe))
+    if entry is None or entry["model_version"] != await model_version(ticker, timeframe):
+        return None
+    if not is_current(entry["fetched_at"], datetime.now(timezone.utc), BAR_INTRADAY_TTL):
+        return None
+    return entry["body"]
+
+
+async def backtest_model(entry: Dict[str, Any], data: pd.DataFrame,
+                         start: Optional[pd.Timestamp] = None, end: Optional[pd.Timestamp] = None) -> Dict[str, Any]:
+    """Backtest model `entry` pada seluruh riwayat `data`: fitur di pool fitur, inferensi di pool inferensi."""
+    model, scaler = entry["model"], entry["scaler"]
+    loop = asyncio.get_running_loop()
+    bars, sessions = stack_bars([data])
+    features = await loop.run_in_executor(feature_executor, build_feature_tensor, bars, sessions, np.float64)
+    return await loop.run_in_executor(inference_executor, partial(
+        run_backtest, model.predict_on_batch, scaler, features[0], data.index,
+        TARGET_COLUMN_INDEX_IN_FEATURES, N_STEPS_IN, N_HORIZONS,
+        start=start, end=end, batch_size=BACKTEST_BATCH_SIZE,
+    ))
+
+
+async def model_metrics(entry: Dict[str, Any], ticker_yf: str, timeframe: str,
+                        data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Metrik backtest untuk versi model `entry`, hanya pada jendela setelah batas data latih.
+    Model tanpa batas yang tercatat dievaluasi pada seluruh riwayat dan ditandai
+    "in_sample". Dihitung sekali per versi model (pemanggil bersamaan menunggu hasil
+    yang sama), lalu disajikan dari cache.
+    """
+    model_version = entry["version"]
+    if model_version is None:
+        return None
+    key = (ticker_yf, timeframe)
+    metrics = backtest_cache.get(key, model_version)
+    if metrics is None:
+        async with backtest_locks.setdefault(key, asyncio.Lock()):
+            metrics = backtest_cache.get(key, model_version)
+            if metrics is None:
+                cutoff = None
+                try:
+                    cutoff = training_cutoff(entry["scaler"], data.index.tz)
+                    metrics = await backtest_model(entry, data, start=cutoff)
+                except Exception as e:
+                    print(f"Peringatan: backtest {ticker_yf} ({timeframe}) gagal: {e!r}")
+                    metrics = {"windows": 0}
+                metrics["in_sample"] = cutoff is None
+                # Hasil tanpa jendela juga disimpan, agar tidak dihitung ulang setiap permintaan
+                backtest_cache.put(key, model_version, metrics)
+    return metrics if metrics.get("windows") else None
+
+
+def ready_metrics(entry: Dict[str, Any], ticker_yf: str, timeframe: str,
+                  data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """
+    Metrik backtest jika sudah ada di cache. Jika belum, backtest dijalankan di latar belakang
+    dan None dikembalikan, sehingga /forecast tidak menunggu backtest riwayat penuh.
+    """
+    model_version = entry["version"]
+    if model_version is None:
+        return None
+    key = (ticker_yf, timeframe)
+    metrics = backtest_cache.get(key, model_version)
+    if metrics is not None:
+        return metrics if metrics.get("windows") else None
+    if key not in backtest_tasks:
+        task = asyncio.create_task(refresh_metrics(entry, ticker_yf, timeframe, data))
+        backtest_tasks[key] = task
+        task.add_done_callback(lambda _: backtest_tasks.pop(key, None))
+    return None
+
+
+async def refresh_metrics(entry: Dict[str, Any], ticker_yf: str, timeframe: str, data: pd.DataFrame) -> None:
+    if await model_metrics(entry, ticker_yf, timeframe, data) is not None:
+        # Forecast yang di-cache tanpa metrik dihitung ulang pada permintaan berikutnya
+        forecast_cache.invalidate(ticker_yf)
+
+
+async def run_forecast(ticker: str, timeframe: str, fetch_limit: Optional[asyncio.Semaphore] = None,
+                       check_cache: bool = True, closed_only: bool = False,
+                       max_age: Optional[float] = None,
+                       wait_metrics: bool = False, promote_model: bool = True) -> Tuple[ForecastResponse, bytes, bool]:
+    """
+    Forecast satu ticker: ambil bar di pool fetch (dibatasi `fetch_limit` jika diberikan),
+    hitung fitur di pool fitur, lalu jalankan prediksi. Event loop hanya mengoordinasikan.
+    Mengembalikan (hasil, body JSON, apakah dari cache). `check_cache=False` melewati jalur
+    cepat cached_forecast() jika pemanggil sudah memeriksanya.
+
+    `closed_only=True` (stream) membuang bar yang masih berjalan, sehingga forecast hanya
+    berubah saat bar baru ditutup; `max_age` memaksa sinkronisasi bar yang lebih tua dari itu.
+    Metrik backtest yang belum siap dihitung di latar belakang, kecuali `wait_metrics=True`.
+    `promote_model=False` memakai model tanpa mengubah cache model (lihat get_model).
+    """
     yf_interval = TIMEFRAME_MAP.get(timeframe)
     if not yf_interval:
         raise HTTPException(status_code=400, detail=f"Timeframe '{timeframe}' tidak didukung atau tidak ada mapping ke YFinance. Timeframe yang didukung: {list(TIMEFRAME_MAP.keys())}")
 
-    # Normalisasi ticker untuk yfinance (misal: BBCA menjadi BBCA.JK jika pasar Indonesia)
-    if not any(ext in ticker.upper() for ext in ['.JK', '.NS', '.L', '.PA', '.DE', '.O', '.N', '.T', '.TO']):
-        ticker_yf = f"{ticker.upper()}.JK" # Default ke pasar Jakarta (Indonesia)
+    if check_cache:
+        # Jalur cepat: bar di memori masih segar, jadi bar terakhir sudah diketahui tanpa fetch
+        cached = await cached_forecast(ticker, timeframe)
+        if cached is not None:
+            return cached[0], cached[1], True
+
+    ticker_yf = to_yfinance_ticker(ticker)
+    cache_key = (ticker_yf, f"{timeframe}/closed" if closed_only else timeframe)
+    entry = await get_model(ticker, timeframe, promote=promote_model)
+    model_version = entry["version"]
+    # Jalur cepat hanya memeriksa entri cache bar berjalan; entri bar tertutup selalu diperiksa di bawah
+    last_bar = None if closed_only else bar_store.peek_last_bar(ticker_yf, yf_interval)
+
+    loop = asyncio.get_running_loop()
+    load = partial(load_forecast_bars, ticker_yf, yf_interval, timeframe, max_age=max_age)
+    if fetch_limit is not None:
+        async with fetch_limit:
+            data = await loop.run_in_executor(fetch_executor, load)
     else:
-        ticker_yf = ticker.upper() # Gunakan ticker apa adanya jika sudah ada ekstensi
+        data = await loop.run_in_executor(fetch_executor, load)
+    if closed_only and not is_bar_closed(data.index[-1], yf_interval, datetime.now(timezone.utc)):
+        data = data.iloc[:-1]
 
-    try:
-        period = "60d" if yf_interval in ["1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"] else "2y" # 2 tahun
-        # fetch data with auto_adjust=True to simplify Adj Close handling
-        data = yf.download(ticker_yf, period=period, interval=yf_interval, auto_adjust=True)
-
-        if data.empty or len(data) < N_STEPS_IN + 100:
-            raise HTTPException(status_code=404, detail=f"Tidak cukup data historis yang ditemukan untuk '{ticker_yf}' dengan timeframe '{timeframe}'. Ditemukan {len(data)} baris.")
-
-        df = data.copy()
-
-        if isinstance(df.columns, pd.MultiIndex):
-            print(f"Peringatan: DataFrame memiliki MultiIndex columns ({df.columns}). Mengflatten kolom.")
-            df.columns = df.columns.droplevel(1)
-
-        # yfinance.download(auto_adjust=True) seharusnya sudah mengeliminasi 'Adj Close'
-        # dan menyesuaikan 'Open', 'High', 'Low', 'Close'.
-        # Jadi, pengecekan 'Adj Close' mungkin tidak lagi diperlukan,
-        # tetapi biarkan saja sebagai safeguard jika auto_adjust tidak selalu berfungsi seperti yang diharapkan.
-        if 'Adj Close' in df.columns:
-            df = df.drop(columns=['Adj Close'])
-        elif 'adj close' in df.columns: # handle lowercase 'adj close' as well
-            df = df.drop(columns=['adj close'])
-
-
-        df.columns = df.columns.str.lower() # Ubah nama kolom jadi lowercase (open, high, low, close, volume)
-                                           # Ini harus dijalankan setelah MultiIndex diflatten
-
-        # Pastikan kolom dasar 'open', 'high', 'low', 'close', 'volume' ada sebelum TA
-        for col_name in ['open', 'high', 'low', 'close', 'volume']:
-            if col_name not in df.columns:
-                raise HTTPException(status_code=500, detail=f"Kolom dasar '{col_name}' tidak ditemukan setelah penyesuaian yfinance dan flatten MultiIndex. Pastikan data YFinance valid.")
-
-        # --- PERBAIKAN PENTING DI SINI ---
-        # 1. Bollinger Bands: Pastikan `std=2.0` secara eksplisit agar namanya cocok dengan `_20_2.0`
-        df.ta.sma(length=20, append=True)
-        df.ta.sma(length=50, append=True)
-        df.ta.macd(append=True)
-        df.ta.rsi(append=True)
-        df.ta.bbands(length=20, std=2.0, append=True) # <<< PERBAIKAN UTAMA BBANDS >>>
-        df.ta.stoch(append=True)
-        df.ta.adx(append=True)
-        df.ta.atr(append=True)
-        df['obv'] = ta.obv(df['close'], df['volume'])
-        df['vwap_d'] = ta.vwap(df['high'], df['low'], df['close'], df['volume'])
-
-        # Koreksi nama kolom untuk menyesuaikan FEATURE_COLUMNS
-        # Tidak perlu lagi rename BBL_20_2.0 dll. jika pandas_ta sudah menghasilkan nama yang benar
-        # Namun, biarkan block rename ini untuk kolom lain yang mungkin perlu penyesuaian atau untuk jaga-jaga
-        df.rename(columns={
-            'MACD_12_26_9': 'MACD_12_26_9', 'MACDh_12_26_9': 'MACDh_12_26_9', 'MACDs_12_26_9': 'MACDs_12_26_9',
-            'RSI_14': 'RSI_14',
-            # Jika bbands sudah menghasilkan nama 'BBL_20_2.0', baris ini tidak akan mengubah apa-apa
-            # 'BBL_20_2.0': 'BBL_20_2.0', 'BBM_20_2.0': 'BBM_20_2.0', 'BBU_20_2.0': 'BBU_20_2.0', 'BBB_20_2.0': 'BBB_20_2.0', 'BBP_20_2.0': 'BBP_20_2.0',
-            'STOCHk_14_3_3': 'STOCHk_14_3_3', 'STOCHd_14_3_3': 'STOCHd_14_3_3',
-            'ADX_14': 'ADX_14', 'DMP_14': 'DMP_14', 'DMN_14': 'DMN_14',
-            'ATRr_14': 'ATRr_14',
-            'obv': 'OBV',
-            'vwap_d': 'VWAP_D'
-        }, inplace=True)
-        # Tambahkan kembali renaming untuk BBands jika setelah perbaikan di atas namanya masih tidak cocok
-        # Misalnya, jika `std=2.0` menghasilkan 'BBL_20_2' bukan 'BBL_20_2.0', maka Anda perlu:
-        # 'BBL_20_2': 'BBL_20_2.0',
-        # 'BBM_20_2': 'BBM_20_2.0',
-        # dst.
-        # Namun, dengan `std=2.0` eksplisit, seharusnya `.0` akan ada.
-
-        # Pilih dan urutkan kolom sesuai FEATURE_COLUMNS
-        # Pastikan semua kolom ada, jika tidak, raise error atau isi dengan 0/NaN lalu handle NaN
-        processed_df = df.copy() # Membuat salinan eksplisit untuk mencegah SettingWithCopyWarning lebih lanjut
-        for col in FEATURE_COLUMNS:
-            if col not in processed_df.columns:
-                processed_df[col] = np.nan
-                print(f"Peringatan: Kolom '{col}' tidak ditemukan setelah perhitungan TA.")
-
-        df = processed_df[FEATURE_COLUMNS] # Pastikan urutan dan kolom sesuai
-
-        # --- PERBAIKAN WARNINGS `fillna` ---
-        # Ganti df.fillna(method='ffill', inplace=True) menjadi:
-        df = df.ffill().bfill().fillna(0)
-        # Ini lebih modern dan menghindari inplace/SettingWithCopyWarning
-        # df.fillna(method='ffill', inplace=True) # Hapus atau komen ini
-        # df.fillna(method='bfill', inplace=True) # Hapus atau komen ini
-        # df.fillna(0, inplace=True)             # Hapus atau komen ini
-
-        # Ambil N_STEPS_IN data terakhir sebagai input untuk model
-        if len(df) < N_STEPS_IN:
-            raise HTTPException(status_code=400, detail=f"Tidak cukup data yang valid setelah perhitungan TA untuk membentuk input {N_STEPS_IN} langkah. Hanya tersedia {len(df)} langkah.")
-
-        input_data_for_prediction = df.tail(N_STEPS_IN)
-        actual_history_data = df[TARGET_COLUMN_NAME].tail(N_STEPS_IN)
-        actual_history_dates = [d.strftime('%Y-%m-%d %H:%M') if 'H' in yf_interval else d.strftime('%Y-%m-%d') for d in actual_history_data.index]
-
-        prediction_request = PredictionRequest(
-            ticker=ticker,
-            timeframe=timeframe,
-            input_data=input_data_for_prediction.values.tolist()
-        )
-        prediction_result = await predict_endpoint(prediction_request)
-
-        mock_mae = 0.05 + np.random.rand() * 0.02
-        mock_mse = 0.003 + np.random.rand() * 0.001
-        mock_mape = 5.0 + np.random.rand() * 1.0
-
-        return ForecastResponse(
-            ticker=ticker,
-            timeframe=timeframe,
-            forecast=prediction_result["forecast"],
-            actual_history=actual_history_data.tolist(),
-            actual_history_dates=actual_history_dates,
-            mae=round(mock_mae, 4),
-            mse=round(mock_mse, 4),
-            mape=round(mock_mape, 2)
+    # Versi mencakup nilai bar terakhir: bar yang masih berjalan berubah tanpa timestamp baru
+    cache_version = (last_bar_key(data), model_version)
+    if model_version is not None and cache_version[0] != last_bar:
+        cached = forecast_cache.get(cache_key, cache_version)
+        if cached is not None:
+            return cached[0], cached[1], True
+
+    if FEATURE_POOL == "process":
+        history_index, input_data_np = await loop.run_in_executor(feature_executor, feature_window, data, N_STEPS_IN)
+    else:
+        history_index, input_data_np = await loop.run_in_executor(
+            feature_executor, build_forecast_input, ticker_yf, yf_interval, data, closed_only
         )
 
+    # Ambil N_STEPS_IN data terakhir sebagai input untuk model
+    if len(input_data_np) < N_STEPS_IN:
+        raise HTTPException(status_code=400, detail=f"Tidak cukup data yang valid setelah perhitungan TA untuk membentuk input {N_STEPS_IN} langkah. Hanya tersedia {len(input_data_np)} langkah.")
+
+    actual_history_data = input_data_np[:, TARGET_COLUMN_INDEX_IN_FEATURES]
+    actual_history_dates = [d.strftime('%Y-%m-%d %H:%M') if yf_interval in INTRADAY_INTERVALS else d.strftime('%Y-%m-%d') for d in history_index]
+
+    forecast = await predict_prices(entry, input_data_np)
+
+    if wait_metrics:
+        metrics = await model_metrics(entry, ticker_yf, timeframe, data)
+    else:
+        metrics = ready_metrics(entry, ticker_yf, timeframe, data)
+
+    result = ForecastResponse(
+        ticker=ticker,
+        timeframe=timeframe,
+        forecast=forecast,
+        actual_history=actual_history_data.tolist(),
+        actual_history_dates=actual_history_dates,
+        mae=round(metrics["mae"], 4) if metrics else None,
+        mse=round(metrics["mse"], 4) if metrics else None,
+        mape=round(metrics["mape"], 2) if metrics else None,
+        horizon_metrics=metrics["horizons"] if metrics else None,
+        metrics_in_sample=metrics["in_sample"] if metrics else None,
+        model_version=model_version,
+    )
+    body = result.model_dump_json().encode()
+    if model_version is not None:
+        forecast_cache.put(cache_key, cache_version, result, body)
+    return result, body, False
+
+
+@app.post("/forecast", response_model=ForecastResponse, summary="Lakukan peramalan harga saham dengan data YFinance terbaru")
+async def forecast_from_yfinance(request: ForecastRequest):
+    try:
+        cached = await cached_forecast(request.ticker, request.timeframe)
+        stored = await stored_forecast(request.ticker, request.timeframe) if cached is None else None
+        if cached is not None:
+            body, cache_status = cached[1], "HIT"
+        elif stored is not None:
+            body, cache_status = stored, "STORE"
+        else:
+            async with admission.slot():
+                _, body, cache_hit = await run_forecast(request.ticker, request.timeframe, check_cache=False)
+            cache_status = "HIT" if cache_hit else "MISS"
     except HTTPException as e:
         raise e
     except Exception as e:
         print(f"Kesalahan tak terduga dalam forecast_from_yfinance: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Kesalahan internal server saat forecasting: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Kesalahan internal server saat forecasting: {str(e)}")
+    # Body sudah diserialisasi saat hasil dibuat, sehingga cache hit tidak perlu validasi ulang
+    return Response(content=body, media_type="application/json", headers={"X-Cache": cache_status})
+
+
+@app.get("/forecast/cache", summary="Statistik cache hasil forecast")
+async def get_forecast_cache_stats():
+    return forecast_cache.stats()
+
+
+async def precompute_forecast(ticker: str, timeframe: str) -> None:
+    """Hitung forecast (dan metrik backtest) satu model lalu simpan ke forecast store."""
+    ticker_yf = to_yfinance_ticker(ticker)
+    async with admission.slot(bounded=False):
+        # Job ini berjalan di luar permintaan pengguna, jadi backtest ditunggu agar hasil tersimpan lengkap.
+        # Model dipakai tanpa promosi LRU agar job harian tidak mengeluarkan model yang sering dipakai.
+        result, body, _ = await run_forecast(ticker, timeframe, check_cache=False, wait_metrics=True,
+                                             promote_model=False)
+    # Kesegaran entri mengikuti waktu sinkronisasi bar yang dipakai, bukan waktu job
+    fetched_at = bar_store.fetched_at(ticker_yf, TIMEFRAME_MAP[timeframe]) or datetime.now(timezone.utc)
+    await asyncio.get_running_loop().run_in_executor(
+        fetch_executor, forecast_store.put, (ticker_yf, timeframe),
+        result.model_version, result.actual_history_dates[-1], fetched_at, body,
+    )
+
+
+def precompute_items() -> List[Tuple[str, str]]:
+    return [(m["ticker"], m["timeframe"]) for m in model_wrapper.get_available_models() if m["timeframe"] in TIMEFRAME_MAP]
+
+
+precompute_scheduler = PrecomputeScheduler(
+    precompute_items, precompute_forecast,
+    concurrency=PRECOMPUTE_CONCURRENCY, delay_minutes=PRECOMPUTE_DELAY_MINUTES,
+)
+
+
+@app.get("/forecast/precompute", summary="Status job prekomputasi forecast setelah bursa tutup")
+async def get_precompute_status():
+    return {"enabled": PRECOMPUTE_ENABLED, "store_entries": len(forecast_store), **precompute_scheduler.status()}
+
+
+@app.post("/forecast/precompute/run", status_code=202, summary="Jalankan prekomputasi forecast sekarang",
+          dependencies=[Depends(require_admin)])
+async def run_precompute_now():
+    if not precompute_scheduler.trigger():
+        raise HTTPException(status_code=409, detail="Prekomputasi forecast sedang berjalan.")
+    return {"status": "started"}
+
+
+def parse_backtest_date(value: Optional[str], tz) -> Optional[pd.Timestamp]:
+    if not value:
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Tanggal '{value}' tidak valid. Gunakan format ISO, misalnya 2025-01-31.")
+    if tz is not None and timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize(tz)
+    return timestamp
+
+
+@app.post("/backtest", summary="Backtest rolling-origin model pada rentang tanggal tertentu")
+async def backtest_endpoint(request: BacktestRequest):
+    yf_interval = TIMEFRAME_MAP.get(request.timeframe)
+    if not yf_interval:
+        raise HTTPException(status_code=400, detail=f"Timeframe '{request.timeframe}' tidak didukung. Timeframe yang didukung: {list(TIMEFRAME_MAP.keys())}")
+    ticker_yf = to_yfinance_ticker(request.ticker)
+
+    async with admission.slot():
+        entry = await get_model(request.ticker, request.timeframe)
+        data = await asyncio.get_running_loop().run_in_executor(
+            fetch_executor, load_forecast_bars, ticker_yf, yf_interval, request.timeframe
+        )
+        start = parse_backtest_date(request.start, data.index.tz)
+        end = parse_backtest_date(request.end, data.index.tz)
+        if start is None and end is None:
+            result = await model_metrics(entry, ticker_yf, request.timeframe, data)
+        else:
+            if end is not None and len(request.end) <= 10:
+                # Tanggal tanpa jam: sertakan seluruh hari tersebut
+                end += pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+            result = await backtest_model(entry, data, start=start, end=end)
+            if result.get("windows"):
+                cutoff = training_cutoff(entry["scaler"], data.index.tz)
+                result["in_sample"] = cutoff is None or pd.Timestamp(result["start"]) < cutoff
+
+    if not result or not result.get("windows"):
+        raise HTTPException(status_code=400, detail=f"Tidak ada jendela backtest untuk '{ticker_yf}' dalam rentang yang diminta. "
+                                                    f"Riwayat tersedia: {data.index[0].date()} s.d. {data.index[-1].date()}.")
+    return {"ticker": request.ticker, "timeframe": request.timeframe, "model_version": entry["version"], **result}
+
+
+def resolve_batch_tickers(request: BatchForecastRequest) -> List[str]:
+    if request.tickers == "all":
+        tickers = [m["ticker"] for m in model_wrapper.get_available_models() if m["timeframe"] == request.timeframe]
+    else:
+        # Buang duplikat dengan tetap menjaga urutan
+        tickers = list(dict.fromkeys(t.strip().upper() for t in request.tickers if t.strip()))
+
+    if not tickers:
+        raise HTTPException(status_code=400, detail="Daftar ticker kosong.")
+    if len(tickers) > MAX_FORECAST_BATCH:
+        raise HTTPException(status_code=400, detail=f"Maksimal {MAX_FORECAST_BATCH} ticker per batch. Diterima {len(tickers)}.")
+    return tickers
+
+
+async def forecast_batch_lines(tickers: List[str], timeframe: str):
+    """Jalankan forecast semua ticker dan hasilkan satu baris NDJSON per ticker segera setelah selesai."""
+    fetch_limit = asyncio.Semaphore(FORECAST_BATCH_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def forecast_one(ticker: str) -> Dict[str, Any]:
+        try:
+            # Batch sudah diterima: ticker-tikernya antre tanpa batas, berbagi slot dengan /forecast
+            async with admission.slot(bounded=False):
+                result, _, cache_hit = await run_forecast(ticker, timeframe, fetch_limit=fetch_limit)
+            return {"ticker": ticker, "status": "ok", "cache": "HIT" if cache_hit else "MISS", "result": result.model_dump()}
+        except HTTPException as e:
+            return {"ticker": ticker, "status": "error", "status_code": e.status_code, "detail": e.detail}
+        except Exception as e:
+            print(f"Kesalahan tak terduga saat forecast batch untuk {ticker}: {str(e)}")
+            return {"ticker": ticker, "status": "error", "status_code": 500, "detail": str(e)}
+
+    tasks = [asyncio.create_task(forecast_one(ticker)) for ticker in tickers]
+    counts = {"ok": 0, "error": 0}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            counts[line["status"]] += 1
+            yield json.dumps(line) + "\n"
+        yield json.dumps({
+            "status": "done",
+            "timeframe": timeframe,
+            "succeeded": counts["ok"],
+            "failed": counts["error"],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }) + "\n"
+    finally:
+        # Klien terputus: hentikan ticker yang belum selesai
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/forecast/batch", summary="Forecast banyak ticker sekaligus (stream NDJSON per ticker)")
+async def forecast_batch(request: BatchForecastRequest):
+    if request.timeframe not in TIMEFRAME_MAP:
+        raise HTTPException(status_code=400, detail=f"Timeframe '{request.timeframe}' tidak didukung. Timeframe yang didukung: {list(TIMEFRAME_MAP.keys())}")
+    tickers = resolve_batch_tickers(request)
+    if admission.is_full():
+        raise admission.reject()
+    return StreamingResponse(forecast_batch_lines(tickers, request.timeframe), media_type="application/x-ndjson")
+
+
+async def stream_forecast(ticker: str, timeframe: str) -> Tuple[Tuple[str, Optional[str]], bytes]:
+    """
+    Satu poll stream: sinkronkan bar lalu forecast dari bar tertutup. Selama bar tertutup terakhir
+    dan versi model sama, hasil diambil dari cache tanpa inferensi dan hub tidak mengirim apa pun.
+    """
+    async with admission.slot(bounded=False):
+        result, body, _ = await run_forecast(ticker, timeframe, check_cache=False, closed_only=True,
+                                             max_age=STREAM_POLL_SECONDS / 2)
+    return (result.actual_history_dates[-1], result.model_version), body
+
+
+stream_hub = ForecastStreamHub(stream_forecast, lambda now: next_poll_delay(now, STREAM_POLL_SECONDS))
+
+
+@app.get("/forecast/stream", summary="Langganan forecast (Server-Sent Events), diperbarui setiap bar baru ditutup")
+async def forecast_stream(tickers: str, timeframe: str = "1h"):
+    """
+    `tickers` dipisahkan koma. Setiap ticker dipoll sekali oleh server berapa pun jumlah pelanggannya;
+    event `forecast` (body ForecastResponse) dikirim saat forecast berubah, event `error` jika poll gagal.
+    Klien lambat hanya menerima forecast terbaru per ticker.
+    """
+    if timeframe not in TIMEFRAME_MAP:
+        raise HTTPException(status_code=400, detail=f"Timeframe '{timeframe}' tidak didukung. Timeframe yang didukung: {list(TIMEFRAME_MAP.keys())}")
+    requested = list(dict.fromkeys(t.strip().upper().replace(".JK", "") for t in tickers.split(",") if t.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="Daftar ticker kosong.")
+    if len(requested) > STREAM_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"Maksimal {STREAM_MAX_TICKERS} ticker per stream. Diterima {len(requested)}.")
+    missing = [t for t in requested if await model_version(t, timeframe) is None]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Model tidak ditemukan untuk {', '.join(missing)} dengan timeframe '{timeframe}'. Model tersedia: {model_wrapper.get_available_models()}")
+
+    subscriber = stream_hub.subscribe([(ticker, timeframe) for ticker in requested])
+
+    async def events():
+        try:
+            yield f"retry: {int(STREAM_POLL_SECONDS * 1000)}\n\n".encode()
+            while True:
+                try:
+                    _, event, body = await asyncio.wait_for(subscriber.next(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keepalive juga membuat koneksi yang sudah putus terdeteksi
+                    yield b": keepalive\n\n"
+                    continue
+                # Generator ini hanya lanjut setelah chunk sebelumnya terkirim: klien lambat menahan
+                # pengambilan event, sementara hub hanya menyimpan event terbaru per ticker
+                yield b"event: " + event.encode() + b"\ndata: " + body + b"\n\n"
+        finally:
+            stream_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/forecast/stream/stats", summary="Poller, pelanggan, dan event stream forecast")
+async def get_forecast_stream_stats():
+    return stream_hub.stats()
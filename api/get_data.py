@@ -1,22 +1,382 @@
 # File: backend_api.py
 
-from fastapi import FastAPI, HTTPException, Query, Depends
+from fastapi import FastAPI, HTTPException, Query, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional, Dict, Any
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Dict, Any, Set, Tuple, Type, Union, get_args, get_origin
 from pydantic import BaseModel
 import os
+import io
+import csv
+import json
+import zlib
+import base64
+import hmac
+import time
+import asyncio
+import threading
+import numpy as np
+import orjson
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import partial
 from datetime import datetime
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Supabase client pool configuration. A request holds its client for its
+# whole lifetime, so the pool size caps concurrent database-backed requests.
+SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "16"))
+SUPABASE_POOL_ACQUIRE_TIMEOUT = float(os.environ.get("SUPABASE_POOL_ACQUIRE_TIMEOUT", "10"))
+SUPABASE_HTTP_TIMEOUT = float(os.environ.get("SUPABASE_HTTP_TIMEOUT", "15"))
+
+# Blocking PostgREST calls run on this many worker threads; sized from the
+# pool (two per client) so fan-out endpoints still overlap their queries
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", str(2 * SUPABASE_POOL_SIZE)))
+DB_QUERY_TIMEOUT = float(os.environ.get("DB_QUERY_TIMEOUT", "20"))
+
+# /company/{ticker}: "parallel" fans out one query per table, "rpc" calls a
+# single database function that joins them (see sql/company_overview.sql)
+COMPANY_FETCH_MODE = os.environ.get("COMPANY_FETCH_MODE", "parallel")
+COMPANY_OVERVIEW_RPC = os.environ.get("COMPANY_OVERVIEW_RPC", "get_company_overview")
+COMPANY_SECTION_TIMEOUT = float(os.environ.get("COMPANY_SECTION_TIMEOUT", "5"))
+
+# Upper bound on `limit` for paged endpoints
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "1000"))
+MAX_BATCH_TICKERS = int(os.environ.get("MAX_BATCH_TICKERS", "200"))
+
+# Fundamentals snapshot behind /stock-screener
+SCREENER_REFRESH_SECONDS = float(os.environ.get("SCREENER_REFRESH_SECONDS", "900"))
+# Until the first snapshot is built, failed builds are retried after 1, 2, 4, ... seconds up to this cap
+SCREENER_RETRY_MAX_SECONDS = float(os.environ.get("SCREENER_RETRY_MAX_SECONDS", "60"))
+
+# Shared secret for the admin endpoints (they are disabled when unset)
+ADMIN_API_TOKEN = os.environ.get("ADMIN_API_TOKEN")
+
+# Response section name -> source table
+COMPANY_SECTION_TABLES = {
+    "info": "company_info",
+    "finance": "company_finance",
+    "valuation": "company_valuation",
+    "dividend": "company_dividend",
+    "growth": "company_growth",
+    "profitabilities": "company_profitabilities",
+    "liquidity": "company_liquidity",
+}
+
+# Lookup cache for the company_* endpoints; fundamentals change at most daily
+COMPANY_CACHE_MAX_ENTRIES = int(os.environ.get("COMPANY_CACHE_MAX_ENTRIES", "5000"))
+COMPANY_CACHE_TTLS = {
+    table_name: float(os.environ.get(f"CACHE_TTL_{table_name.upper()}", "86400" if table_name == "company_info" else "21600"))
+    for table_name in COMPANY_SECTION_TABLES.values()
+}
+# Unknown tickers are cached only briefly, so a newly listed company shows up quickly
+COMPANY_CACHE_NEGATIVE_TTL = float(os.environ.get("COMPANY_CACHE_NEGATIVE_TTL", "300"))
+
+# Source table -> screener metrics it provides
+SCREENER_TABLE_METRICS = {
+    "company_finance": ["marketcap", "profitmargins", "grossmargins", "operatingmargins", "trailingeps"],
+    "company_valuation": ["trailingpe", "forwardpe", "pricetobook", "pricetosalestrailing12months"],
+    "company_dividend": ["dividendyield", "payoutratio"],
+    "company_growth": ["revenuegrowth", "earningsgrowth", "earningsquarterlygrowth"],
+    "company_profitabilities": ["returnonequity", "returnonassets"],
+    "company_liquidity": ["currentratio", "debttoequity"],
+}
+
+# Metric order of a screener result row
+SCREENER_METRICS = [
+    "marketcap", "trailingpe", "forwardpe", "pricetobook", "pricetosalestrailing12months",
+    "dividendyield", "payoutratio", "profitmargins", "grossmargins", "operatingmargins",
+    "returnonequity", "returnonassets", "revenuegrowth", "earningsgrowth", "earningsquarterlygrowth",
+    "currentratio", "debttoequity", "trailingeps",
+]
+
+
+class SupabaseClientPool:
+    """
+    Bounded pool of long-lived Supabase clients.
+    Each client keeps its own keep-alive HTTP session, so requests reuse
+    open connections instead of paying a new TLS handshake every time.
+    """
+
+    def __init__(self, url: str, key: str, size: int, acquire_timeout: float, http_timeout: float):
+        self.url = url
+        self.key = key
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.http_timeout = http_timeout
+        self._options = SyncClientOptions(postgrest_client_timeout=http_timeout)
+        self._clients: List[Client] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        # id(client) -> queries abandoned on that client after a timeout
+        self._retired: Dict[int, List[Future]] = {}
+        self._replacing: Set[asyncio.Task] = set()
+        self.created_at = datetime.now()
+        self.acquired_total = 0
+        self.waited_total = 0
+        self.timeouts_total = 0
+        self.replaced_total = 0
+        self.peak_in_use = 0
+
+        for _ in range(size):
+            client = create_client(url, key, options=self._options)
+            self._clients.append(client)
+            self._idle.put_nowait(client)
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self._idle.qsize()
+
+    async def acquire(self) -> Client:
+        if self._idle.empty():
+            self.waited_total += 1
+        try:
+            client = await asyncio.wait_for(self._idle.get(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts_total += 1
+            raise HTTPException(status_code=503, detail="Database connection pool exhausted, please retry")
+        self.acquired_total += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return client
+
+    def retire(self, client: Client, abandoned: Future) -> None:
+        """
+        Take a client out of rotation because a query on it was abandoned mid-flight.
+        Its holder may keep using it until release(), which swaps a fresh client into
+        the pool; the old one is closed once every abandoned query on it has returned.
+        """
+        self._retired.setdefault(id(client), []).append(abandoned)
+
+    @asynccontextmanager
+    async def lease(self):
+        client = await self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def release(self, client: Client) -> None:
+        abandoned = self._retired.pop(id(client), None)
+        if abandoned is None:
+            self._idle.put_nowait(client)
+            return
+        self._clients.remove(client)
+        self._close_when_done(client, abandoned)
+        # create_client blocks, so the replacement is built off the event loop
+        task = asyncio.get_running_loop().create_task(self._replace_client())
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    async def _replace_client(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                client = await loop.run_in_executor(
+                    None, partial(create_client, self.url, self.key, options=self._options)
+                )
+                break
+            except Exception as e:
+                print(f"Creating a replacement Supabase client failed: {e!r}")
+                await asyncio.sleep(1)
+        self._clients.append(client)
+        self.replaced_total += 1
+        self._idle.put_nowait(client)
+
+    def _close_when_done(self, client: Client, abandoned: List[Future]) -> None:
+        """Close `client` after the last of its abandoned queries returns (callbacks run in worker threads)."""
+        pending = set(abandoned)
+        lock = threading.Lock()
+
+        def on_done(future: Future) -> None:
+            with lock:
+                pending.discard(future)
+                if pending:
+                    return
+            self._close_client(client)
+
+        for future in abandoned:
+            future.add_done_callback(on_done)
+
+    @staticmethod
+    def _close_client(client: Client) -> None:
+        # postgrest-py names the sync close method `aclose` in some releases
+        postgrest = client.postgrest
+        close = getattr(postgrest, "aclose", None) or getattr(postgrest, "close", None)
+        if close:
+            close()
+
+    def close(self) -> None:
+        for task in self._replacing:
+            task.cancel()
+        for client in self._clients:
+            self._close_client(client)
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "idle": self._idle.qsize(),
+            "peak_in_use": self.peak_in_use,
+            "acquired_total": self.acquired_total,
+            "waited_total": self.waited_total,
+            "timeouts_total": self.timeouts_total,
+            "replaced_total": self.replaced_total,
+            "acquire_timeout_seconds": self.acquire_timeout,
+            "http_timeout_seconds": self.http_timeout,
+            "created_at": self.created_at,
+        }
+
+
+class LookupCache:
+    """
+    Size-bounded LRU cache with per-table TTLs for company_* lookups.
+    Concurrent misses for the same key share a single in-flight load;
+    None results (no row) are kept for `negative_ttl` seconds only.
+    """
+
+    def __init__(self, max_entries: int, ttls: Dict[str, float], negative_ttl: float):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get_or_load(self, table: str, ticker: str, loader):
+        key = (table, ticker)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_loaded(key, done))
+        # Shield so a cancelled caller does not cancel the load other callers wait on
+        return await asyncio.shield(task)
+
+    def _on_loaded(self, key: Tuple[str, str], task: asyncio.Task) -> None:
+        # A load dropped by invalidate() finishes for its waiters but is not stored
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        ttl = self.negative_ttl if value is None else self.ttls.get(key[0], 0)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, table: Optional[str] = None, ticker: Optional[str] = None) -> int:
+        def matches(key: Tuple[str, str]) -> bool:
+            return (table is None or key[0] == table) and (ticker is None or key[1] == ticker)
+
+        keys = [key for key in self._entries if matches(key)]
+        for key in keys:
+            del self._entries[key]
+        # Loads started before the invalidation may return the old row; forget them
+        # so their result is not written back and the next lookup loads afresh
+        for key in [key for key in self._inflight if matches(key)]:
+            del self._inflight[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "ttl_seconds": self.ttls,
+            "negative_ttl_seconds": self.negative_ttl,
+        }
+
+
+supabase_pool: Optional[SupabaseClientPool] = None
+company_cache = LookupCache(COMPANY_CACHE_MAX_ENTRIES, COMPANY_CACHE_TTLS, COMPANY_CACHE_NEGATIVE_TTL)
+db_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def run_query(query, client: Client):
+    """
+    Execute a PostgREST query builder on the DB thread pool so the event
+    loop keeps serving other requests while waiting on the round-trip.
+    `client` is the pooled client the query was built from. A query abandoned
+    on timeout (or by a cancelled caller) keeps running in its thread, so that
+    client is retired rather than handed to another request.
+    """
+    future = db_executor.submit(query.execute)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=DB_QUERY_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Database query timed out")
+    finally:
+        if not future.done():
+            supabase_pool.retire(client, future)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global supabase_pool, db_executor
+    db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="supabase")
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_key = os.environ.get("SUPABASE_KEY")
+
+    refresh_task = None
+    if supabase_url and supabase_key:
+        supabase_pool = SupabaseClientPool(
+            supabase_url,
+            supabase_key,
+            size=SUPABASE_POOL_SIZE,
+            acquire_timeout=SUPABASE_POOL_ACQUIRE_TIMEOUT,
+            http_timeout=SUPABASE_HTTP_TIMEOUT,
+        )
+        refresh_task = asyncio.create_task(fundamentals_refresh_loop())
+    try:
+        yield
+    finally:
+        if refresh_task:
+            refresh_task.cancel()
+        if supabase_pool:
+            supabase_pool.close()
+            supabase_pool = None
+        db_executor.shutdown(wait=False)
+        db_executor = None
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Advanced Stock Market Analytics API",
     description="Backend API for stock market analysis with real database integration",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -25,16 +385,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-def get_supabase_client() -> Client:
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
+async def get_supabase_client():
+    """Lease a pooled client for the duration of the request."""
+    if supabase_pool is None:
         raise HTTPException(status_code=500, detail="Supabase credentials not configured")
     
-    return create_client(supabase_url, supabase_key)
+    client = await supabase_pool.acquire()
+    try:
+        yield client
+    finally:
+        supabase_pool.release(client)
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_API_TOKEN is not set")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
 # Pydantic models for API responses
 class StockPrice(BaseModel):
@@ -103,6 +472,41 @@ class CompanyLiquidity(BaseModel):
     debttoequity: Optional[float] = None
     currentratio: Optional[float] = None
 
+# Fast serialization for large list responses.
+# Rows come straight from our own schema, so instead of validating every row
+# through a pydantic object we only project/coerce the model's fields with a
+# serializer compiled once per model and encode with orjson. The routes keep
+# their response_model so the OpenAPI schema is unchanged.
+def compile_row_serializer(model: Type[BaseModel]):
+    coercers = []
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) is Union:
+            annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+        # float/int columns are coerced; str and datetime pass through as the DB sent them
+        coercers.append((name, annotation if annotation in (float, int) else None))
+
+    def serialize(rows: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        selected = coercers if fields is None else [item for item in coercers if item[0] in fields]
+        return [
+            {
+                name: value if coerce is None or value is None else coerce(value)
+                for name, coerce in selected
+                for value in (row.get(name),)
+            }
+            for row in rows
+        ]
+
+    return serialize
+
+def fast_json_response(rows: List[Dict[str, Any]], serializer=None) -> Response:
+    if serializer:
+        rows = serializer(rows)
+    return Response(content=orjson.dumps(rows), media_type="application/json")
+
+serialize_stock_prices = compile_row_serializer(StockPrice)
+serialize_company_info = compile_row_serializer(CompanyInfo)
+
 # API Endpoints
 
 @app.get("/")
@@ -118,16 +522,64 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now()}
 
+@app.get("/pool-stats")
+async def pool_stats():
+    """Report usage of the Supabase client pool"""
+    if supabase_pool is None:
+        raise HTTPException(status_code=500, detail="Supabase credentials not configured")
+    return supabase_pool.stats()
+
 # Stock Price endpoints
+def encode_price_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor pointing at the last row of a page"""
+    payload = json.dumps([row["ticker"], row["timeframe"], row["datetime"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_price_cursor(cursor: str):
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_ticker, cursor_timeframe, cursor_datetime = json.loads(payload)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return cursor_ticker, cursor_timeframe, cursor_datetime
+
+def apply_price_cursor(query, cursor: str, ticker: Optional[str], timeframe: Optional[str]):
+    """Keep only rows after the cursor in (datetime desc, ticker, timeframe) order"""
+    cursor_ticker, cursor_timeframe, cursor_datetime = decode_price_cursor(cursor)
+    if ticker and timeframe:
+        # Ticker and timeframe are fixed, so datetime alone is the key
+        return query.lt("datetime", cursor_datetime)
+    dt, t, tf = (f'"{value}"' for value in (cursor_datetime, cursor_ticker, cursor_timeframe))
+    return query.or_(
+        f"datetime.lt.{dt},and(datetime.eq.{dt},or(ticker.gt.{t},and(ticker.eq.{t},timeframe.gt.{tf})))"
+    )
+
+def order_price_query(query, limit: int, offset: int, cursor: Optional[str], ticker: Optional[str], timeframe: Optional[str]):
+    if cursor:
+        query = apply_price_cursor(query, cursor, ticker, timeframe)
+    query = query.order("datetime", desc=True).order("ticker").order("timeframe").limit(limit)
+    # offset is kept for older clients; a cursor makes it unnecessary
+    if offset and not cursor:
+        query = query.offset(offset)
+    return query
+
+def set_next_cursor(result: Response, rows: List[Dict[str, Any]], limit: int):
+    if len(rows) == limit:
+        result.headers["X-Next-Cursor"] = encode_price_cursor(rows[-1])
+
 @app.get("/stock-prices/", response_model=List[StockPrice])
 async def get_stock_prices(
     ticker: Optional[str] = None,
     timeframe: Optional[str] = Query("1d", description="Timeframe of the stock price data (e.g., '1d', '1wk', '1mo')"), # <--- DITAMBAHKAN KEMBALI
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
     offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Get stock prices with optional filtering"""
+    """
+    Get stock prices with optional filtering.
+    Full pages carry an X-Next-Cursor header; pass it back as `cursor` for the next page.
+    """
     query = supabase.table("stock_prices").select("*")
     
     if ticker:
@@ -135,14 +587,147 @@ async def get_stock_prices(
     if timeframe: # <--- FILTER DITAMBAHKAN
         query = query.eq("timeframe", timeframe)
     
-    query = query.order("datetime", desc=True).limit(limit).offset(offset)
+    query = order_price_query(query, limit, offset, cursor, ticker, timeframe)
     
-    response = query.execute()
+    response = await run_query(query, supabase)
     
     if hasattr(response, "error") and response.error:
         raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
     
-    return response.data
+    result = fast_json_response(response.data, serialize_stock_prices)
+    set_next_cursor(result, response.data, limit)
+    return result
+
+# Bulk export: rows are fetched in chunks and written as they arrive
+PRICE_EXPORT_COLUMNS = ["datetime", "ticker", "open", "high", "low", "close", "volume", "timeframe"]
+
+PRICE_EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+async def iter_price_chunks(tickers: List[str], timeframe: str, start_date: Optional[str], end_date: Optional[str], chunk_size: int):
+    """Yield stock_prices rows ticker by ticker, oldest first, one keyset page at a time"""
+    supabase = await supabase_pool.acquire()
+    try:
+        for ticker in tickers:
+            last_datetime = None
+            while True:
+                query = supabase.table("stock_prices").select(", ".join(PRICE_EXPORT_COLUMNS))
+                query = query.eq("ticker", ticker).eq("timeframe", timeframe)
+                if start_date:
+                    query = query.gte("datetime", start_date)
+                if end_date:
+                    query = query.lte("datetime", end_date)
+                if last_datetime:
+                    query = query.gt("datetime", last_datetime)
+                response = await run_query(query.order("datetime").limit(chunk_size), supabase)
+                if hasattr(response, "error") and response.error:
+                    raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
+                if not response.data:
+                    break
+                yield response.data
+                if len(response.data) < chunk_size:
+                    break
+                last_datetime = response.data[-1]["datetime"]
+    finally:
+        supabase_pool.release(supabase)
+
+async def encode_ndjson(chunks):
+    async for rows in chunks:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+async def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=PRICE_EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def encode_arrow(chunks):
+    schema = pa.schema([
+        ("datetime", pa.timestamp("us", tz="UTC")),
+        ("ticker", pa.string()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.int64()),
+        ("timeframe", pa.string()),
+    ])
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(buffer, schema)
+
+    def drain() -> bytes:
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    async for rows in chunks:
+        columns = {name: [row[name] for row in rows] for name in PRICE_EXPORT_COLUMNS}
+        # timestamptz columns arrive with an offset, timestamp columns without one; naive values are taken as UTC
+        datetimes = pd.to_datetime(columns["datetime"], utc=True, format="ISO8601")
+        columns["datetime"] = pa.array(datetimes, type=schema.field("datetime").type)
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
+
+async def prepend_chunk(first: bytes, chunks):
+    yield first
+    async for data in chunks:
+        yield data
+
+async def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for data in chunks:
+        compressed = compressor.compress(data)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+@app.get("/stock-prices/export")
+async def export_stock_prices(
+    request: Request,
+    tickers: str = Query(..., description="Comma-separated tickers, e.g. 'BBCA.JK,BBRI.JK'"),
+    timeframe: str = Query("1d", description="Timeframe of the stock price data (e.g., '1d', '1wk', '1mo')"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    format: str = Query("ndjson", description="ndjson, csv or arrow (Arrow IPC stream)"),
+    chunk_size: int = Query(1000, ge=1, le=MAX_PAGE_SIZE, description="Rows fetched per database round-trip"),
+):
+    """
+    Stream full OHLCV history for many tickers.
+    Memory stays flat regardless of range; the body is gzipped when the client accepts it.
+    """
+    if supabase_pool is None:
+        raise HTTPException(status_code=500, detail="Supabase credentials not configured")
+    if format not in PRICE_EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format '{format}'. Use one of {list(PRICE_EXPORT_MEDIA_TYPES)}")
+    ticker_list = [ticker.strip() for ticker in tickers.split(",") if ticker.strip()]
+    if not ticker_list:
+        raise HTTPException(status_code=400, detail="At least one ticker is required")
+
+    chunks = iter_price_chunks(ticker_list, timeframe, start_date, end_date, chunk_size)
+    encoders = {"ndjson": encode_ndjson, "csv": encode_csv, "arrow": encode_arrow}
+    body = encoders[format](chunks)
+    # Lease the client and fetch/encode the first chunk before the status line is sent,
+    # so pool exhaustion, database errors and unencodable rows still become an HTTP error
+    body = prepend_chunk(await anext(body, b""), body)
+
+    headers = {"Content-Disposition": f'attachment; filename="stock_prices_{timeframe}.{format}"', "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body, media_type=PRICE_EXPORT_MEDIA_TYPES[format], headers=headers)
 
 @app.get("/stock-prices/{ticker}", response_model=List[StockPrice])
 async def get_stock_price_by_ticker(
@@ -150,10 +735,15 @@ async def get_stock_price_by_ticker(
     timeframe: Optional[str] = Query("1d", description="Timeframe of the stock price data (e.g., '1d', '1wk', '1mo')"), # <--- DITAMBAHKAN KEMBALI
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Get stock prices for a specific ticker"""
+    """
+    Get stock prices for a specific ticker.
+    Full pages carry an X-Next-Cursor header; pass it back as `cursor` for the next page.
+    """
     query = supabase.table("stock_prices").select("*").eq("ticker", ticker)
     
     if timeframe: # <--- FILTER DITAMBAHKAN
@@ -165,200 +755,430 @@ async def get_stock_price_by_ticker(
     if end_date:
         query = query.lte("datetime", end_date)
     
-    query = query.order("datetime", desc=True).limit(limit)
+    query = order_price_query(query, limit, offset, cursor, ticker, timeframe)
     
-    response = query.execute()
+    response = await run_query(query, supabase)
     
     if hasattr(response, "error") and response.error:
         raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
     
     if not response.data:
+        if cursor or offset:
+            return []
         raise HTTPException(status_code=404, detail=f"No stock prices found for ticker {ticker}")
     
-    return response.data
+    result = fast_json_response(response.data, serialize_stock_prices)
+    set_next_cursor(result, response.data, limit)
+    return result
 
 # --- Bagian lain dari API tetap sama ---
+# Cached company_* lookups
+async def fetch_company_row(table_name: str, ticker: str) -> Optional[Dict[str, Any]]:
+    """One company_* row by ticker (None when missing), served from the lookup cache"""
+    if supabase_pool is None:
+        raise HTTPException(status_code=500, detail="Supabase credentials not configured")
+
+    async def load():
+        # The shared load can outlive the request that started it, so it leases its own client
+        async with supabase_pool.lease() as supabase:
+            response = await run_query(supabase.table(table_name).select("*").eq("ticker", ticker), supabase)
+        if hasattr(response, "error") and response.error:
+            raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
+        return response.data[0] if response.data else None
+
+    return await company_cache.get_or_load(table_name, ticker, load)
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters of the company lookup cache"""
+    return company_cache.stats()
+
+@app.delete("/cache", dependencies=[Depends(require_admin)])
+async def invalidate_cache(
+    ticker: Optional[str] = Query(None, description="Only drop entries for this ticker"),
+    table: Optional[str] = Query(None, description="Only drop entries for this table, e.g. 'company_finance'"),
+):
+    """Drop cached company lookups; with no filters the whole cache is cleared"""
+    if table and table not in COMPANY_CACHE_TTLS:
+        raise HTTPException(status_code=400, detail=f"Unknown table '{table}'. Available: {list(COMPANY_CACHE_TTLS)}")
+    return {"invalidated": company_cache.invalidate(table=table, ticker=ticker)}
+
 # Company Info endpoints
 @app.get("/company-info/", response_model=List[CompanyInfo])
 async def get_all_company_info(
     sector: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return, e.g. 'ticker,longname,sector'. ticker is always included"),
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Get all company information with optional sector filtering"""
-    query = supabase.table("company_info").select("*")
+    """Get all company information with optional sector filtering and column projection"""
+    columns = None
+    if fields:
+        columns = ["ticker"] + [field.strip() for field in fields.split(",") if field.strip() and field.strip() != "ticker"]
+        unknown = [column for column in columns if column not in CompanyInfo.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}. Available: {list(CompanyInfo.model_fields)}")
+    
+    query = supabase.table("company_info").select(", ".join(columns) if columns else "*")
     
     if sector:
         query = query.eq("sector", sector)
     
     query = query.limit(limit).offset(offset)
     
-    response = query.execute()
+    response = await run_query(query, supabase)
     
     if hasattr(response, "error") and response.error:
         raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
     
-    return response.data
+    return fast_json_response(response.data, lambda rows: serialize_company_info(rows, fields=columns))
 
 @app.get("/company-info/{ticker}", response_model=CompanyInfo)
 async def get_company_info_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company information for a specific ticker"""
-    response = supabase.table("company_info").select("*").eq("ticker", ticker).execute()
+    row = await fetch_company_row("company_info", ticker)
     
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
-    
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company info not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Company Finance endpoints
 @app.get("/company-finance/{ticker}", response_model=CompanyFinance)
 async def get_company_finance_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company finance data for a specific ticker"""
-    response = supabase.table("company_finance").select("*").eq("ticker", ticker).execute()
+    row = await fetch_company_row("company_finance", ticker)
     
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
-    
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company finance data not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Company Valuation endpoints
 @app.get("/company-valuation/{ticker}", response_model=CompanyValuation)
 async def get_company_valuation_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company valuation data for a specific ticker"""
-    response = supabase.table("company_valuation").select("*").eq("ticker", ticker).execute()
+    row = await fetch_company_row("company_valuation", ticker)
     
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
-    
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company valuation not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Company Dividend endpoints
 @app.get("/company-dividend/{ticker}", response_model=CompanyDividend)
 async def get_company_dividend_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company dividend data for a specific ticker"""
-    response = supabase.table("company_dividend").select("*").eq("ticker", ticker).execute()
+    row = await fetch_company_row("company_dividend", ticker)
     
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
-    
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company dividend not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Company Growth endpoints
 @app.get("/company-growth/{ticker}", response_model=CompanyGrowth)
 async def get_company_growth_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company growth data for a specific ticker"""
-    response = supabase.table("company_growth").select("*").eq("ticker", ticker).execute()
-    
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
+    row = await fetch_company_row("company_growth", ticker)
     
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company growth data not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Company Profitabilities endpoints
 @app.get("/company-profitabilities/{ticker}", response_model=CompanyProfitabilities)
 async def get_company_profitabilities_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company profitabilities data for a specific ticker"""
-    response = supabase.table("company_profitabilities").select("*").eq("ticker", ticker).execute()
-    
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
+    row = await fetch_company_row("company_profitabilities", ticker)
     
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company profitabilities not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Company Liquidity endpoints
 @app.get("/company-liquidity/{ticker}", response_model=CompanyLiquidity)
 async def get_company_liquidity_by_ticker(
-    ticker: str,
-    supabase: Client = Depends(get_supabase_client)
+    ticker: str
 ):
     """Get company liquidity data for a specific ticker"""
-    response = supabase.table("company_liquidity").select("*").eq("ticker", ticker).execute()
-    
-    if hasattr(response, "error") and response.error:
-        raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
+    row = await fetch_company_row("company_liquidity", ticker)
     
-    if not response.data:
+    if row is None:
         raise HTTPException(status_code=404, detail=f"Company liquidity not found for ticker {ticker}")
     
-    return response.data[0]
+    return row
 
 # Comprehensive company data endpoint
-@app.get("/company/{ticker}")
-async def get_comprehensive_company_data(
-    ticker: str,
+async def fetch_company_section(table_name: str, ticker: str):
+    """Fetch one company_* row, or None when the ticker has no row in that table"""
+    return await asyncio.wait_for(fetch_company_row(table_name, ticker), timeout=COMPANY_SECTION_TIMEOUT)
+
+def is_section_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, asyncio.TimeoutError) or (isinstance(exc, HTTPException) and exc.status_code == 504)
+
+def resolve_company_sections(fields: Optional[List[str]]) -> List[str]:
+    if not fields:
+        return list(COMPANY_SECTION_TABLES.keys())
+    unknown = [field for field in fields if field not in COMPANY_SECTION_TABLES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}. Available: {list(COMPANY_SECTION_TABLES)}")
+    return [section for section in COMPANY_SECTION_TABLES if section in fields]
+
+async def fetch_company_batch(supabase: Client, tickers: List[str], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """One in_() query per requested table, shaped like /company/{ticker} per ticker"""
+    tickers = list(dict.fromkeys(ticker.strip() for ticker in tickers if ticker.strip()))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="At least one ticker is required")
+    if len(tickers) > MAX_BATCH_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_TICKERS} tickers per batch")
+    sections = resolve_company_sections(fields)
+
+    async def fetch_section_rows(table_name: str):
+        response = await asyncio.wait_for(
+            run_query(supabase.table(table_name).select("*").in_("ticker", tickers), supabase),
+            timeout=COMPANY_SECTION_TIMEOUT,
+        )
+        if hasattr(response, "error") and response.error:
+            raise HTTPException(status_code=500, detail=f"Database error fetching {table_name}: {response.error}")
+        return {item["ticker"]: item for item in response.data}
+
+    responses = await asyncio.gather(
+        *(fetch_section_rows(COMPANY_SECTION_TABLES[section]) for section in sections),
+        return_exceptions=True,
+    )
+
+    result = {ticker: {"ticker": ticker} for ticker in tickers}
+    timed_out_sections = []
+    for section, response in zip(sections, responses):
+        if is_section_timeout(response):
+            timed_out_sections.append(section)
+            response = {}
+        elif isinstance(response, BaseException):
+            raise response
+        for ticker in tickers:
+            result[ticker][section] = response.get(ticker)
+    for ticker in tickers:
+        result[ticker]["timed_out_sections"] = timed_out_sections
+    return result
+
+class CompanyBatchRequest(BaseModel):
+    tickers: List[str]
+    fields: Optional[List[str]] = None
+
+@app.get("/company/batch")
+async def get_company_batch(
+    tickers: str = Query(..., description="Comma-separated tickers, e.g. 'BBCA.JK,BBRI.JK'"),
+    fields: Optional[str] = Query(None, description="Comma-separated sections to include (info, finance, valuation, dividend, growth, profitabilities, liquidity)"),
+    supabase: Client = Depends(get_supabase_client)
+):
+    """Get comprehensive company data for many tickers, keyed by ticker"""
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    return await fetch_company_batch(supabase, tickers.split(","), field_list)
+
+@app.post("/company/batch")
+async def post_company_batch(
+    request: CompanyBatchRequest,
     supabase: Client = Depends(get_supabase_client)
 ):
-    """Get comprehensive company data from all tables"""
-    # Get data from each table for the specified ticker
-    info_response = supabase.table("company_info").select("*").eq("ticker", ticker).execute()
-    finance_response = supabase.table("company_finance").select("*").eq("ticker", ticker).execute()
-    valuation_response = supabase.table("company_valuation").select("*").eq("ticker", ticker).execute()
-    dividend_response = supabase.table("company_dividend").select("*").eq("ticker", ticker).execute()
-    growth_response = supabase.table("company_growth").select("*").eq("ticker", ticker).execute()
-    profitabilities_response = supabase.table("company_profitabilities").select("*").eq("ticker", ticker).execute()
-    liquidity_response = supabase.table("company_liquidity").select("*").eq("ticker", ticker).execute()
-    
-    # Check for errors in any response
-    responses = [info_response, finance_response, valuation_response, 
-                 dividend_response, growth_response, profitabilities_response, 
-                 liquidity_response]
-    
-    for response in responses:
+    """Same as GET /company/batch, for ticker lists too long for a query string"""
+    return await fetch_company_batch(supabase, request.tickers, request.fields)
+
+@app.get("/company/{ticker}")
+async def get_comprehensive_company_data(ticker: str):
+    """
+    Get comprehensive company data from all tables.
+    Sections that time out are returned as null and listed in `timed_out_sections`.
+    """
+    if COMPANY_FETCH_MODE == "rpc":
+        if supabase_pool is None:
+            raise HTTPException(status_code=500, detail="Supabase credentials not configured")
+        # Option B: a single round-trip to a database function joining all tables
+        async with supabase_pool.lease() as supabase:
+            response = await run_query(supabase.rpc(COMPANY_OVERVIEW_RPC, {"p_ticker": ticker}), supabase)
         if hasattr(response, "error") and response.error:
             raise HTTPException(status_code=500, detail=f"Database error: {response.error}")
+        overview = response.data or {}
+        result = {"ticker": ticker}
+        for section in COMPANY_SECTION_TABLES:
+            result[section] = overview.get(section)
+        result["timed_out_sections"] = []
+        return result
+
+    # Issue all seven lookups at once so latency tracks the slowest table, not the sum
+    sections = list(COMPANY_SECTION_TABLES.keys())
+    responses = await asyncio.gather(
+        *(fetch_company_section(COMPANY_SECTION_TABLES[section], ticker) for section in sections),
+        return_exceptions=True,
+    )
     
     # Combine all data into a single response
-    result = {
-        "ticker": ticker,
-        "info": info_response.data[0] if info_response.data else None,
-        "finance": finance_response.data[0] if finance_response.data else None,
-        "valuation": valuation_response.data[0] if valuation_response.data else None,
-        "dividend": dividend_response.data[0] if dividend_response.data else None,
-        "growth": growth_response.data[0] if growth_response.data else None,
-        "profitabilities": profitabilities_response.data[0] if profitabilities_response.data else None,
-        "liquidity": liquidity_response.data[0] if liquidity_response.data else None
-    }
+    result = {"ticker": ticker}
+    timed_out_sections = []
+    for section, response in zip(sections, responses):
+        if is_section_timeout(response):
+            result[section] = None
+            timed_out_sections.append(section)
+        elif isinstance(response, BaseException):
+            raise response
+        else:
+            result[section] = response
+    result["timed_out_sections"] = timed_out_sections
     
     return result
 
-# Stock screener endpoint (tidak ada perubahan signifikan yang diminta di sini)
+# Stock screener: in-memory fundamentals snapshot
+class FundamentalsSnapshot:
+    """
+    Columnar copy of every screener metric: one float64 array per metric,
+    aligned by ticker, with NaN where the source row or value is missing.
+    Snapshots are immutable; a refresh builds a new one and swaps it in.
+    """
+
+    def __init__(self, info_rows: List[Dict[str, Any]], table_rows: Dict[str, List[Dict[str, Any]]], version: int):
+        self.version = version
+        self.built_at = datetime.now()
+        self.tickers = [item["ticker"] for item in info_rows]
+        self.names = [item.get("longname") for item in info_rows]
+        self.sectors = np.array([item.get("sector") for item in info_rows], dtype=object)
+        sector_counts: Dict[str, int] = {}
+        for sector in self.sectors:
+            if sector:
+                sector_counts[sector] = sector_counts.get(sector, 0) + 1
+        self.sector_counts = [{"sector": sector, "tickers": sector_counts[sector]} for sector in sorted(sector_counts)]
+        position = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        self.metrics: Dict[str, np.ndarray] = {}
+        for table_name, columns in SCREENER_TABLE_METRICS.items():
+            arrays = {column: np.full(len(self.tickers), np.nan) for column in columns}
+            for item in table_rows[table_name]:
+                i = position.get(item["ticker"])
+                if i is None:
+                    continue
+                for column in columns:
+                    value = item.get(column)
+                    if value is not None:
+                        arrays[column][i] = value
+            self.metrics.update(arrays)
+
+    def screen(self, sector: Optional[str], filters) -> np.ndarray:
+        """Return indices of matching tickers sorted by market cap (descending)"""
+        mask = np.ones(len(self.tickers), dtype=bool)
+        if sector:
+            mask &= self.sectors == sector
+        for bound, metric, comparison in filters:
+            if bound is None:
+                continue
+            values = self.metrics[metric]
+            # Missing (NaN) and zero values never pass, as with the old `not value` checks
+            mask &= values != 0
+            mask &= (values >= bound) if comparison == "min" else (values <= bound)
+
+        indices = np.flatnonzero(mask)
+        market_cap = np.nan_to_num(self.metrics["marketcap"][indices], nan=0.0)
+        return indices[np.argsort(-market_cap, kind="stable")]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        result = {"ticker": self.tickers[i], "name": self.names[i], "sector": self.sectors[i]}
+        for metric in SCREENER_METRICS:
+            value = self.metrics[metric][i]
+            result[metric] = None if np.isnan(value) else float(value)
+        return result
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "built_at": self.built_at,
+            "age_seconds": round((datetime.now() - self.built_at).total_seconds(), 3),
+            "tickers": len(self.tickers),
+        }
+
+
+fundamentals_snapshot: Optional[FundamentalsSnapshot] = None
+_snapshot_lock = asyncio.Lock()
+
+
+async def refresh_fundamentals_snapshot() -> FundamentalsSnapshot:
+    """Rebuild the snapshot from the company_* tables and swap it in atomically"""
+    global fundamentals_snapshot
+    if supabase_pool is None:
+        raise HTTPException(status_code=500, detail="Supabase credentials not configured")
+
+    async with _snapshot_lock:
+        supabase = await supabase_pool.acquire()
+        try:
+            async def fetch_table_data(table_name: str, columns: List[str]):
+                response = await run_query(supabase.table(table_name).select(", ".join(["ticker"] + columns)), supabase)
+                if hasattr(response, "error") and response.error:
+                    raise HTTPException(status_code=500, detail=f"Database error fetching {table_name}: {response.error}")
+                return response.data
+
+            table_names = list(SCREENER_TABLE_METRICS.keys())
+            info_rows, *table_data = await asyncio.gather(
+                fetch_table_data("company_info", ["longname", "sector"]),
+                *(fetch_table_data(table_name, SCREENER_TABLE_METRICS[table_name]) for table_name in table_names),
+            )
+        finally:
+            supabase_pool.release(supabase)
+
+        version = fundamentals_snapshot.version + 1 if fundamentals_snapshot else 1
+        fundamentals_snapshot = FundamentalsSnapshot(info_rows, dict(zip(table_names, table_data)), version)
+        return fundamentals_snapshot
+
+
+async def fundamentals_refresh_loop():
+    retry_delay = 1.0
+    while True:
+        try:
+            await refresh_fundamentals_snapshot()
+        except Exception as e:
+            print(f"Fundamentals snapshot refresh failed: {e}")
+        if fundamentals_snapshot is None:
+            # /stock-screener and /sectors answer 503 until the first build succeeds, so retry soon
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, SCREENER_RETRY_MAX_SECONDS)
+        else:
+            await asyncio.sleep(SCREENER_REFRESH_SECONDS)
+
+
+@app.get("/sectors")
+async def get_sectors():
+    """Distinct sectors with ticker counts, precomputed with the fundamentals snapshot"""
+    if fundamentals_snapshot is None:
+        raise HTTPException(status_code=503, detail="Fundamentals snapshot is still loading, please retry")
+    return fundamentals_snapshot.sector_counts
+
+
+@app.get("/stock-screener/snapshot")
+async def get_screener_snapshot_info():
+    """Version and age of the fundamentals snapshot used by the screener"""
+    if fundamentals_snapshot is None:
+        raise HTTPException(status_code=503, detail="Fundamentals snapshot is still loading, please retry")
+    return fundamentals_snapshot.info()
+
+
+@app.post("/stock-screener/refresh", dependencies=[Depends(require_admin)])
+async def refresh_screener_snapshot():
+    """Rebuild the fundamentals snapshot now"""
+    snapshot = await refresh_fundamentals_snapshot()
+    return snapshot.info()
+
+
 @app.get("/stock-screener", response_model=List[Dict[str, Any]])
 async def stock_screener(
     sector: Optional[str] = Query(None, description="Filter by sector (e.g., 'Technology')"),
@@ -395,142 +1215,40 @@ async def stock_screener(
     
     limit: int = 50,
     offset: int = 0, # Added offset for pagination
-    supabase: Client = Depends(get_supabase_client)
 ):
     """
     Screen stocks based on various financial criteria.
-    Combines data from multiple tables for comprehensive filtering.
+    Filters run as vectorized masks over the in-memory fundamentals snapshot,
+    so screen requests never touch the database.
     """
+    snapshot = fundamentals_snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Fundamentals snapshot is still loading, please retry")
     
-    # Step 1: Get a base list of companies based on sector filter (if any)
-    # and select the required fields (ticker, longname, sector)
-    company_info_query = supabase.table("company_info").select("ticker, longname, sector")
-    if sector:
-        company_info_query = company_info_query.eq("sector", sector)
-    
-    company_info_response = company_info_query.execute()
+    # (bound, metric, comparison) for every screener filter
+    filters = [
+        (min_market_cap, "marketcap", "min"),
+        (max_market_cap, "marketcap", "max"),
+        (max_trailing_pe, "trailingpe", "max"),
+        (max_forward_pe, "forwardpe", "max"),
+        (max_pb, "pricetobook", "max"),
+        (max_ps, "pricetosalestrailing12months", "max"),
+        (min_dividend_yield, "dividendyield", "min"),
+        (max_payout_ratio, "payoutratio", "max"),
+        (min_profit_margins, "profitmargins", "min"),
+        (min_gross_margins, "grossmargins", "min"),
+        (min_operating_margins, "operatingmargins", "min"),
+        (min_roe, "returnonequity", "min"),
+        (min_roa, "returnonassets", "min"),
+        (min_revenue_growth, "revenuegrowth", "min"),
+        (min_earnings_growth, "earningsgrowth", "min"),
+        (min_earnings_quarterly_growth, "earningsquarterlygrowth", "min"),
+        (min_current_ratio, "currentratio", "min"),
+        (max_debt_to_equity, "debttoequity", "max"),
+        (min_trailing_eps, "trailingeps", "min"),
+    ]
     
-    if hasattr(company_info_response, "error") and company_info_response.error:
-        raise HTTPException(status_code=500, detail=f"Database error fetching company info: {company_info_response.error}")
-    
-    if not company_info_response.data:
-        return []
-    
-    # Create a map for company info for quick lookup
-    company_info_map = {item["ticker"]: item for item in company_info_response.data}
-    all_tickers = list(company_info_map.keys())
-
-    if not all_tickers:
-        return []
-
-    # Step 2: Fetch all relevant data for all tickers in *one batch*
-    # This is much more efficient than fetching data ticker by ticker in a loop.
-    
-    def fetch_table_data(table_name: str, tickers: List[str]):
-        response = supabase.table(table_name).select("*").in_("ticker", tickers).execute()
-        if hasattr(response, "error") and response.error:
-            raise HTTPException(status_code=500, detail=f"Database error fetching {table_name}: {response.error}")
-        return {item["ticker"]: item for item in response.data}
-
-    finance_map = fetch_table_data("company_finance", all_tickers)
-    valuation_map = fetch_table_data("company_valuation", all_tickers)
-    dividend_map = fetch_table_data("company_dividend", all_tickers)
-    growth_map = fetch_table_data("company_growth", all_tickers)
-    profitabilities_map = fetch_table_data("company_profitabilities", all_tickers)
-    liquidity_map = fetch_table_data("company_liquidity", all_tickers)
-
-    # Step 3: Apply all filters to the collected data
-    filtered_stocks = []
-    
-    for ticker in all_tickers:
-        info_data = company_info_map.get(ticker, {})
-        finance_data = finance_map.get(ticker, {})
-        valuation_data = valuation_map.get(ticker, {})
-        dividend_data = dividend_map.get(ticker, {})
-        growth_data = growth_map.get(ticker, {})
-        profitabilities_data = profitabilities_map.get(ticker, {})
-        liquidity_data = liquidity_map.get(ticker, {})
-
-        # Apply Market Cap filters
-        if min_market_cap is not None and (not finance_data.get("marketcap") or finance_data["marketcap"] < min_market_cap):
-            continue
-        if max_market_cap is not None and (not finance_data.get("marketcap") or finance_data["marketcap"] > max_market_cap):
-            continue
-
-        # Apply Valuation Filters
-        if max_trailing_pe is not None and (not valuation_data.get("trailingpe") or valuation_data["trailingpe"] > max_trailing_pe):
-            continue
-        if max_forward_pe is not None and (not valuation_data.get("forwardpe") or valuation_data["forwardpe"] > max_forward_pe):
-            continue
-        if max_pb is not None and (not valuation_data.get("pricetobook") or valuation_data["pricetobook"] > max_pb):
-            continue
-        if max_ps is not None and (not valuation_data.get("pricetosalestrailing12months") or valuation_data["pricetosalestrailing12months"] > max_ps):
-            continue
-
-        # Apply Dividend Filters
-        if min_dividend_yield is not None and (not dividend_data.get("dividendyield") or dividend_data["dividendyield"] < min_dividend_yield):
-            continue
-        if max_payout_ratio is not None and (not dividend_data.get("payoutratio") or dividend_data["payoutratio"] > max_payout_ratio):
-            continue
-
-        # Apply Profitability Filters
-        if min_profit_margins is not None and (not finance_data.get("profitmargins") or finance_data["profitmargins"] < min_profit_margins):
-            continue
-        if min_gross_margins is not None and (not finance_data.get("grossmargins") or finance_data["grossmargins"] < min_gross_margins):
-            continue
-        if min_operating_margins is not None and (not finance_data.get("operatingmargins") or finance_data["operatingmargins"] < min_operating_margins):
-            continue
-        if min_roe is not None and (not profitabilities_data.get("returnonequity") or profitabilities_data["returnonequity"] < min_roe):
-            continue
-        if min_roa is not None and (not profitabilities_data.get("returnonassets") or profitabilities_data["returnonassets"] < min_roa):
-            continue
-
-        # Apply Growth Filters
-        if min_revenue_growth is not None and (not growth_data.get("revenuegrowth") or growth_data["revenuegrowth"] < min_revenue_growth):
-            continue
-        if min_earnings_growth is not None and (not growth_data.get("earningsgrowth") or growth_data["earningsgrowth"] < min_earnings_growth):
-            continue
-        if min_earnings_quarterly_growth is not None and (not growth_data.get("earningsquarterlygrowth") or growth_data["earningsquarterlygrowth"] < min_earnings_quarterly_growth):
-            continue
-        
-        # Apply Liquidity & Debt Filters
-        if min_current_ratio is not None and (not liquidity_data.get("currentratio") or liquidity_data["currentratio"] < min_current_ratio):
-            continue
-        if max_debt_to_equity is not None and (not liquidity_data.get("debttoequity") or liquidity_data["debttoequity"] > max_debt_to_equity):
-            continue
-        
-        # Apply EPS Filter
-        if min_trailing_eps is not None and (not finance_data.get("trailingeps") or finance_data["trailingeps"] < min_trailing_eps):
-            continue
-
-        # If all filters passed, add to results
-        filtered_stocks.append({
-            "ticker": ticker,
-            "name": info_data.get("longname"),
-            "sector": info_data.get("sector"),
-            "marketcap": finance_data.get("marketcap"),
-            "trailingpe": valuation_data.get("trailingpe"),
-            "forwardpe": valuation_data.get("forwardpe"),
-            "pricetobook": valuation_data.get("pricetobook"),
-            "pricetosalestrailing12months": valuation_data.get("pricetosalestrailing12months"),
-            "dividendyield": dividend_data.get("dividendyield"),
-            "payoutratio": dividend_data.get("payoutratio"),
-            "profitmargins": finance_data.get("profitmargins"),
-            "grossmargins": finance_data.get("grossmargins"),
-            "operatingmargins": finance_data.get("operatingmargins"),
-            "returnonequity": profitabilities_data.get("returnonequity"),
-            "returnonassets": profitabilities_data.get("returnonassets"),
-            "revenuegrowth": growth_data.get("revenuegrowth"),
-            "earningsgrowth": growth_data.get("earningsgrowth"),
-            "earningsquarterlygrowth": growth_data.get("earningsquarterlygrowth"),
-            "currentratio": liquidity_data.get("currentratio"),
-            "debttoequity": liquidity_data.get("debttoequity"),
-            "trailingeps": finance_data.get("trailingeps"),
-        })
-    
-    # Step 4: Sort and paginate the results
-    # Sort by market cap (descending) as a default useful sort
-    filtered_stocks.sort(key=lambda x: x.get("marketcap") or 0, reverse=True)
+    indices = snapshot.screen(sector, filters)
     
     # Apply offset and limit for pagination
-    return filtered_stocks[offset:offset + limit]
\ No newline at end of file
+    return fast_json_response([snapshot.row(i) for i in indices[offset:offset + limit]])
@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+class Histogram:
+    """Histogram kumulatif sederhana (semantik `le` seperti Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.buckets + ["+Inf"], self.counts):
+                cumulative += count
+                buckets.append({"le": bound, "count": cumulative})
+            return {
+                "count": self.count,
+                "sum": round(self.total, 3),
+                "mean": round(self.total / self.count, 3) if self.count else None,
+                "buckets": buckets,
+            }
+
+
+class _PendingBatch:
+    def __init__(self, model: Any):
+        self.model = model
+        self.items: List[tuple] = []  # (input, future, enqueued_at)
+        self.timer: asyncio.TimerHandle = None
+        self.running = False
+
+
+class MicroBatcher:
+    """
+    Menggabungkan permintaan inferensi yang datang bersamaan untuk model yang sama.
+
+    Item pertama membuka jendela `max_wait_ms`; batch dijalankan saat jendela habis atau
+    saat `max_batch_size` item terkumpul. Satu model hanya menjalankan satu batch pada satu
+    waktu; item yang datang selama batch berjalan dikumpulkan untuk batch berikutnya.
+    """
+
+    def __init__(self, predict_fn: Callable[[Any, np.ndarray], np.ndarray], executor: Executor,
+                 max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.predict_fn = predict_fn
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: Dict[int, _PendingBatch] = {}
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64, 128])
+        self.queue_wait_ms = Histogram([0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000])
+        self.forward_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 250, 1000])
+
+    async def submit(self, model: Any, x: np.ndarray) -> np.ndarray:
+        """Jalankan model untuk satu input `x` (tanpa dimensi batch) dan kembalikan outputnya."""
+        loop = asyncio.get_running_loop()
+        key = id(model)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _PendingBatch(model)
+
+        future = loop.create_future()
+        pending.items.append((x, future, time.perf_counter()))
+        if not pending.running:
+            if len(pending.items) >= self.max_batch_size:
+                self._flush(key)
+            elif pending.timer is None:
+                pending.timer = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: int) -> None:
+        pending = self._pending.get(key)
+        if pending is None or pending.running:
+            return
+        if pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+
+        # Permintaan yang dibatalkan (klien terputus) tidak ikut dihitung
+        pending.items = [item for item in pending.items if not item[1].done()]
+        if not pending.items:
+            del self._pending[key]
+            return
+
+        batch = pending.items[:self.max_batch_size]
+        del pending.items[:self.max_batch_size]
+        pending.running = True
+        asyncio.get_running_loop().create_task(self._run(key, pending, batch))
+
+    async def _run(self, key: int, pending: _PendingBatch, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            self.queue_wait_ms.observe((started - enqueued_at) * 1000)
+        self.batch_sizes.observe(len(batch))
+
+        try:
+            inputs = np.stack([x for x, _, _ in batch])
+            outputs = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.predict_fn, pending.model, inputs
+            )
+            for (_, future, _), output in zip(batch, outputs):
+                if not future.done():
+                    future.set_result(output)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.forward_ms.observe((time.perf_counter() - started) * 1000)
+            pending.running = False
+            # Item yang menunggu selama batch berjalan sudah cukup lama antre: jalankan segera
+            self._flush(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending_models": len(self._pending),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            "forward_ms": self.forward_ms.snapshot(),
+        }
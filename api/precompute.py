@@ -0,0 +1,104 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from api.bar_store import IDX_SESSION_CLOSE, IDX_TIMEZONE
+
+
+def next_run_after_close(now: datetime, delay: timedelta) -> datetime:
+    """Jadwal berikutnya setelah `now`: penutupan sesi IDX hari kerja (16:00 WIB) ditambah `delay`."""
+    local = now.astimezone(IDX_TIMEZONE)
+    day: date = local.date()
+    while True:
+        if day.weekday() < 5:
+            candidate = datetime.combine(day, IDX_SESSION_CLOSE, tzinfo=IDX_TIMEZONE) + delay
+            if candidate > local:
+                return candidate
+        day += timedelta(days=1)
+
+
+class PrecomputeScheduler:
+    """
+    Menjalankan `run_item(ticker, timeframe)` untuk setiap model dari `list_items()` setiap
+    hari kerja setelah bursa tutup, paling banyak `concurrency` item bersamaan.
+    Durasi job dan kegagalan per ticker dari run terakhir disimpan untuk endpoint status.
+    """
+
+    def __init__(self, list_items: Callable[[], List[Tuple[str, str]]],
+                 run_item: Callable[[str, str], Awaitable[Any]],
+                 concurrency: int = 4, delay_minutes: float = 30.0):
+        self.list_items = list_items
+        self.run_item = run_item
+        self.concurrency = max(1, concurrency)
+        self.delay = timedelta(minutes=delay_minutes)
+        self.next_run: Optional[datetime] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._current: Optional[asyncio.Task] = None
+        self._progress: Dict[str, int] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._current is not None and not self._current.done()
+
+    async def run_once(self) -> Dict[str, Any]:
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        items = self.list_items()
+        limit = asyncio.Semaphore(self.concurrency)
+        self._progress = {"total": len(items), "done": 0}
+
+        async def run_one(ticker: str, timeframe: str) -> Dict[str, Any]:
+            async with limit:
+                item_started = time.perf_counter()
+                outcome = {"ticker": ticker, "timeframe": timeframe, "status": "ok"}
+                try:
+                    await self.run_item(ticker, timeframe)
+                except Exception as e:
+                    outcome.update(status="error", detail=getattr(e, "detail", None) or repr(e))
+                outcome["duration_ms"] = round((time.perf_counter() - item_started) * 1000, 1)
+                self._progress["done"] += 1
+                return outcome
+
+        results = await asyncio.gather(*(run_one(ticker, timeframe) for ticker, timeframe in items))
+        failures = [r for r in results if r["status"] != "ok"]
+        self.last_run = {
+            "started_at": started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration_s": round(time.perf_counter() - started, 2),
+            "succeeded": len(results) - len(failures),
+            "failed": len(failures),
+            "failures": failures,
+            "items": results,
+        }
+        print(f"Prekomputasi forecast selesai: {self.last_run['succeeded']} berhasil, "
+              f"{self.last_run['failed']} gagal dalam {self.last_run['duration_s']} detik")
+        return self.last_run
+
+    def trigger(self) -> bool:
+        """Mulai run sekarang di latar belakang; False jika run lain masih berjalan."""
+        if self.running:
+            return False
+        self._current = asyncio.get_running_loop().create_task(self.run_once())
+        return True
+
+    async def loop(self) -> None:
+        while True:
+            self.next_run = next_run_after_close(datetime.now(timezone.utc), self.delay)
+            await asyncio.sleep((self.next_run - datetime.now(timezone.utc)).total_seconds())
+            # Jika run manual masih berjalan, jadwal ini cukup menunggu hasilnya
+            if not self.running:
+                self._current = asyncio.get_running_loop().create_task(self.run_once())
+            try:
+                await asyncio.shield(self._current)
+            except Exception as e:
+                print(f"Prekomputasi forecast gagal: {e!r}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "running": self.running,
+            "progress": self._progress if self.running else None,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,95 @@
+import os
+from typing import Any, Dict, List, Tuple
+
+import joblib
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+# Satu model LSTM untuk semua ticker pada satu timeframe (MODEL_FAMILY=shared), hasil
+# scripts/train_shared_lstm.py:
+#   shared_lstm_{TIMEFRAME}.keras    jaringan dengan input (features, ticker)
+#   shared_lstm_{TIMEFRAME}.joblib   {"tickers": [...], "scalers": {ticker: MinMaxScaler}}
+# Urutan "tickers" menentukan id embedding; scaler tetap per ticker.
+SHARED_MODEL_PREFIX = "shared_lstm_"
+
+
+def shared_model_paths(model_dir: str, timeframe: str) -> Tuple[str, str]:
+    """(path model .keras, path bundle scaler/kosakata .joblib) untuk `timeframe`."""
+    base = os.path.join(model_dir, f"{SHARED_MODEL_PREFIX}{timeframe}")
+    return f"{base}.keras", f"{base}.joblib"
+
+
+def build_shared_lstm(n_tickers: int, n_steps: int, n_features: int, n_horizons: int,
+                      embedding_dim: int = 8, units: int = 64, dropout: float = 0.2) -> tf.keras.Model:
+    """
+    Arsitektur per-ticker (LSTM -> Dropout -> Dense) dengan embedding ticker yang
+    digabungkan ke fitur di setiap langkah waktu.
+    """
+    features = tf.keras.Input((n_steps, n_features), name="features")
+    ticker = tf.keras.Input((1,), dtype="int32", name="ticker")
+    embedding = tf.keras.layers.Embedding(n_tickers, embedding_dim, name="ticker_embedding")(ticker)
+    embedding = tf.keras.layers.Reshape((embedding_dim,))(embedding)
+    embedding = tf.keras.layers.RepeatVector(n_steps)(embedding)
+    x = tf.keras.layers.Concatenate()([features, embedding])
+    x = tf.keras.layers.LSTM(units)(x)
+    x = tf.keras.layers.Dropout(dropout)(x)
+    outputs = tf.keras.layers.Dense(n_horizons)(x)
+    model = tf.keras.Model([features, ticker], outputs, name="shared_lstm")
+    model.compile(optimizer="adam", loss="mean_squared_error")
+    return model
+
+
+class SharedLSTM:
+    """
+    Model bersama beserta kosakata tickernya.
+
+    `predict_on_batch` menerima (batch, n_steps, fitur + 1) dengan id ticker di kolom terakhir,
+    sehingga MicroBatcher dapat menggabungkan permintaan untuk ticker berbeda dalam satu
+    forward pass. Akses per ticker lewat `view(ticker)`.
+    """
+
+    def __init__(self, model: tf.keras.Model, tickers: List[str]):
+        self.model = model
+        self.tickers = list(tickers)
+        self.ticker_ids = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.nbytes = model.count_params() * 4
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch, dtype=np.float32)
+        ids = batch[:, 0, -1:].astype(np.int32)
+        return np.asarray(self.model.predict_on_batch([batch[:, :, :-1], ids]))
+
+    def view(self, ticker: str) -> "TickerView":
+        return TickerView(self, ticker)
+
+
+class TickerView:
+    """Model bersama untuk satu ticker, dengan antarmuka `predict_on_batch` yang sama seperti model per ticker."""
+
+    def __init__(self, shared: SharedLSTM, ticker: str):
+        self.shared = shared
+        self.ticker = ticker
+        self.ticker_id = shared.ticker_ids[ticker]
+
+    def with_ticker_column(self, x: np.ndarray) -> np.ndarray:
+        """Tambahkan id ticker sebagai kolom fitur terakhir (input SharedLSTM.predict_on_batch)."""
+        x = np.asarray(x, dtype=np.float32)
+        return np.concatenate([x, np.full(x.shape[:-1] + (1,), self.ticker_id, dtype=np.float32)], axis=-1)
+
+    def predict_on_batch(self, x: np.ndarray) -> np.ndarray:
+        return self.shared.predict_on_batch(self.with_ticker_column(x))
+
+
+def load_shared_bundle(bundle_path: str) -> Dict[str, Any]:
+    bundle = joblib.load(bundle_path)
+    missing = set(bundle["tickers"]) - set(bundle["scalers"])
+    if missing:
+        raise ValueError(f"Scaler tidak ditemukan untuk ticker {sorted(missing)} di {bundle_path}")
+    return bundle
+
+
+def load_shared_model(model_path: str, bundle_path: str) -> Tuple[SharedLSTM, Dict[str, Any]]:
+    """(SharedLSTM, scaler per ticker) dari file hasil scripts/train_shared_lstm.py."""
+    bundle = load_shared_bundle(bundle_path)
+    return SharedLSTM(load_model(model_path), bundle["tickers"]), bundle["scalers"]
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from api.bar_store import IDX_SESSION_OPEN, IDX_TIMEZONE, is_market_open, last_session_close
+
+StreamKey = Tuple[str, str]
+
+
+def next_poll_delay(now: datetime, interval: float) -> float:
+    """
+    Detik sampai poll berikutnya: setiap `interval` selama sesi IDX dan sesaat setelah penutupan
+    (agar bar terakhir sesi ikut tertangkap), selain itu sampai sesi berikutnya dibuka.
+    """
+    if is_market_open(now) or now - last_session_close(now) < timedelta(seconds=2 * interval):
+        return interval
+    local = now.astimezone(IDX_TIMEZONE)
+    day = local.date()
+    while True:
+        session_open = datetime.combine(day, IDX_SESSION_OPEN, tzinfo=IDX_TIMEZONE)
+        if day.weekday() < 5 and session_open > local:
+            return (session_open - local).total_seconds() + interval
+        day += timedelta(days=1)
+
+
+class StreamSubscriber:
+    """
+    Antrean event satu klien. Hanya event terbaru per ticker yang disimpan: jika klien lambat,
+    forecast lama yang belum terkirim digantikan yang baru (dihitung sebagai `dropped`),
+    sehingga memori per klien terbatas dan publisher tidak pernah menunggu klien.
+    """
+
+    def __init__(self, keys: Iterable[StreamKey]):
+        self.keys = list(dict.fromkeys(keys))
+        self._pending: "OrderedDict[StreamKey, Tuple[str, bytes]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, key: StreamKey, event: str, body: bytes) -> None:
+        if key in self._pending:
+            self.dropped += 1
+            del self._pending[key]
+        self._pending[key] = (event, body)
+        self._ready.set()
+
+    async def next(self) -> Tuple[StreamKey, str, bytes]:
+        while not self._pending:
+            self._ready.clear()
+            await self._ready.wait()
+        key, (event, body) = self._pending.popitem(last=False)
+        self.sent += 1
+        return key, event, body
+
+
+class ForecastStreamHub:
+    """
+    Satu poller per (ticker, timeframe) berapa pun jumlah pelanggannya. Poller memanggil
+    `poll_item(ticker, timeframe)` yang mengembalikan (versi, body JSON); body hanya dikirim
+    ke pelanggan jika versinya (bar tertutup terakhir + versi model) berubah.
+    Poller berhenti saat pelanggan terakhir ticker tersebut pergi.
+    """
+
+    def __init__(self, poll_item: Callable[[str, str], Awaitable[Tuple[Hashable, bytes]]],
+                 poll_delay: Callable[[datetime], float]):
+        self.poll_item = poll_item
+        self.poll_delay = poll_delay
+        self._subscribers: Dict[StreamKey, Set[StreamSubscriber]] = {}
+        self._pollers: Dict[StreamKey, asyncio.Task] = {}
+        self._latest: Dict[StreamKey, Tuple[Hashable, bytes]] = {}
+        self.polls = 0
+        self.published = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def subscribe(self, keys: Iterable[StreamKey]) -> StreamSubscriber:
+        subscriber = StreamSubscriber(keys)
+        for key in subscriber.keys:
+            self._subscribers.setdefault(key, set()).add(subscriber)
+            latest = self._latest.get(key)
+            if latest is not None:
+                # Forecast terakhir langsung dikirim; pelanggan baru tidak menunggu bar berikutnya
+                subscriber.offer(key, "forecast", latest[1])
+            if key not in self._pollers:
+                self._pollers[key] = asyncio.get_running_loop().create_task(self._poll_loop(key))
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        self.dropped += subscriber.dropped
+        for key in subscriber.keys:
+            subscribers = self._subscribers.get(key)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[key]
+                self._latest.pop(key, None)
+                poller = self._pollers.pop(key, None)
+                if poller is not None:
+                    poller.cancel()
+
+    def _publish(self, key: StreamKey, event: str, body: bytes) -> None:
+        for subscriber in self._subscribers.get(key, ()):
+            subscriber.offer(key, event, body)
+
+    async def _poll_loop(self, key: StreamKey) -> None:
+        last_error: Optional[str] = None
+        while True:
+            self.polls += 1
+            try:
+                version, body = await self.poll_item(*key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                detail = getattr(e, "detail", None) or repr(e)
+                if detail != last_error:
+                    print(f"Peringatan: stream forecast {key[0]} ({key[1]}) gagal: {detail}")
+                    self._publish(key, "error", _error_body(key, detail))
+                last_error = detail
+            else:
+                last_error = None
+                latest = self._latest.get(key)
+                if latest is None or latest[0] != version:
+                    self._latest[key] = (version, body)
+                    self.published += 1
+                    self._publish(key, "forecast", body)
+            await asyncio.sleep(self.poll_delay(datetime.now(timezone.utc)))
+
+    async def close(self) -> None:
+        pollers = list(self._pollers.values())
+        for poller in pollers:
+            poller.cancel()
+        await asyncio.gather(*pollers, return_exceptions=True)
+        self._pollers.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        subscribers = {s for group in self._subscribers.values() for s in group}
+        return {
+            "pollers": sorted(f"{k[0]}_{k[1]}" for k in self._pollers),
+            "subscribers": len(subscribers),
+            "subscriptions": {f"{k[0]}_{k[1]}": len(v) for k, v in self._subscribers.items()},
+            "polls": self.polls,
+            "published": self.published,
+            "errors": self.errors,
+            "dropped": self.dropped + sum(s.dropped for s in subscribers),
+        }
+
+
+def _error_body(key: StreamKey, detail: Any) -> bytes:
+    return json.dumps({"ticker": key[0], "timeframe": key[1], "detail": detail}).encode()
@@ -0,0 +1,74 @@
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+try:
+    # Runtime TFLite mandiri (pengganti tf.lite.Interpreter mulai TF 2.20)
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+# Varian hasil scripts/convert_tflite.py, disimpan di samping file .keras:
+# lstm_model_{TICKER}_{TIMEFRAME}.{varian}.tflite
+TFLITE_VARIANTS = ("float32", "float16", "dynamic", "int8")
+
+
+def tflite_model_path(keras_path: str, variant: str) -> str:
+    if variant not in TFLITE_VARIANTS:
+        raise ValueError(f"Varian TFLite '{variant}' tidak dikenal. Pilihan: {', '.join(TFLITE_VARIANTS)}")
+    base, _ = os.path.splitext(keras_path)
+    return f"{base}.{variant}.tflite"
+
+
+class TFLiteModel:
+    """
+    Model TFLite dengan antarmuka `predict_on_batch` yang sama seperti model Keras,
+    sehingga bisa dipakai langsung oleh ModelWrapper dan MicroBatcher.
+
+    Model hasil konversi memiliki input tetap [1, N_STEPS_IN, fitur] (LSTM tidak bisa
+    di-resize ke batch lain oleh interpreter), jadi batch dijalankan baris per baris.
+    Interpreter tidak thread-safe; satu lock per model.
+    """
+
+    def __init__(self, path: str, num_threads: Optional[int] = None):
+        self.path = path
+        self.nbytes = os.path.getsize(path)
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._lock = threading.Lock()
+
+    @property
+    def input_shape(self):
+        return tuple(self._input["shape"])
+
+    def _quantize(self, row: np.ndarray) -> np.ndarray:
+        dtype = self._input["dtype"]
+        if dtype == np.float32:
+            return row.astype(np.float32, copy=False)
+        scale, zero_point = self._input["quantization"]
+        return np.clip(np.round(row / scale + zero_point), np.iinfo(dtype).min, np.iinfo(dtype).max).astype(dtype)
+
+    def _dequantize(self, values: np.ndarray) -> np.ndarray:
+        if self._output["dtype"] == np.float32:
+            return values
+        scale, zero_point = self._output["quantization"]
+        return (values.astype(np.float32) - zero_point) * scale
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.asarray(batch)
+        expected = self.input_shape[1:]
+        if batch.shape[1:] != expected:
+            raise ValueError(f"Bentuk input {batch.shape[1:]} tidak sesuai dengan model TFLite {expected}.")
+
+        outputs = []
+        with self._lock:
+            for row in batch:
+                self._interpreter.set_tensor(self._input["index"], self._quantize(row[np.newaxis]))
+                self._interpreter.invoke()
+                outputs.append(self._interpreter.get_tensor(self._output["index"])[0].copy())
+        return self._dequantize(np.stack(outputs))
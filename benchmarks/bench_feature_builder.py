@@ -0,0 +1,79 @@
+"""
+Feature-building benchmark: pandas_ta pipeline vs NumPy batch builder.
+
+"pandas_ta" runs api.features.compute_features (the /forecast preprocessing)
+once per ticker DataFrame and stacks the results into a float32 array.
+"numpy" stacks the same DataFrames with stack_bars() and builds every
+ticker in one build_feature_tensor() call.
+
+Usage (from the repository root):
+    python benchmarks/bench_feature_builder.py --tickers 24 200 --bars 520
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.features import build_feature_tensor, compute_features, stack_bars  # noqa: E402
+
+
+def synthetic_frames(tickers, bars, rng):
+    index = pd.bdate_range("2023-01-02", periods=bars)
+    frames = []
+    for _ in range(tickers):
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+        open_ = close * (1 + rng.normal(0, 0.005, bars))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, bars)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, bars)))
+        volume = rng.integers(100_000, 10_000_000, bars).astype(float)
+        frames.append(pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index))
+    return frames
+
+
+def pandas_ta_path(frames):
+    return np.stack([compute_features(frame).to_numpy(dtype=np.float32) for frame in frames])
+
+
+def numpy_path(frames):
+    bars, sessions = stack_bars(frames)
+    return build_feature_tensor(bars, sessions)
+
+
+def timed(fn, frames, repeats):
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn(frames)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[24, 200])
+    parser.add_argument("--bars", type=int, default=520)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for tickers in args.tickers:
+        frames = synthetic_frames(tickers, args.bars, rng)
+        slow, expected = timed(pandas_ta_path, frames, args.repeats)
+        fast, actual = timed(numpy_path, frames, args.repeats)
+        max_error = float(np.max(np.abs(actual - expected) / np.maximum(1.0, np.abs(expected))))
+        print(
+            f"tickers={tickers:<4} bars={args.bars:<5} "
+            f"pandas_ta={slow * 1000:9.1f} ms  numpy={fast * 1000:8.1f} ms  "
+            f"speedup={slow / fast:6.1f}x  max rel err={max_error:.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Concurrency benchmark for api/get_data.py.
+
+Drives the FastAPI app in-process through httpx's ASGI transport with
+N parallel clients. Requests lease clients from the real
+SupabaseClientPool, whose clients are fakes whose execute() blocks for a
+fixed latency (like a real PostgREST round-trip).
+
+"before" runs every query inline on the event loop (the old
+query.execute() behaviour); "after" uses run_query(), which hands the
+blocking call to the DB thread pool. "after" is repeated for each pool
+size in --pool-sizes, with DB_EXECUTOR_WORKERS sized from the pool the
+same way get_data.py does unless --workers is given.
+
+Usage (from the repository root):
+    python benchmarks/bench_get_data_concurrency.py --clients 50 --requests 10 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api import get_data  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+        self.error = None
+
+
+class FakeQuery:
+    def __init__(self, table_name, latency):
+        self.table_name = table_name
+        self.latency = latency
+
+    def __getattr__(self, name):
+        # select/eq/in_/order/limit/offset/... all just chain
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.latency)
+        return FakeResponse([{"ticker": "BBCA.JK", "sector": "Financial Services", "longname": "Bank Central Asia"}])
+
+
+class FakeClient:
+    postgrest = None
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def table(self, name):
+        return FakeQuery(name, self.latency)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_pool(size, latency):
+    get_data.create_client = lambda url, key, options=None: FakeClient(latency)
+    return get_data.SupabaseClientPool(
+        "http://bench", "bench-key", size=size,
+        acquire_timeout=get_data.SUPABASE_POOL_ACQUIRE_TIMEOUT,
+        http_timeout=get_data.SUPABASE_HTTP_TIMEOUT,
+    )
+
+
+async def run_load(path, clients, requests_per_client):
+    latencies = []
+    transport = httpx.ASGITransport(app=get_data.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def worker():
+            for _ in range(requests_per_client):
+                started = time.perf_counter()
+                # Let the other clients' requests "arrive" before this one is served
+                await asyncio.sleep(0)
+                response = await http.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def report(label, latencies, elapsed, pool):
+    print(
+        f"{label:<26} n={len(latencies):<5} "
+        f"p50={statistics.median(latencies) * 1000:8.1f} ms  "
+        f"p99={percentile(latencies, 99) * 1000:8.1f} ms  "
+        f"throughput={len(latencies) / elapsed:8.1f} req/s  "
+        f"pool peak={pool.peak_in_use} waited={pool.waited_total}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated DB round-trip in seconds")
+    parser.add_argument("--pool-sizes", default=f"4,{get_data.SUPABASE_POOL_SIZE}",
+                        help="comma-separated SUPABASE_POOL_SIZE values for the 'after' runs")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="DB_EXECUTOR_WORKERS (default: two per pooled client, as in get_data.py)")
+    # /company-info/ is a list query; the per-ticker lookups are served from the cache
+    parser.add_argument("--path", default="/company-info/")
+    args = parser.parse_args()
+    pool_sizes = [int(size) for size in args.pool_sizes.split(",")]
+
+    pooled_run_query = get_data.run_query
+
+    async def inline_run_query(query, client):
+        return query.execute()
+
+    get_data.run_query = inline_run_query
+    get_data.supabase_pool = make_pool(pool_sizes[-1], args.latency)
+    report("before", *await run_load(args.path, args.clients, args.requests), get_data.supabase_pool)
+
+    get_data.run_query = pooled_run_query
+    for size in pool_sizes:
+        workers = args.workers or 2 * size
+        get_data.supabase_pool = make_pool(size, args.latency)
+        get_data.db_executor = ThreadPoolExecutor(max_workers=workers)
+        label = f"after pool={size} workers={workers}"
+        report(label, *await run_load(args.path, args.clients, args.requests), get_data.supabase_pool)
+        get_data.db_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
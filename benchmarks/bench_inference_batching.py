@@ -0,0 +1,113 @@
+"""
+Inference micro-batching benchmark for api/forecasting.py /predict.
+
+Drives /predict in-process through httpx's ASGI transport with N parallel
+clients, all using the same (ticker, timeframe) model.
+
+"before" calls model.predict() per request on the event loop (the old
+behaviour). "unbatched" goes through the inference pool one request at a
+time (max batch size 1). "batched" lets the MicroBatcher merge concurrent
+requests into one forward pass.
+
+Usage (from the repository root):
+    python benchmarks/bench_inference_batching.py --clients 32 --requests 10 --ticker BBCA
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api import forecasting  # noqa: E402
+from api.inference import MicroBatcher  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_load(payload, clients, requests_per_client):
+    latencies = []
+    transport = httpx.ASGITransport(app=forecasting.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        async def worker():
+            for _ in range(requests_per_client):
+                started = time.perf_counter()
+                await asyncio.sleep(0)
+                response = await http.post("/predict", json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+def report(label, latencies, elapsed, batcher=None):
+    line = (
+        f"{label:<10} n={len(latencies):<5} "
+        f"p50={statistics.median(latencies) * 1000:8.1f} ms  "
+        f"p99={percentile(latencies, 99) * 1000:8.1f} ms  "
+        f"throughput={len(latencies) / elapsed:8.1f} req/s"
+    )
+    if batcher is not None:
+        line += f"  mean batch={batcher.batch_sizes.snapshot()['mean']}"
+    print(line)
+
+
+class InlinePredict:
+    """Perilaku lama: model.predict() langsung di event loop untuk setiap permintaan."""
+
+    async def submit(self, model, x):
+        return model.predict(x[np.newaxis], verbose=0)[0]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--ticker", default="BBCA")
+    parser.add_argument("--timeframe", default="1d")
+    parser.add_argument("--wait-ms", type=float, default=forecasting.INFERENCE_BATCH_WAIT_MS)
+    parser.add_argument("--max-batch", type=int, default=forecasting.INFERENCE_BATCH_MAX_SIZE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    payload = {
+        "ticker": args.ticker,
+        "timeframe": args.timeframe,
+        "input_data": (rng.random((forecasting.N_STEPS_IN, len(forecasting.FEATURE_COLUMNS))) * 100).tolist(),
+    }
+    predict = forecasting.inference_batcher.predict_fn
+    executor = forecasting.inference_executor
+
+    # Muat model dan panaskan kedua jalur sebelum pengukuran
+    model, _ = forecasting.model_wrapper.get_model_and_scaler(args.ticker, args.timeframe)
+    model.predict(np.zeros((1, forecasting.N_STEPS_IN, len(forecasting.FEATURE_COLUMNS)), dtype=np.float32), verbose=0)
+
+    scenarios = [
+        ("before", InlinePredict()),
+        ("unbatched", MicroBatcher(predict, executor, max_batch_size=1, max_wait_ms=0)),
+        ("batched", MicroBatcher(predict, executor, max_batch_size=args.max_batch, max_wait_ms=args.wait_ms)),
+    ]
+    for label, batcher in scenarios:
+        forecasting.inference_batcher = batcher
+        await run_load(payload, 2, 2)
+        if isinstance(batcher, MicroBatcher):
+            batcher.__init__(predict, executor, batcher.max_batch_size, batcher.max_wait * 1000)
+        report(label, *await run_load(payload, args.clients, args.requests),
+               batcher if isinstance(batcher, MicroBatcher) else None)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
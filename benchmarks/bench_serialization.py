@@ -0,0 +1,101 @@
+"""
+Serialization benchmark for the list endpoints of api/get_data.py.
+
+"before" mirrors FastAPI's response_model path: validate every row into
+StockPrice/CompanyInfo, dump to JSON-compatible Python, then json.dumps.
+"after" is the precompiled row serializer plus orjson used by the routes.
+
+Usage (from the repository root):
+    python benchmarks/bench_serialization.py
+"""
+
+import json
+import os
+import sys
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.get_data import (  # noqa: E402
+    CompanyInfo,
+    StockPrice,
+    fast_json_response,
+    serialize_company_info,
+    serialize_stock_prices,
+)
+
+
+def stock_price_rows(n):
+    return [
+        {
+            "id": i,
+            "datetime": f"2024-01-{i % 28 + 1:02d}T00:00:00+00:00",
+            "ticker": "BBCA.JK",
+            "open": 9000 + i % 50,
+            "high": 9100.5,
+            "low": 8950.25,
+            "close": 9050.0,
+            "volume": 12345678 + i,
+            "timeframe": "1d",
+        }
+        for i in range(n)
+    ]
+
+
+def company_info_rows(n):
+    return [
+        {
+            "ticker": f"T{i:04d}.JK",
+            "address1": "Jl. Jend. Sudirman Kav. 1",
+            "sector": "Financial Services",
+            "website": "https://example.co.id",
+            "phone": "+62 21 1234567",
+            "longname": f"Company {i}",
+            "longbusinesssummary": "Lorem ipsum dolor sit amet. " * 40,
+        }
+        for i in range(n)
+    ]
+
+
+def pydantic_path(adapter):
+    def encode(rows):
+        return json.dumps(adapter.dump_python(adapter.validate_python(rows), mode="json")).encode()
+    return encode
+
+
+def fast_path(serializer):
+    def encode(rows):
+        return fast_json_response(rows, serializer).body
+    return encode
+
+
+def rows_per_second(encode, rows, min_seconds=0.5):
+    iterations = 0
+    started = time.perf_counter()
+    while True:
+        encode(rows)
+        iterations += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return iterations * len(rows) / elapsed
+
+
+def main():
+    cases = [
+        ("StockPrice", stock_price_rows, TypeAdapter(List[StockPrice]), serialize_stock_prices),
+        ("CompanyInfo", company_info_rows, TypeAdapter(List[CompanyInfo]), serialize_company_info),
+    ]
+    print(f"{'model':<12} {'rows':>6} {'before rows/s':>15} {'after rows/s':>15} {'speedup':>8}")
+    for name, make_rows, adapter, serializer in cases:
+        for n in (100, 1_000, 10_000):
+            rows = make_rows(n)
+            before = rows_per_second(pydantic_path(adapter), rows)
+            after = rows_per_second(fast_path(serializer), rows)
+            print(f"{name:<12} {n:>6} {before:>15,.0f} {after:>15,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Keras vs TFLite serving backend benchmark for the LSTM forecasting models.
+
+Latency: per-call time of predict_on_batch for batch sizes 1 and 8 (the
+TFLite models run a batch row by row) for Keras and every converted
+TFLite variant of one model.
+
+Memory: each backend loads the same N models in a fresh child process,
+through ModelWrapper, and reports the resident set size (RSS) growth over
+the process baseline after `import tensorflow`.
+
+Convert the models first with scripts/convert_tflite.py.
+
+Usage (from the repository root):
+    python benchmarks/bench_tflite.py --ticker BBCA --models 8 --calls 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+MODEL_SAVE_DIR = "models/forecasting"
+N_STEPS_IN = 60
+N_FEATURES = 24
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure_memory(backend, variant, tickers):
+    """Dijalankan di proses anak: muat model lewat ModelWrapper dan cetak pertambahan RSS."""
+    os.environ["MODEL_BACKEND"] = backend
+    os.environ["TFLITE_VARIANT"] = variant
+    import tensorflow  # noqa: F401  (baseline sudah termasuk runtime TensorFlow)
+    from api import forecasting
+
+    baseline = rss_bytes()
+    wrapper = forecasting.ModelWrapper(max_models=len(tickers), preload=[f"{t}_1d" for t in tickers])
+    x = np.zeros((1, N_STEPS_IN, N_FEATURES), dtype=np.float32)
+    for ticker in tickers:
+        model, _ = wrapper.get_model_and_scaler(ticker, "1d")
+        model.predict_on_batch(x)
+    print(json.dumps({"rss_delta": rss_bytes() - baseline, "resident_bytes": wrapper.get_cache_stats()["resident_bytes"]}))
+
+
+def time_calls(model, batch, calls):
+    model.predict_on_batch(batch)
+    durations = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        model.predict_on_batch(batch)
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000, np.percentile(durations, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticker", default="BBCA")
+    parser.add_argument("--models", type=int, default=8, help="models loaded for the memory comparison")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--memory-child", nargs=2, metavar=("BACKEND", "VARIANT"), help=argparse.SUPPRESS)
+    parser.add_argument("--tickers", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child:
+        measure_memory(*args.memory_child, args.tickers.split(","))
+        return
+
+    from tensorflow.keras.models import load_model
+    from api.tflite_runtime import TFLITE_VARIANTS, TFLiteModel, tflite_model_path
+
+    keras_path = os.path.join(MODEL_SAVE_DIR, f"lstm_model_{args.ticker}_1d.keras")
+    backends = [("keras", "-", load_model(keras_path))]
+    for variant in TFLITE_VARIANTS:
+        path = tflite_model_path(keras_path, variant)
+        if os.path.exists(path):
+            backends.append(("tflite", variant, TFLiteModel(path)))
+
+    rng = np.random.default_rng(0)
+    print(f"Latensi predict_on_batch ({args.ticker}_1d, median / p99 dari {args.calls} panggilan)")
+    for backend, variant, model in backends:
+        line = f"  {backend:<7}{variant:<9}"
+        for size in (1, 8):
+            batch = rng.random((size, N_STEPS_IN, N_FEATURES)).astype(np.float32)
+            p50, p99 = time_calls(model, batch, args.calls)
+            line += f"  batch {size}: {p50:6.2f} / {p99:6.2f} ms"
+        print(line)
+
+    # Hanya ticker yang punya semua varian agar perbandingan memakai model yang sama
+    tickers = sorted(f[len("lstm_model_"):-len("_1d.keras")] for f in os.listdir(MODEL_SAVE_DIR)
+                     if f.startswith("lstm_model_") and f.endswith("_1d.keras"))
+    variants = [variant for _, variant, _ in backends[1:]]
+    tickers = [t for t in tickers
+               if all(os.path.exists(tflite_model_path(os.path.join(MODEL_SAVE_DIR, f"lstm_model_{t}_1d.keras"), v))
+                      for v in variants)][:args.models]
+    print(f"Memori setelah memuat {len(tickers)} model (pertambahan RSS / perkiraan ModelWrapper)")
+    for backend, variant, _ in backends:
+        output = subprocess.run(
+            [sys.executable, __file__, "--memory-child", backend, variant if variant != "-" else "dynamic",
+             "--tickers", ",".join(tickers)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"  {backend:<7}{variant:<9}  RSS +{result['rss_delta'] / 2**20:7.1f} MiB"
+              f"  (perkiraan {result['resident_bytes'] / 2**20:5.2f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
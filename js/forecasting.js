@@ -7,6 +7,7 @@
 const API_BASE_URL_FORECASTING = "http://localhost:5002"; // Port untuk API forecasting
 
 let forecastChartInstance = null; // Untuk menyimpan instance Chart.js
+let forecastStream = null; // EventSource pembaruan forecast intraday
 
 // Fungsi ini akan dipanggil oleh core.js saat bagian 'forecasting' dimuat
 export function init() {
@@ -118,6 +119,7 @@ async function handleForecastSubmit() {
 
   displayMessage("hide"); // Bersihkan pesan sebelumnya
   forecastResults.classList.add("hidden"); // Sembunyikan hasil sampai sukses
+  closeForecastStream(); // Hentikan stream forecast sebelumnya
   runForecastBtn.disabled = true;
   runForecastBtn.innerHTML =
     '<i class="fas fa-spinner fa-spin"></i> <span>Forecasting...</span>';
@@ -149,18 +151,14 @@ async function handleForecastSubmit() {
       "success",
       `Forecast generated successfully for ${ticker} (${timeframe})!`
     );
-    document.getElementById("forecast-ticker-display").innerText = ticker;
-    document.getElementById("forecast-timeframe-display").innerText = timeframe;
-
-    renderForecastChart(
-      data.actual_history_dates,
-      data.actual_history,
-      data.forecast
-    );
-    displayForecastDetails(data.forecast);
-    displayEvaluationMetrics(data.mae, data.mse, data.mape);
+    renderForecastResult(data);
 
     forecastResults.classList.remove("hidden"); // Tampilkan bagian hasil
+
+    // Forecast intraday diperbarui otomatis setiap bar baru ditutup
+    if (timeframe === "1h") {
+      openForecastStream(ticker, timeframe);
+    }
   } catch (error) {
     console.error("Error during forecast:", error);
     displayMessage("error", `Forecasting failed: ${error.message}`);
@@ -176,6 +174,45 @@ async function handleForecastSubmit() {
   }
 }
 
+function renderForecastResult(data) {
+  document.getElementById("forecast-ticker-display").innerText = data.ticker;
+  document.getElementById("forecast-timeframe-display").innerText =
+    data.timeframe;
+
+  renderForecastChart(
+    data.actual_history_dates,
+    data.actual_history,
+    data.forecast
+  );
+  displayForecastDetails(data.forecast);
+  displayEvaluationMetrics(data.mae, data.mse, data.mape);
+}
+
+function openForecastStream(ticker, timeframe) {
+  closeForecastStream();
+  const params = new URLSearchParams({ tickers: ticker, timeframe });
+  forecastStream = new EventSource(
+    `${API_BASE_URL_FORECASTING}/forecast/stream?${params}`
+  );
+  forecastStream.addEventListener("forecast", (event) => {
+    renderForecastResult(JSON.parse(event.data));
+  });
+  forecastStream.addEventListener("error", (event) => {
+    // Event "error" dari server membawa data; tanpa data berarti koneksi terputus
+    // dan EventSource akan menyambung ulang sendiri
+    if (event.data) {
+      console.error("Forecast stream error:", JSON.parse(event.data).detail);
+    }
+  });
+}
+
+function closeForecastStream() {
+  if (forecastStream) {
+    forecastStream.close();
+    forecastStream = null;
+  }
+}
+
 function renderForecastChart(actualDates, actualPrices, predictions) {
   const ctx = document.getElementById("forecastChart");
   if (!ctx) {
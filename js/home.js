@@ -18,6 +18,7 @@ let totalRows = 0;
 let allPriceData = [];
 let currentTicker = null; // Inisialisasi null, penting!
 let isLoadingMore = false;
+let nextPriceCursor = null; // Cursor dari header X-Next-Cursor untuk halaman berikutnya
 const INITIAL_PRICE_DATA_LIMIT = 100; // Batas awal data harga yang diambil untuk tabel/chart
 
 // --- FUNGSI-FUNGSI LOGIKA HALAMAN HOME ---
@@ -43,6 +44,7 @@ function resetHomeUI() {
   charts = {}; // Reset chart references
 
   allPriceData = []; // Kosongkan data harga
+  nextPriceCursor = null;
   currentPage = 1; // Reset halaman
   totalRows = 0; // Reset total baris
   updatePriceTable(); // Ini akan menampilkan "No price data available" di tabel
@@ -161,18 +163,20 @@ async function loadData(forceReload = false) {
 async function loadPriceData(ticker, isInitial = false) {
   try {
     const limit = isInitial ? INITIAL_PRICE_DATA_LIMIT : rowsPerPage; // Fetch more data by 'rowsPerPage' chunks
-    const offset = isInitial ? 0 : allPriceData.length; // Start offset from current data length
+    // "Load More" melanjutkan dari cursor halaman sebelumnya, bukan offset
+    const cursorParam = !isInitial && nextPriceCursor ? `&cursor=${encodeURIComponent(nextPriceCursor)}` : "";
 
-    console.log(`Fetching price data for ${ticker} with limit=${limit}, offset=${offset}, initial=${isInitial}`);
+    console.log(`Fetching price data for ${ticker} with limit=${limit}, initial=${isInitial}`);
 
     const priceResponse = await fetch(
-      `${config.API_BASE_URL}/stock-prices/${ticker}?limit=${limit}&offset=${offset}&timeframe=1d`
+      `${config.API_BASE_URL}/stock-prices/${ticker}?limit=${limit}&timeframe=1d${cursorParam}`
     );
     if (!priceResponse.ok) {
       const errorText = await priceResponse.text();
       throw new Error(`Error fetching price data: ${priceResponse.status} - ${errorText}`);
     }
     const priceData = await priceResponse.json();
+    nextPriceCursor = priceResponse.headers.get("X-Next-Cursor");
 
     if (isInitial) {
       allPriceData = priceData; // Overwrite for initial load
@@ -183,9 +187,8 @@ async function loadPriceData(ticker, isInitial = false) {
 
     const loadMoreBtn = document.getElementById("load-more-btn");
     if (loadMoreBtn) {
-      // Show "Load More" button only if we received 'limit' number of items,
-      // implying there might be more data available beyond the current fetch.
-      loadMoreBtn.style.display = priceData.length === limit ? "block" : "none";
+      // The API only sends a cursor for full pages, i.e. when more data may follow.
+      loadMoreBtn.style.display = nextPriceCursor ? "block" : "none";
     }
     return priceData;
   } catch (error) {
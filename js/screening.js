@@ -64,16 +64,13 @@ export async function init() {
 
 async function populateSectors() {
   try {
-    const response = await fetch(`${API_BASE_URL}/company-info/`);
+    // /sectors sudah berisi daftar sektor unik (terurut) beserta jumlah ticker
+    const response = await fetch(`${API_BASE_URL}/sectors`);
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
     const data = await response.json();
-    const sectors = [
-      ...new Set(
-        data.map((company) => company.sector).filter((sector) => sector)
-      ),
-    ].sort();
+    const sectors = data.map((item) => item.sector);
 
     // Pastikan filterElements.sector sudah ada saat ini
     if (filterElements.sector) {
@@ -0,0 +1,159 @@
+"""
+Numerical parity check of the feature builders in api.features against the
+pandas_ta pipeline (api.features.compute_features) used by /forecast.
+
+Synthetic daily and hourly OHLCV series (with flat bars and zero-volume bars)
+are fed one bar at a time. Every feature row after warm-up is compared with
+the pandas_ta result, and so are a revised last bar and a sliding data
+window served through FeatureEngineCache. The NumPy batch builder
+(build_feature_tensor) is checked on every row, including warm-up rows, for
+tickers of different lengths stacked into one array.
+
+Usage (from the repository root):
+    python scripts/check_feature_parity.py [--bars 520] [--seed 0]
+
+Exits non-zero when any column differs by more than the tolerance. The same
+checks run under pytest in tests/test_feature_parity.py; this script prints
+the per-column errors for investigation.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from api.features import (  # noqa: E402
+    FEATURE_COLUMNS,
+    FeatureEngineCache,
+    IncrementalFeatures,
+    build_feature_tensor,
+    compute_features,
+    stack_bars,
+)
+
+WARMUP = 100
+EXACT_TOLERANCE = 1e-8
+# Tensor float32 dibandingkan relatif terhadap presisi float32
+FLOAT32_TOLERANCE = 1e-6
+# Jendela yang bergeser mengubah titik awal EMA/RMA pandas_ta; pengaruhnya meluruh eksponensial
+SLIDING_TOLERANCE = 1e-6
+
+
+def synthetic_bars(n, freq, rng, tz=None):
+    if freq == "h":
+        days = pd.bdate_range("2024-01-02", periods=n // 7 + 1)
+        index = pd.DatetimeIndex([day + pd.Timedelta(hours=h) for day in days for h in range(9, 16)])[:n]
+        index = index.tz_localize(tz) if tz else index
+    else:
+        index = pd.bdate_range("2023-01-02", periods=n, tz=tz)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    open_ = close * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+    volume = rng.integers(100_000, 10_000_000, n).astype(float)
+
+    # Bar datar (high == low, close tidak berubah) dan bar tanpa volume
+    for i in rng.choice(np.arange(60, n), size=5, replace=False):
+        open_[i] = high[i] = low[i] = close[i] = close[i - 1]
+    volume[rng.choice(np.arange(60, n), size=3, replace=False)] = 0.0
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+
+
+def max_relative_errors(actual, expected):
+    scale = np.maximum(1.0, np.abs(expected))
+    return (np.abs(actual - expected) / scale).max(axis=0)
+
+
+def report(label, errors, tolerance):
+    worst = int(np.argmax(errors))
+    ok = errors[worst] <= tolerance
+    print(f"{'OK  ' if ok else 'FAIL'} {label:<28} max rel err {errors[worst]:.2e} ({FEATURE_COLUMNS[worst]})")
+    if not ok:
+        for name, error in zip(FEATURE_COLUMNS, errors):
+            if error > tolerance:
+                print(f"       {name:<16} {error:.2e}")
+    return ok
+
+
+def check_stream(label, bars):
+    expected = compute_features(bars).to_numpy()
+    engine = IncrementalFeatures(history=len(bars))
+    for timestamp, bar in zip(bars.index, bars.to_numpy()):
+        engine.update(timestamp, *bar)
+    _, actual = engine.window(len(bars), origin=bars.index[0])
+    return report(label, max_relative_errors(actual[WARMUP:], expected[WARMUP:]), EXACT_TOLERANCE)
+
+
+def check_revision(label, bars):
+    engine = IncrementalFeatures(history=60)
+    engine.extend(bars)
+    revised = bars.copy()
+    revised.iloc[-1, revised.columns.get_loc("close")] *= 1.03
+    revised.iloc[-1, revised.columns.get_loc("high")] = revised.iloc[-1][["high", "close"]].max()
+    revised.iloc[-1, revised.columns.get_loc("volume")] += 12_345
+    engine.update(revised.index[-1], *revised.to_numpy()[-1])
+    _, actual = engine.window(60, origin=bars.index[0])
+    expected = compute_features(revised).tail(60).to_numpy()
+    return report(label, max_relative_errors(actual, expected), EXACT_TOLERANCE)
+
+
+def check_sliding(label, bars, window, step):
+    cache = FeatureEngineCache(history=60)
+    ok = True
+    errors = np.zeros(len(FEATURE_COLUMNS))
+    for start in range(0, len(bars) - window + 1, step):
+        current = bars.iloc[start:start + window]
+        _, actual = cache.window(("PARITY", label), current, 60)
+        expected = compute_features(current).tail(60).to_numpy()
+        errors = np.maximum(errors, max_relative_errors(actual, expected))
+    ok = report(label, errors, SLIDING_TOLERANCE)
+    print(f"     engine rebuilds={cache.stats['rebuilds']} incremental={cache.stats['incremental']}")
+    return ok
+
+
+def check_batch(label, frames):
+    bars, sessions = stack_bars(frames)
+    tensor64 = build_feature_tensor(bars, sessions, dtype=np.float64)
+    tensor32 = build_feature_tensor(bars, sessions)
+    assert tensor32.dtype == np.float32 and tensor32.flags["C_CONTIGUOUS"]
+    errors64 = np.zeros(len(FEATURE_COLUMNS))
+    errors32 = np.zeros(len(FEATURE_COLUMNS))
+    for i, frame in enumerate(frames):
+        expected = compute_features(frame).to_numpy()
+        errors64 = np.maximum(errors64, max_relative_errors(tensor64[i, -len(frame):], expected))
+        errors32 = np.maximum(errors32, max_relative_errors(tensor32[i, -len(frame):].astype(float), expected))
+        if not np.all(tensor64[i, :-len(frame)] == 0):
+            print(f"FAIL {label}: padding rows of ticker {i} are not zero")
+            return False
+    return report(label + " (float64)", errors64, EXACT_TOLERANCE) & report(label + " (float32)", errors32, FLOAT32_TOLERANCE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, default=520)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    daily = synthetic_bars(args.bars, "D", rng)
+    hourly = synthetic_bars(args.bars, "h", rng, tz="Asia/Jakarta")
+
+    results = [
+        check_stream("daily stream", daily),
+        check_stream("hourly stream (VWAP_D anchor)", hourly),
+        check_revision("daily revised last bar", daily),
+        check_revision("hourly revised last bar", hourly),
+        check_sliding("daily sliding window", daily, window=args.bars - 40, step=4),
+        check_sliding("hourly sliding window", hourly, window=args.bars - 40, step=4),
+        check_batch("daily batch", [daily, daily.iloc[200:], synthetic_bars(args.bars // 2, "D", rng)]),
+        check_batch("hourly batch", [hourly, hourly.iloc[-150:]]),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
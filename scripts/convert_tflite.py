@@ -0,0 +1,204 @@
+"""
+Convert the LSTM forecasting models (models/forecasting/*.keras) to TFLite
+for the MODEL_BACKEND=tflite serving backend, and report accuracy parity
+against the Keras outputs.
+
+Each model is exported with a fixed [1, N_STEPS_IN, features] signature and
+written next to the .keras file as lstm_model_{TICKER}_{TIMEFRAME}.{variant}.tflite.
+Variants:
+    float32  no quantization
+    float16  float16 weights
+    dynamic  dynamic-range quantization (int8 weights, float activations)
+    int8     full integer quantization calibrated on a representative dataset
+             (float input/output). Converted in a child process, because the
+             calibrator can crash the interpreter on LSTM graphs in some
+             TensorFlow builds.
+
+Representative and evaluation windows are built from the local bar store
+(BAR_STORE_DIR, {TICKER}.JK_{interval}.parquet) with the NumPy feature builder
+and the model's scaler. When no bars are stored for a ticker, uniform random
+windows inside the scaler's feature range are used instead.
+
+Parity is reported as the max/mean absolute error of the scaled outputs and of
+the de-scaled close price, per variant.
+
+Usage (from the repository root):
+    python scripts/convert_tflite.py [--tickers BBCA,BBRI] [--timeframe 1d]
+        [--variants float32,float16,dynamic,int8] [--samples 256] [--report report.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import joblib  # noqa: E402
+import pandas as pd  # noqa: E402
+import tensorflow as tf  # noqa: E402
+from tensorflow.keras.models import load_model  # noqa: E402
+
+from api.features import CLOSE_INDEX, FEATURE_COLUMNS, build_feature_tensor, stack_bars  # noqa: E402
+from api.tflite_runtime import TFLITE_VARIANTS, TFLiteModel, tflite_model_path  # noqa: E402
+
+MODEL_SAVE_DIR = "models/forecasting"
+N_STEPS_IN = 60
+TIMEFRAME_MAP = {"1h": "60m", "1d": "1d"}
+CALIBRATION_SAMPLES = 128
+
+
+def convert_saved_model(saved_model_dir, variant, calibration=None):
+    """Konversi SavedModel (signature batch 1) ke flatbuffer TFLite untuk satu varian."""
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    if variant != "float32":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        def representative_dataset():
+            for window in calibration:
+                yield [window[np.newaxis].astype(np.float32)]
+        converter.representative_dataset = representative_dataset
+    return converter.convert()
+
+
+def _convert_to_file(saved_model_dir, variant, calibration_path, output_path):
+    calibration = np.load(calibration_path) if calibration_path else None
+    with open(output_path, "wb") as f:
+        f.write(convert_saved_model(saved_model_dir, variant, calibration))
+
+
+def convert_isolated(saved_model_dir, variant, calibration, output_path):
+    """Jalankan konversi di proses terpisah; mengembalikan exit code proses tersebut."""
+    with tempfile.TemporaryDirectory() as tmp:
+        calibration_path = os.path.join(tmp, "calibration.npy")
+        np.save(calibration_path, calibration)
+        process = multiprocessing.get_context("spawn").Process(
+            target=_convert_to_file, args=(saved_model_dir, variant, calibration_path, output_path)
+        )
+        process.start()
+        process.join()
+        return process.exitcode
+
+
+def load_windows(ticker, timeframe, scaler, samples, rng):
+    """Jendela input terskala (samples, N_STEPS_IN, fitur) dan sumbernya ("bars" atau "random")."""
+    path = os.path.join(os.environ.get("BAR_STORE_DIR", "data/bars"), f"{ticker}.JK_{TIMEFRAME_MAP[timeframe]}.parquet")
+    if os.path.exists(path):
+        frame = pd.read_parquet(path)
+        bars, sessions = stack_bars([frame])
+        features = build_feature_tensor(bars, None if timeframe == "1d" else sessions, dtype=np.float64)[0]
+        # Lewati masa warm-up indikator, sama seperti data pelatihan
+        scaled = scaler.transform(features[100:]).astype(np.float32)
+        if len(scaled) >= N_STEPS_IN + samples:
+            windows = np.lib.stride_tricks.sliding_window_view(scaled, (N_STEPS_IN, len(FEATURE_COLUMNS)))[:, 0]
+            return windows[np.sort(rng.choice(len(windows), samples, replace=False))], "bars"
+
+    low, high = scaler.feature_range
+    windows = rng.uniform(low, high, (samples, N_STEPS_IN, len(FEATURE_COLUMNS)))
+    return windows.astype(np.float32), "random"
+
+
+def parity(reference, outputs, close_scale):
+    error = np.abs(outputs - reference)
+    return {
+        "max_abs_scaled": float(error.max()),
+        "mean_abs_scaled": float(error.mean()),
+        "max_abs_price": float(error.max() / close_scale),
+        "mean_abs_price": float(error.mean() / close_scale),
+    }
+
+
+def convert_model(ticker, timeframe, variants, samples, rng):
+    model_path = os.path.join(MODEL_SAVE_DIR, f"lstm_model_{ticker}_{timeframe}.keras")
+    model = load_model(model_path)
+    scaler = joblib.load(os.path.join(MODEL_SAVE_DIR, f"scaler_{ticker}_{timeframe}.joblib"))
+    windows, source = load_windows(ticker, timeframe, scaler, samples + CALIBRATION_SAMPLES, rng)
+    calibration, evaluation = windows[:CALIBRATION_SAMPLES], windows[CALIBRATION_SAMPLES:]
+    reference = model.predict_on_batch(evaluation)
+
+    results = {"ticker": ticker, "timeframe": timeframe, "windows": source, "variants": {}}
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        model.export(saved_model_dir, input_signature=[tf.TensorSpec([1, N_STEPS_IN, len(FEATURE_COLUMNS)], tf.float32)],
+                     verbose=False)
+        for variant in variants:
+            output_path = tflite_model_path(model_path, variant)
+            tmp_path = f"{output_path}.tmp"
+            if variant == "int8":
+                exitcode = convert_isolated(saved_model_dir, variant, calibration, tmp_path)
+                if exitcode != 0:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    results["variants"][variant] = {"error": f"konversi gagal (exit code {exitcode})"}
+                    continue
+            else:
+                with open(tmp_path, "wb") as f:
+                    f.write(convert_saved_model(saved_model_dir, variant))
+
+            try:
+                outputs = TFLiteModel(tmp_path).predict_on_batch(evaluation)
+            except Exception as e:
+                os.remove(tmp_path)
+                results["variants"][variant] = {"error": f"inferensi gagal: {e}"}
+                continue
+            os.replace(tmp_path, output_path)
+            results["variants"][variant] = {
+                "path": output_path,
+                "bytes": os.path.getsize(output_path),
+                **parity(reference, outputs, scaler.scale_[CLOSE_INDEX]),
+            }
+    return results
+
+
+def print_results(results):
+    print(f"{results['ticker']}_{results['timeframe']} (jendela: {results['windows']})")
+    for variant, result in results["variants"].items():
+        if "error" in result:
+            print(f"  {variant:<8} {result['error']}")
+            continue
+        print(f"  {variant:<8} {result['bytes'] / 1024:7.1f} KiB  "
+              f"max err {result['max_abs_scaled']:.2e} (harga {result['max_abs_price']:.4f})  "
+              f"mean err {result['mean_abs_scaled']:.2e} (harga {result['mean_abs_price']:.4f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", help="comma-separated, default: every model for the timeframe")
+    parser.add_argument("--timeframe", default="1d", choices=sorted(TIMEFRAME_MAP))
+    parser.add_argument("--variants", default="float32,float16,dynamic,int8")
+    parser.add_argument("--samples", type=int, default=256, help="evaluation windows per model")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="write the parity report as JSON to this path")
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    unknown = set(variants) - set(TFLITE_VARIANTS)
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+
+    if args.tickers:
+        tickers = [t.strip().replace(".JK", "") for t in args.tickers.split(",") if t.strip()]
+    else:
+        suffix = f"_{args.timeframe}.keras"
+        tickers = sorted(f[len("lstm_model_"):-len(suffix)] for f in os.listdir(MODEL_SAVE_DIR)
+                         if f.startswith("lstm_model_") and f.endswith(suffix))
+
+    rng = np.random.default_rng(args.seed)
+    report = []
+    for ticker in tickers:
+        results = convert_model(ticker, args.timeframe, variants, args.samples, rng)
+        print_results(results)
+        report.append(results)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
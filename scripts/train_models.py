@@ -0,0 +1,402 @@
+"""
+Train the per-ticker LSTM forecasting models and regenerate the artifacts in
+models/forecasting: lstm_model_{TICKER}_{TIMEFRAME}.keras,
+scaler_{TICKER}_{TIMEFRAME}.joblib and plot_{TICKER}_{TIMEFRAME}.png, the
+naming scheme ModelWrapper loads.
+
+Data sources (--source):
+    store  OHLCV from the local bar store (BAR_STORE_DIR). Tickers that are
+           not stored yet are fetched through yfinance, or BAR_PROVIDER_DIR
+           when set.
+    db     the stock_prices table (SUPABASE_URL / SUPABASE_KEY), paged by
+           datetime.
+
+Windows are exactly the serving inputs. Like /forecast, each ticker's history
+is first trimmed to the serving period (2y for 1d, 60d for 1h) ending at its
+last bar, so cumulative indicators such as OBV start at the same point. The
+FEATURE_COLUMNS then come from the NumPy feature builder, after skipping the
+first BACKTEST_WARMUP rows. Each
+window has N_STEPS_IN steps and targets the scaled close at t+1..t+N_HORIZONS.
+The last --validation fraction of windows is held out chronologically. It is
+used for early stopping, the validation metrics and the plot. The
+MinMaxScaler is fitted on the training rows only and records the first
+held-out bar as validation_start_, where the API's backtest metrics begin.
+
+Hyperparameters: an existing model keeps its LSTM units, LSTM activation,
+dropout rate and learning rate. New tickers use the defaults. The
+--units/--dropout/--learning-rate options override both.
+
+Tickers train in parallel in spawned worker processes, --workers at a time.
+Each worker is pinned to --threads-per-worker TensorFlow/BLAS threads, so
+the workers do not oversubscribe the CPU cores. BLAS/OpenMP pools are limited
+with threadpoolctl, because numpy is already loaded when a worker starts. Artifacts are written to a
+temporary directory and moved into place with os.replace, model first, so
+the serving process's hot reload never sees a half-written file. A load that
+overlaps the swap sees the files change and is retried. At startup, temporary
+directories older than an hour are removed; newer ones may belong to a
+concurrent run.
+
+The run is resumable. After each ticker finishes, its status, wall time and
+validation metrics are written to the state file (default
+{output_dir}/training_state_{TIMEFRAME}.json). A rerun skips tickers that
+are already done, unless --force is given.
+
+Usage (from the repository root):
+    python scripts/train_models.py [--tickers BBCA,BBRI] [--timeframe 1d] [--source store|db]
+        [--workers 4] [--threads-per-worker 1] [--epochs 100] [--force]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pandas as pd  # noqa: E402
+
+from api.backtest import BACKTEST_WARMUP, rolling_windows, run_backtest  # noqa: E402
+from api.bar_store import trim_to_period  # noqa: E402
+from api.features import CLOSE_INDEX, FEATURE_COLUMNS, build_feature_tensor, stack_bars  # noqa: E402
+
+MODEL_SAVE_DIR = "models/forecasting"
+N_STEPS_IN = 60
+N_HORIZONS = 3
+TIMEFRAME_MAP = {"1h": "60m", "1d": "1d"}
+# Rentang riwayat /forecast per timeframe (lihat load_forecast_bars)
+PERIODS = {"1h": "60d", "1d": "2y"}
+DEFAULT_HPARAMS = {"units": 64, "activation": "relu", "dropout": 0.2, "learning_rate": 1e-3}
+TMP_PREFIX = ".train-"
+# Direktori sementara hanya hidup selama artefak disimpan; yang lebih tua dari ini ditinggalkan run yang terhenti
+STALE_TMP_SECONDS = 3600
+DB_PAGE_SIZE = 1000
+
+
+def artifact_paths(output_dir, ticker, timeframe):
+    return {
+        "model": os.path.join(output_dir, f"lstm_model_{ticker}_{timeframe}.keras"),
+        "scaler": os.path.join(output_dir, f"scaler_{ticker}_{timeframe}.joblib"),
+        "plot": os.path.join(output_dir, f"plot_{ticker}_{timeframe}.png"),
+    }
+
+
+# --- Sumber data (proses induk) ---
+
+def load_store_bars(tickers, timeframe):
+    from api.bar_store import BarStore, FileBarProvider, YFinanceProvider
+
+    provider_dir = os.environ.get("BAR_PROVIDER_DIR")
+    bar_store = BarStore(os.environ.get("BAR_STORE_DIR", "data/bars"),
+                         FileBarProvider(provider_dir) if provider_dir else YFinanceProvider())
+    frames = {}
+    for ticker in tickers:
+        try:
+            frames[ticker] = bar_store.get_bars(f"{ticker}.JK", TIMEFRAME_MAP[timeframe], PERIODS[timeframe])
+        except Exception as e:
+            print(f"Peringatan: bar {ticker} tidak dapat diambil: {e!r}")
+    return frames
+
+
+def load_db_bars(tickers, timeframe):
+    """Bar dari tabel stock_prices, satu halaman keyset (urut datetime) per query."""
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    frames = {}
+    for ticker in tickers:
+        rows, last_datetime = [], None
+        while True:
+            query = client.table("stock_prices").select("datetime, open, high, low, close, volume")
+            query = query.in_("ticker", [ticker, f"{ticker}.JK"]).eq("timeframe", timeframe)
+            if last_datetime:
+                query = query.gt("datetime", last_datetime)
+            page = query.order("datetime").limit(DB_PAGE_SIZE).execute().data
+            rows.extend(page)
+            if len(page) < DB_PAGE_SIZE:
+                break
+            last_datetime = page[-1]["datetime"]
+        if rows:
+            frame = pd.DataFrame(rows)
+            frame.index = pd.DatetimeIndex(pd.to_datetime(frame.pop("datetime")))
+            frames[ticker] = frame.astype(float)
+    return frames
+
+
+# --- Pelatihan (proses worker) ---
+
+def init_worker(threads):
+    """Batasi thread TensorFlow/BLAS per worker sebelum TensorFlow diimpor."""
+    for name in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                 "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ[name] = str(threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+    from threadpoolctl import threadpool_limits
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    # Variabel lingkungan di atas tidak berlaku untuk BLAS milik numpy yang sudah dimuat saat
+    # modul ini diimpor di worker; batasi pool yang sudah dimuat (numpy, TensorFlow) secara langsung
+    threadpool_limits(limits=threads)
+
+
+def existing_hparams(model_path):
+    """Hyperparameter model lama (units, aktivasi LSTM, dropout, learning rate), atau {} jika tidak ada."""
+    import tensorflow as tf
+
+    if not os.path.exists(model_path):
+        return {}
+    try:
+        model = tf.keras.models.load_model(model_path)
+    except Exception as e:
+        print(f"Peringatan: {model_path} tidak dapat dibaca, memakai hyperparameter default: {e!r}")
+        return {}
+    hparams = {"learning_rate": float(model.optimizer.get_config()["learning_rate"])}
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.LSTM):
+            hparams.update(units=layer.units, activation=layer.get_config()["activation"])
+        elif isinstance(layer, tf.keras.layers.Dropout):
+            hparams["dropout"] = layer.rate
+    return hparams
+
+
+def build_model(hparams):
+    import tensorflow as tf
+
+    model = tf.keras.Sequential([
+        tf.keras.Input((N_STEPS_IN, len(FEATURE_COLUMNS))),
+        tf.keras.layers.LSTM(hparams["units"], activation=hparams["activation"]),
+        tf.keras.layers.Dropout(hparams["dropout"]),
+        tf.keras.layers.Dense(N_HORIZONS),
+    ])
+    model.compile(optimizer=tf.keras.optimizers.Adam(hparams["learning_rate"]), loss="mean_squared_error")
+    return model
+
+
+def save_plot(path, ticker, timeframe, predicted, actual):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(actual, label="Actual t+1", linestyle="--", alpha=0.8)
+    ax.plot(predicted, label="Forecast t+1", alpha=0.8)
+    ax.set_title(f"Forecast vs Actual (Horizon 1) - {ticker}.JK ({timeframe})")
+    ax.set_xlabel("Time Steps (Validation Samples)")
+    ax.set_ylabel("Price")
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def train_ticker(ticker, frame, timeframe, output_dir, options):
+    """Latih satu ticker dan tulis artefaknya secara atomik. Mengembalikan ringkasan untuk state file."""
+    import joblib
+    import tensorflow as tf
+    from numpy.lib.stride_tricks import sliding_window_view
+    from sklearn.preprocessing import MinMaxScaler
+
+    started = time.perf_counter()
+    paths = artifact_paths(output_dir, ticker, timeframe)
+    bars, sessions = stack_bars([frame])
+    features = build_feature_tensor(bars, None if timeframe == "1d" else sessions, dtype=np.float64)[0]
+    rows = features[BACKTEST_WARMUP:]
+    count = len(rows) - N_STEPS_IN - N_HORIZONS + 1
+    split = int(count * (1 - options["validation"]))
+    if split <= 0 or split == count:
+        raise ValueError(f"riwayat terlalu pendek: {len(frame)} bar")
+
+    # Scaler hanya melihat baris yang dipakai jendela latih (input dan target)
+    scaler = MinMaxScaler().fit(rows[:split + N_STEPS_IN + N_HORIZONS - 1])
+    scaled = scaler.transform(rows).astype(np.float32)
+    X = rolling_windows(scaled, N_STEPS_IN)[:count]
+    y = sliding_window_view(scaled[N_STEPS_IN:, CLOSE_INDEX], N_HORIZONS)[:count]
+
+    hparams = {**DEFAULT_HPARAMS, **existing_hparams(paths["model"]), **options["hparams"]}
+    tf.keras.utils.set_random_seed(options["seed"])
+    model = build_model(hparams)
+    history = model.fit(
+        X[:split], y[:split],
+        validation_data=(X[split:], y[split:]),
+        epochs=options["epochs"],
+        batch_size=options["batch_size"],
+        shuffle=True,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=options["patience"],
+                                                    restore_best_weights=True)],
+        verbose=0,
+    )
+
+    # Metrik validasi dalam satuan harga, dengan backtest yang sama seperti /forecast
+    validation_start = frame.index[BACKTEST_WARMUP + N_STEPS_IN + split]
+    # Disimpan bersama scaler: API hanya menghitung metrik pada jendela yang tidak dipakai fit
+    scaler.validation_start_ = validation_start.isoformat()
+    metrics = run_backtest(model.predict_on_batch, scaler, features, frame.index, CLOSE_INDEX,
+                           N_STEPS_IN, N_HORIZONS, start=validation_start)
+    dummy = np.zeros((count - split, len(FEATURE_COLUMNS)))
+    dummy[:, CLOSE_INDEX] = model.predict_on_batch(X[split:])[:, 0]
+    predicted = scaler.inverse_transform(dummy)[:, CLOSE_INDEX]
+    actual = rows[N_STEPS_IN + split:N_STEPS_IN + count, CLOSE_INDEX]
+
+    with tempfile.TemporaryDirectory(prefix=TMP_PREFIX, dir=output_dir) as tmp:
+        tmp_paths = {name: os.path.join(tmp, os.path.basename(path)) for name, path in paths.items()}
+        model.save(tmp_paths["model"])
+        joblib.dump(scaler, tmp_paths["scaler"])
+        save_plot(tmp_paths["plot"], ticker, timeframe, predicted, actual)
+        # Model dulu: serving mendeteksi file yang berganti selama dimuat dan memuat ulang pasangan lengkapnya
+        for name in ("model", "scaler", "plot"):
+            os.replace(tmp_paths[name], paths[name])
+
+    return {
+        "status": "done",
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "wall_time_s": round(time.perf_counter() - started, 2),
+        "bars": len(frame),
+        "last_bar": frame.index[-1].isoformat(),
+        "train_windows": split,
+        "validation_windows": count - split,
+        "epochs": len(history.history["loss"]),
+        "best_val_loss": float(min(history.history["val_loss"])),
+        "hparams": hparams,
+        "validation": {k: metrics[k] for k in ("start", "end", "mae", "mse", "mape")} if metrics.get("windows") else None,
+    }
+
+
+# --- State resumable ---
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {"tickers": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def remove_stale_tmp_dirs(output_dir):
+    """
+    Direktori sementara dari run yang terhenti di tengah penulisan artefak. Direktori yang masih
+    baru bisa milik run lain yang sedang berjalan, jadi hanya yang lebih tua dari STALE_TMP_SECONDS.
+    """
+    cutoff = time.time() - STALE_TMP_SECONDS
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if not name.startswith(TMP_PREFIX):
+            continue
+        try:
+            if os.stat(path).st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", help="comma-separated, default: every existing model for the timeframe")
+    parser.add_argument("--timeframe", default="1d", choices=sorted(TIMEFRAME_MAP))
+    parser.add_argument("--source", default="store", choices=["store", "db"])
+    parser.add_argument("--output-dir", default=MODEL_SAVE_DIR)
+    parser.add_argument("--state", help="state file, default: {output_dir}/training_state_{timeframe}.json")
+    parser.add_argument("--workers", type=int, help="parallel tickers, default: CPU cores / threads per worker")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--validation", type=float, default=0.2, help="held-out fraction of the windows")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--patience", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--units", type=int)
+    parser.add_argument("--dropout", type=float)
+    parser.add_argument("--learning-rate", type=float)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--force", action="store_true", help="retrain tickers already done in the state file")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    remove_stale_tmp_dirs(args.output_dir)
+    if args.tickers:
+        tickers = [t.strip().replace(".JK", "") for t in args.tickers.split(",") if t.strip()]
+    else:
+        suffix = f"_{args.timeframe}.keras"
+        tickers = sorted(f[len("lstm_model_"):-len(suffix)] for f in os.listdir(args.output_dir)
+                         if f.startswith("lstm_model_") and f.endswith(suffix))
+    if not tickers:
+        parser.error("no tickers given and no existing models found")
+
+    state_path = args.state or os.path.join(args.output_dir, f"training_state_{args.timeframe}.json")
+    state = load_state(state_path)
+    done = {t for t, entry in state["tickers"].items() if entry.get("status") == "done"}
+    pending = tickers if args.force else [t for t in tickers if t not in done]
+    if len(pending) < len(tickers):
+        print(f"Melewati {len(tickers) - len(pending)} ticker yang sudah selesai (pakai --force untuk melatih ulang)")
+    if not pending:
+        return
+
+    frames = load_db_bars(pending, args.timeframe) if args.source == "db" else load_store_bars(pending, args.timeframe)
+    # Riwayat yang sama dengan serving: OBV dan indikator kumulatif lain dimulai dari titik yang sama
+    period = PERIODS[args.timeframe]
+    frames = {ticker: trim_to_period(frame, period, end=frame.index[-1]) if not frame.empty else frame
+              for ticker, frame in frames.items()}
+    for ticker in pending:
+        if ticker not in frames or frames[ticker].empty:
+            print(f"Melewati {ticker}: tidak ada data bar")
+            state["tickers"][ticker] = {"status": "error", "detail": "tidak ada data bar"}
+    save_state(state_path, state)
+
+    options = {
+        "validation": args.validation,
+        "epochs": args.epochs,
+        "patience": args.patience,
+        "batch_size": args.batch_size,
+        "seed": args.seed,
+        "hparams": {k: v for k, v in (("units", args.units), ("dropout", args.dropout),
+                                      ("learning_rate", args.learning_rate)) if v is not None},
+    }
+    threads = max(1, args.threads_per_worker)
+    workers = args.workers or max(1, (os.cpu_count() or 1) // threads)
+    runnable = [t for t in pending if t in frames and not frames[t].empty]
+    print(f"Melatih {len(runnable)} ticker dengan {workers} worker x {threads} thread")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=init_worker, initargs=(threads,)) as executor:
+        futures = {
+            executor.submit(train_ticker, ticker, frames[ticker], args.timeframe, args.output_dir, options): ticker
+            for ticker in runnable
+        }
+        for finished, future in enumerate(as_completed(futures), 1):
+            ticker = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "error", "detail": repr(e)}
+                print(f"[{finished}/{len(runnable)}] {ticker} gagal: {e!r}")
+            else:
+                mape = result["validation"]["mape"] if result["validation"] else float("nan")
+                print(f"[{finished}/{len(runnable)}] {ticker} selesai dalam {result['wall_time_s']:.1f} s "
+                      f"({result['epochs']} epoch, MAPE validasi {mape:.2f}%)")
+            state["tickers"][ticker] = result
+            save_state(state_path, state)
+
+    failed = [t for t in runnable if state["tickers"][t]["status"] != "done"]
+    print(f"Selesai dalam {time.perf_counter() - started:.1f} s: {len(runnable) - len(failed)} berhasil, "
+          f"{len(failed)} gagal{' (' + ', '.join(failed) + ')' if failed else ''}. State: {state_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Train the shared multi-ticker LSTM (MODEL_FAMILY=shared) and compare it,
+ticker by ticker, with the existing lstm_model_{TICKER}_{TIMEFRAME} models.
+
+One network is trained on the windows of every ticker. A ticker-embedding
+input tells the tickers apart. Each ticker keeps its own MinMaxScaler: the
+existing scaler_{TICKER}_{TIMEFRAME}.joblib when present, so the shared model
+sees the same inputs and targets as the per-ticker model, otherwise one fitted
+on that ticker's training split.
+
+Data: bars from the local bar store (BAR_STORE_DIR), fetched through yfinance
+or BAR_PROVIDER_DIR when missing, trimmed to the same 2y/60d period as
+/forecast.
+Features come from the NumPy feature builder; the first BACKTEST_WARMUP rows
+are skipped. Every ticker is split chronologically: the last --validation
+fraction of its windows is held out for early stopping and the comparison.
+
+Output, written atomically next to the per-ticker models:
+    shared_lstm_{TIMEFRAME}.keras    network, inputs (features, ticker)
+    shared_lstm_{TIMEFRAME}.joblib   {"tickers": [...], "scalers": {...}}
+
+Comparison: a rolling-origin backtest (api.backtest.run_backtest, the same
+one /forecast reports) for both models, in price units. It starts at the later
+of the two held-out periods, the validation_start_ recorded on the shared and
+the per-ticker scaler, so neither model is scored on bars it was trained on.
+A per-ticker scaler without validation_start_ (trained before it was
+recorded) may overlap its training data. Such rows are marked with * and left
+out of the averages. Also reported: parameter count and weight bytes of one
+shared model vs all per-ticker models.
+
+Usage (from the repository root):
+    python scripts/train_shared_lstm.py [--tickers BBCA,BBRI] [--timeframe 1d]
+        [--epochs 50] [--embedding-dim 8] [--report report.json]
+    python scripts/train_shared_lstm.py --compare-only
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import joblib  # noqa: E402
+import tensorflow as tf  # noqa: E402
+from numpy.lib.stride_tricks import sliding_window_view  # noqa: E402
+from sklearn.preprocessing import MinMaxScaler  # noqa: E402
+from tensorflow.keras.models import load_model  # noqa: E402
+
+from api.backtest import BACKTEST_WARMUP, rolling_windows, run_backtest, training_cutoff  # noqa: E402
+from api.bar_store import BarStore, FileBarProvider, YFinanceProvider, trim_to_period  # noqa: E402
+from api.features import CLOSE_INDEX, FEATURE_COLUMNS, build_feature_tensor, stack_bars  # noqa: E402
+from api.shared_model import build_shared_lstm, load_shared_model, shared_model_paths  # noqa: E402
+
+MODEL_SAVE_DIR = "models/forecasting"
+N_STEPS_IN = 60
+N_HORIZONS = 3
+TIMEFRAME_MAP = {"1h": "60m", "1d": "1d"}
+PERIODS = {"1h": "60d", "1d": "2y"}
+
+
+def per_ticker_paths(ticker, timeframe):
+    return (os.path.join(MODEL_SAVE_DIR, f"lstm_model_{ticker}_{timeframe}.keras"),
+            os.path.join(MODEL_SAVE_DIR, f"scaler_{ticker}_{timeframe}.joblib"))
+
+
+def load_ticker_data(bar_store, ticker, timeframe):
+    """(fitur belum diskalakan, index) seluruh riwayat ticker, atau None jika riwayat terlalu pendek."""
+    frame = bar_store.get_bars(f"{ticker}.JK", TIMEFRAME_MAP[timeframe], PERIODS[timeframe])
+    # Store menyimpan seluruh riwayat; potong ke rentang serving agar OBV dimulai dari titik yang sama
+    if not frame.empty:
+        frame = trim_to_period(frame, PERIODS[timeframe], end=frame.index[-1])
+    if len(frame) < BACKTEST_WARMUP + N_STEPS_IN + N_HORIZONS + 1:
+        return None
+    bars, sessions = stack_bars([frame])
+    features = build_feature_tensor(bars, None if timeframe == "1d" else sessions, dtype=np.float64)[0]
+    return features, frame.index
+
+
+def split_windows(features, scaler, validation):
+    """
+    Jendela terskala (X, y) untuk pelatihan dan validasi. Split kronologis: indeks jendela
+    validasi pertama juga menentukan awal periode pembanding backtest.
+    """
+    scaled = scaler.transform(features[BACKTEST_WARMUP:]).astype(np.float32)
+    count = len(scaled) - N_STEPS_IN - N_HORIZONS + 1
+    X = rolling_windows(scaled, N_STEPS_IN)[:count]
+    y = sliding_window_view(scaled[N_STEPS_IN:, CLOSE_INDEX], N_HORIZONS)[:count]
+    split = int(count * (1 - validation))
+    return X[:split], y[:split], X[split:], y[split:], split
+
+
+def save_shared(model, tickers, scalers, timeframe):
+    """Tulis model dan bundle lewat file sementara lalu os.replace, agar hot reload tidak membaca file setengah jadi."""
+    model_path, bundle_path = shared_model_paths(MODEL_SAVE_DIR, timeframe)
+    with tempfile.TemporaryDirectory(dir=MODEL_SAVE_DIR) as tmp:
+        tmp_model = os.path.join(tmp, os.path.basename(model_path))
+        tmp_bundle = os.path.join(tmp, os.path.basename(bundle_path))
+        model.save(tmp_model)
+        joblib.dump({"tickers": tickers, "scalers": scalers}, tmp_bundle)
+        os.replace(tmp_model, model_path)
+        os.replace(tmp_bundle, bundle_path)
+    return model_path, bundle_path
+
+
+def train(datasets, args):
+    tickers = sorted(datasets)
+    ticker_ids = {ticker: i for i, ticker in enumerate(tickers)}
+    train_parts, val_parts = [], []
+    for ticker in tickers:
+        data = datasets[ticker]
+        ids = np.full((len(data["X_train"]), 1), ticker_ids[ticker], dtype=np.int32)
+        train_parts.append((data["X_train"], ids, data["y_train"]))
+        ids = np.full((len(data["X_val"]), 1), ticker_ids[ticker], dtype=np.int32)
+        val_parts.append((data["X_val"], ids, data["y_val"]))
+
+    X_train, ids_train, y_train = (np.concatenate(part) for part in zip(*train_parts))
+    X_val, ids_val, y_val = (np.concatenate(part) for part in zip(*val_parts))
+    print(f"Melatih model bersama: {len(tickers)} ticker, {len(X_train)} jendela latih, {len(X_val)} jendela validasi")
+
+    tf.keras.utils.set_random_seed(args.seed)
+    model = build_shared_lstm(len(tickers), N_STEPS_IN, len(FEATURE_COLUMNS), N_HORIZONS,
+                              embedding_dim=args.embedding_dim, units=args.units)
+    model.fit(
+        [X_train, ids_train], y_train,
+        validation_data=([X_val, ids_val], y_val),
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        shuffle=True,
+        callbacks=[tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=args.patience, restore_best_weights=True)],
+        verbose=2,
+    )
+    return model, tickers
+
+
+def compare(datasets, shared, scalers, timeframe):
+    """
+    Backtest per ticker untuk model bersama dan model per ticker pada periode yang sama, mulai dari
+    awal validasi yang paling akhir di antara keduanya, agar tidak ada model yang diuji pada data latihnya.
+    """
+    rows = []
+    for ticker in sorted(datasets):
+        data = datasets[ticker]
+        features, index = data["features"], data["index"]
+        shared_start = training_cutoff(scalers[ticker], index.tz) or index[BACKTEST_WARMUP + N_STEPS_IN + data["split"]]
+
+        model_path, scaler_path = per_ticker_paths(ticker, timeframe)
+        has_per_ticker = os.path.exists(model_path) and os.path.exists(scaler_path)
+        per_ticker_scaler = joblib.load(scaler_path) if has_per_ticker else None
+        per_ticker_start = training_cutoff(per_ticker_scaler, index.tz)
+        start = max(shared_start, per_ticker_start) if per_ticker_start is not None else shared_start
+        row = {"ticker": ticker, "validation_start": shared_start.isoformat(), "comparison_start": start.isoformat()}
+
+        view = shared.view(ticker)
+        row["shared"] = run_backtest(view.predict_on_batch, scalers[ticker], features, index,
+                                     CLOSE_INDEX, N_STEPS_IN, N_HORIZONS, start=start)
+
+        if has_per_ticker:
+            row["per_ticker_validation_start"] = per_ticker_start.isoformat() if per_ticker_start is not None else None
+            # Tanpa batas tercatat, model per ticker mungkin sudah dilatih pada periode pembanding
+            row["per_ticker_overlap"] = per_ticker_start is None
+            model = load_model(model_path)
+            row["per_ticker_params"] = model.count_params()
+            row["per_ticker"] = run_backtest(model.predict_on_batch, per_ticker_scaler, features, index,
+                                             CLOSE_INDEX, N_STEPS_IN, N_HORIZONS, start=start)
+            tf.keras.backend.clear_session()
+        rows.append(row)
+    return rows
+
+
+def print_comparison(rows, shared_params):
+    print(f"\n{'ticker':<8}{'jendela':>8}{'MAE bersama':>14}{'MAE per-ticker':>16}{'MAPE bersama':>14}{'MAPE per-ticker':>17}")
+    for row in rows:
+        shared, per_ticker = row["shared"], row.get("per_ticker")
+        if not shared.get("windows"):
+            print(f"{row['ticker']:<8}{0:>8}  (tidak ada jendela validasi)")
+            continue
+        line = f"{row['ticker']:<8}{shared['windows']:>8}{shared['mae']:>14.2f}"
+        if per_ticker and per_ticker.get("windows"):
+            line += f"{per_ticker['mae']:>16.2f}{shared['mape']:>13.2f}%{per_ticker['mape']:>16.2f}%"
+        else:
+            line += f"{'-':>16}{shared['mape']:>13.2f}%{'-':>17}"
+        print(line + (" *" if row.get("per_ticker_overlap") else ""))
+
+    overlapping = [r["ticker"] for r in rows if r.get("per_ticker_overlap")]
+    if overlapping:
+        print(f"\n* Scaler per-ticker tanpa validation_start_: periode pembanding mungkin termasuk data latih "
+              f"model per-ticker ({', '.join(overlapping)}); tidak dihitung dalam rata-rata.")
+    compared = [r for r in rows if r.get("per_ticker", {}).get("windows") and r["shared"].get("windows")
+                and not r.get("per_ticker_overlap")]
+    if compared:
+        better = sum(r["shared"]["mape"] <= r["per_ticker"]["mape"] for r in compared)
+        print(f"\nRata-rata MAPE: bersama {np.mean([r['shared']['mape'] for r in compared]):.2f}%, "
+              f"per-ticker {np.mean([r['per_ticker']['mape'] for r in compared]):.2f}% "
+              f"(bersama sama/lebih baik pada {better}/{len(compared)} ticker)")
+    per_ticker_params = sum(r.get("per_ticker_params", 0) for r in rows)
+    if per_ticker_params:
+        print(f"Parameter: bersama {shared_params:,} ({shared_params * 4 / 1024:.1f} KiB), "
+              f"per-ticker total {per_ticker_params:,} ({per_ticker_params * 4 / 1024:.1f} KiB), "
+              f"rasio {per_ticker_params / shared_params:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", help="comma-separated, default: every per-ticker model for the timeframe")
+    parser.add_argument("--timeframe", default="1d", choices=sorted(TIMEFRAME_MAP))
+    parser.add_argument("--validation", type=float, default=0.2, help="held-out fraction of each ticker's windows")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--patience", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--embedding-dim", type=int, default=8)
+    parser.add_argument("--units", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare-only", action="store_true", help="skip training, compare the saved shared model")
+    parser.add_argument("--report", help="write the comparison as JSON to this path")
+    args = parser.parse_args()
+
+    if args.tickers:
+        tickers = [t.strip().replace(".JK", "") for t in args.tickers.split(",") if t.strip()]
+    else:
+        suffix = f"_{args.timeframe}.keras"
+        tickers = sorted(f[len("lstm_model_"):-len(suffix)] for f in os.listdir(MODEL_SAVE_DIR)
+                         if f.startswith("lstm_model_") and f.endswith(suffix))
+
+    shared, scalers = None, {}
+    if args.compare_only:
+        shared, scalers = load_shared_model(*shared_model_paths(MODEL_SAVE_DIR, args.timeframe))
+        tickers = [t for t in tickers if t in shared.ticker_ids] if args.tickers else shared.tickers
+
+    provider_dir = os.environ.get("BAR_PROVIDER_DIR")
+    bar_store = BarStore(os.environ.get("BAR_STORE_DIR", "data/bars"),
+                         FileBarProvider(provider_dir) if provider_dir else YFinanceProvider())
+    datasets = {}
+    for ticker in tickers:
+        loaded = load_ticker_data(bar_store, ticker, args.timeframe)
+        if loaded is None:
+            print(f"Melewati {ticker}: riwayat bar terlalu pendek")
+            continue
+        features, index = loaded
+        if ticker not in scalers:
+            _, scaler_path = per_ticker_paths(ticker, args.timeframe)
+            if os.path.exists(scaler_path):
+                scalers[ticker] = joblib.load(scaler_path)
+            else:
+                # Fit hanya pada bagian latih agar periode validasi tidak bocor ke skala
+                train_rows = BACKTEST_WARMUP + int((len(features) - BACKTEST_WARMUP) * (1 - args.validation))
+                scalers[ticker] = MinMaxScaler().fit(features[BACKTEST_WARMUP:train_rows])
+        X_train, y_train, X_val, y_val, split = split_windows(features, scalers[ticker], args.validation)
+        if not args.compare_only:
+            # Awal periode validasi model bersama ini; metrik backtest API dimulai dari sini
+            scalers[ticker].validation_start_ = index[BACKTEST_WARMUP + N_STEPS_IN + split].isoformat()
+        datasets[ticker] = {"features": features, "index": index, "split": split,
+                            "X_train": X_train, "y_train": y_train, "X_val": X_val, "y_val": y_val}
+    if not datasets:
+        parser.error("no ticker has enough bars")
+
+    if not args.compare_only:
+        model, trained_tickers = train(datasets, args)
+        model_path, bundle_path = save_shared(model, trained_tickers, {t: scalers[t] for t in trained_tickers},
+                                              args.timeframe)
+        print(f"Model bersama disimpan: {model_path}, {bundle_path}")
+        shared, scalers = load_shared_model(model_path, bundle_path)
+
+    rows = compare(datasets, shared, scalers, args.timeframe)
+    print_comparison(rows, shared.model.count_params())
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"shared_params": shared.model.count_params(), "tickers": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
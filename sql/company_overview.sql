@@ -0,0 +1,18 @@
+-- Single-round-trip lookup used by GET /company/{ticker} when
+-- COMPANY_FETCH_MODE=rpc. Returns one JSON object with the same section
+-- keys the parallel fan-out produces; missing rows come back as null.
+create or replace function public.get_company_overview(p_ticker text)
+returns json
+language sql
+stable
+as $$
+  select json_build_object(
+    'info',            (select row_to_json(t) from public.company_info t where t.ticker = p_ticker limit 1),
+    'finance',         (select row_to_json(t) from public.company_finance t where t.ticker = p_ticker limit 1),
+    'valuation',       (select row_to_json(t) from public.company_valuation t where t.ticker = p_ticker limit 1),
+    'dividend',        (select row_to_json(t) from public.company_dividend t where t.ticker = p_ticker limit 1),
+    'growth',          (select row_to_json(t) from public.company_growth t where t.ticker = p_ticker limit 1),
+    'profitabilities', (select row_to_json(t) from public.company_profitabilities t where t.ticker = p_ticker limit 1),
+    'liquidity',       (select row_to_json(t) from public.company_liquidity t where t.ticker = p_ticker limit 1)
+  );
+$$;
@@ -0,0 +1,119 @@
+"""
+Numerical parity of the incremental feature engine (IncrementalFeatures,
+FeatureEngineCache) and the NumPy batch builder with the pandas_ta pipeline
+(compute_features) used by /forecast.
+
+Tolerance: relative error |actual - expected| / max(1, |expected|) per
+column, at most 1e-8 when both sides see the same history. A sliding
+window moves the pandas_ta EMA/RMA seed point, so that case allows 1e-6.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from api.features import (
+    FEATURE_COLUMNS,
+    FeatureEngineCache,
+    IncrementalFeatures,
+    build_feature_tensor,
+    compute_features,
+    stack_bars,
+)
+
+WARMUP = 100
+EXACT_TOLERANCE = 1e-8
+SLIDING_TOLERANCE = 1e-6
+N_BARS = 400
+
+
+def synthetic_bars(n, freq, seed, tz=None):
+    """Random-walk OHLCV with a few flat bars and zero-volume bars."""
+    rng = np.random.default_rng(seed)
+    if freq == "h":
+        days = pd.bdate_range("2024-01-02", periods=n // 7 + 1)
+        index = pd.DatetimeIndex([day + pd.Timedelta(hours=h) for day in days for h in range(9, 16)])[:n]
+        index = index.tz_localize(tz) if tz else index
+    else:
+        index = pd.bdate_range("2023-01-02", periods=n, tz=tz)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    open_ = close * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+    volume = rng.integers(100_000, 10_000_000, n).astype(float)
+    for i in rng.choice(np.arange(60, n), size=5, replace=False):
+        open_[i] = high[i] = low[i] = close[i] = close[i - 1]
+    volume[rng.choice(np.arange(60, n), size=3, replace=False)] = 0.0
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=index)
+
+
+@pytest.fixture(params=["daily", "hourly"])
+def bars(request):
+    if request.param == "daily":
+        return synthetic_bars(N_BARS, "D", seed=0)
+    # Intraday bars exercise the session anchor of VWAP_D
+    return synthetic_bars(N_BARS, "h", seed=1, tz="Asia/Jakarta")
+
+
+def assert_close(actual, expected, tolerance):
+    assert actual.shape == expected.shape
+    errors = (np.abs(actual - expected) / np.maximum(1.0, np.abs(expected))).max(axis=0)
+    failing = {name: float(error) for name, error in zip(FEATURE_COLUMNS, errors) if not error <= tolerance}
+    assert not failing, f"columns above tolerance {tolerance:g}: {failing}"
+
+
+def test_incremental_matches_pandas_ta_bar_by_bar(bars):
+    engine = IncrementalFeatures(history=len(bars))
+    for timestamp, bar in zip(bars.index, bars.to_numpy()):
+        engine.update(timestamp, *bar)
+    timestamps, actual = engine.window(len(bars), origin=bars.index[0])
+
+    assert list(timestamps) == list(bars.index)
+    expected = compute_features(bars).to_numpy()
+    assert_close(actual[WARMUP:], expected[WARMUP:], EXACT_TOLERANCE)
+
+
+def test_revised_last_bar_matches_pandas_ta(bars):
+    engine = IncrementalFeatures(history=60)
+    engine.extend(bars)
+    revised = bars.copy()
+    revised.iloc[-1, revised.columns.get_loc("close")] *= 1.03
+    revised.iloc[-1, revised.columns.get_loc("high")] = revised.iloc[-1][["high", "close"]].max()
+    revised.iloc[-1, revised.columns.get_loc("volume")] += 12_345
+    engine.update(revised.index[-1], *revised.to_numpy()[-1])
+
+    _, actual = engine.window(60, origin=bars.index[0])
+    assert_close(actual, compute_features(revised).tail(60).to_numpy(), EXACT_TOLERANCE)
+
+
+def test_engine_cache_sliding_window_matches_pandas_ta(bars):
+    cache = FeatureEngineCache(history=60)
+    window = len(bars) - 40
+    for start in range(0, len(bars) - window + 1, 8):
+        current = bars.iloc[start:start + window]
+        _, actual = cache.window(("PARITY", "1d"), current, 60)
+        assert_close(actual, compute_features(current).tail(60).to_numpy(), SLIDING_TOLERANCE)
+    # Only the first window builds the engine; later ones append the new bars
+    assert cache.stats["rebuilds"] == 1
+    assert cache.stats["incremental"] > 0
+
+
+def test_engine_cache_rebuilds_after_invalidate(bars):
+    cache = FeatureEngineCache(history=60)
+    cache.window(("PARITY", "1d"), bars, 60)
+    cache.invalidate("PARITY")
+    adjusted = bars.copy()
+    adjusted[["open", "high", "low", "close"]] *= 0.98
+    _, actual = cache.window(("PARITY", "1d"), adjusted, 60)
+
+    assert cache.stats["rebuilds"] == 2
+    assert_close(actual, compute_features(adjusted).tail(60).to_numpy(), EXACT_TOLERANCE)
+
+
+def test_batch_builder_matches_pandas_ta(bars):
+    frames = [bars, bars.iloc[150:]]
+    stacked, sessions = stack_bars(frames)
+    tensor = build_feature_tensor(stacked, sessions, dtype=np.float64)
+    for i, frame in enumerate(frames):
+        assert_close(tensor[i, -len(frame):], compute_features(frame).to_numpy(), EXACT_TOLERANCE)
+        assert np.all(tensor[i, :-len(frame)] == 0)
@@ -0,0 +1,27 @@
+"""
+Startup smoke test for the get_data API: with SUPABASE_URL/SUPABASE_KEY set,
+the lifespan builds the real Supabase client pool with the installed supabase
+package. Creating clients does not open a connection, so no database is needed.
+"""
+
+from fastapi.testclient import TestClient
+
+from api import get_data
+
+
+async def idle_refresh_loop():
+    return None
+
+
+def test_lifespan_creates_client_pool(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "test-key")
+    monkeypatch.setattr(get_data, "fundamentals_refresh_loop", idle_refresh_loop)
+
+    with TestClient(get_data.app) as client:
+        response = client.get("/pool-stats")
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["size"] == get_data.SUPABASE_POOL_SIZE
+        assert stats["idle"] == stats["size"]
+    assert get_data.supabase_pool is None